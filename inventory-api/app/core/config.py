@@ -1,6 +1,7 @@
 # app/core/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import ValidationError
+from typing import Optional, Literal
 import os
 import cloudinary
 import sys
@@ -23,12 +24,125 @@ class Settings(BaseSettings):
     DATABASE_PORT: int
     DATABASE_USERNAME: str
     DATABASE_PASSWORD: str
+
+    # Connection pool of the database engine
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_POOL_RECYCLE: int = 1800 # seconds, -1 disables recycling
+    # Connections held longer than this are reported as possible leaked sessions
+    DATABASE_POOL_LEAK_SECONDS: float = 60
+
+    # Async engine URL, defaults to the same SQL Server through aioodbc
+    # (e.g. sqlite+aiosqlite:///./local.db for local testing)
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Read replica (e.g. an Always On secondary) for the heavy read endpoints,
+    # reads use the primary when no replica is configured
+    DATABASE_READ_HOSTNAME: Optional[str] = None
+    DATABASE_READ_PORT: Optional[int] = None
+    ASYNC_DATABASE_READ_URL: Optional[str] = None
+    # Reads stay on the primary this many seconds after a write, the client's own writes
+    # (X-Last-Write-At, sent back by the client) and the receipts posted on the worker (0 disables the guard)
+    DATABASE_READ_MAX_STALENESS_SECONDS: float = 0
+    
+    # Per-request SQL profiling (Server-Timing header and N+1 warnings)
+    SQL_PROFILER_ENABLED: bool = True
+    # A statement repeated this many times in one request is logged as an N+1 suspect
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+    # Requests running at least this many statements are logged as warnings
+    SQL_PROFILER_SLOW_REQUEST_STATEMENTS: int = 50
+    # Statements slower than this are kept in the slow query log (0 disables it)
+    SLOW_QUERY_THRESHOLD_MS: float = 500
+    # Slow statements kept in memory for the internal metrics endpoints
+    SLOW_QUERY_BUFFER_SIZE: int = 500
+    # Rotating JSON lines file of the slow statements (empty keeps them in memory only)
+    SLOW_QUERY_LOG_FILE: Optional[str] = "logs/slow_queries.jsonl"
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUP_COUNT: int = 5
+    
+    # Authenticated users cached per worker by get_current_user (0 disables the cache)
+    USER_CACHE_MAX_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 60
+    # Role of the administrators, the only users allowed on the /internal endpoints
+    ADMIN_ROLE_ID: int = 1
+    
+    # Accept the refresh tokens stored as bcrypt hashes before the keyed digest
+    # (disable once REFRESH_TOKEN_EXPIRE_DAYS have passed since the migration)
+    REFRESH_TOKEN_ACCEPT_LEGACY_HASH: bool = True
+    
+    # Live refresh tokens kept per user, the oldest are revoked beyond it (0 = unlimited)
+    REFRESH_TOKEN_MAX_PER_USER: int = 10
+    # Minutes between two purges of the expired refresh tokens (0 disables the background job)
+    REFRESH_TOKEN_PURGE_INTERVAL_MINUTES: int = 60
+    # Rows deleted per statement (and transaction) by the purge
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = 1000
+    
+    # bcrypt hashing pool (0 workers hashes inline in the request thread)
+    PASSWORD_HASHER_WORKERS: int = 2
+    # Operations allowed to wait for a worker, beyond that logins get 503 + Retry-After
+    PASSWORD_HASHER_MAX_QUEUE: int = 32
+    PASSWORD_HASHER_TIMEOUT_SECONDS: float = 10
+    PASSWORD_HASHER_RETRY_AFTER_SECONDS: int = 2
     
     # Cloudinary credentials
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
 
+    # Minutes between two stock on-hand checkpoints (0 disables the background job)
+    STOCK_CHECKPOINT_INTERVAL_MINUTES: int = 60
+
+    # Minutes between two full reloads of the product search index, which picks up
+    # the product changes made through other workers (0: load once at startup)
+    PRODUCT_SEARCH_REFRESH_MINUTES: int = 10
+
+    # Lifetime of the ETag of the product, zone and supplier lists: writes made through
+    # other workers or outside the API are served at most this late (0: only local writes)
+    LIST_ETAG_MAX_AGE_SECONDS: int = 300
+
+    # Rows validated and upserted per transaction by /products/import
+    PRODUCT_IMPORT_CHUNK_SIZE: int = 500
+    # Rejected rows listed in the import report (the others are only counted)
+    PRODUCT_IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Product image store: "cloudinary", or "local" (files under IMAGE_STORAGE_LOCAL_DIR
+    # served by the API at IMAGE_STORAGE_LOCAL_BASE_URL, for development and benchmarks)
+    IMAGE_STORAGE_BACKEND: Literal["cloudinary", "local"] = "cloudinary"
+    IMAGE_STORAGE_LOCAL_DIR: str = "media"
+    IMAGE_STORAGE_LOCAL_BASE_URL: str = "http://127.0.0.1:8000/media"
+    # Background image uploads running at once, and waiting (beyond that: 503 + Retry-After)
+    IMAGE_UPLOAD_WORKERS: int = 4
+    IMAGE_UPLOAD_MAX_QUEUE: int = 100
+    IMAGE_UPLOAD_RETRY_AFTER_SECONDS: int = 5
+    # Seconds a finished upload job can still be polled
+    IMAGE_UPLOAD_JOB_TTL_SECONDS: int = 3600
+    # Reuse the stored image for bytes already uploaded (ProductImageAsset content hash index)
+    IMAGE_UPLOAD_DEDUP_ENABLED: bool = True
+    # Uploads are downscaled to IMAGE_MAX_DIMENSION pixels (longest side) and recompressed
+    # before they are stored, with a medium and a thumbnail variant for the lists
+    IMAGE_MAX_DIMENSION: int = 2048
+    IMAGE_MEDIUM_SIZE: int = 640
+    IMAGE_THUMBNAIL_SIZE: int = 160
+    IMAGE_JPEG_QUALITY: int = 82
+
+    # Websocket fan-out: messages waiting per client before it is evicted as too slow,
+    # and the longest a single send may take
+    WS_CLIENT_QUEUE_SIZE: int = 100
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    # Server pings (0: none), clients that sent nothing, not even a pong, for WS_IDLE_TIMEOUT_SECONDS are dropped
+    WS_PING_INTERVAL_SECONDS: float = 20.0
+    WS_IDLE_TIMEOUT_SECONDS: float = 60.0
+
+    # Broadcast backplane between the API workers: "memory" (a single worker), or "sqlite"
+    # (the workers of one host share BROADCAST_SQLITE_PATH, polled every BROADCAST_POLL_INTERVAL_SECONDS)
+    BROADCAST_BACKPLANE: Literal["memory", "sqlite"] = "memory"
+    BROADCAST_SQLITE_PATH: str = "broadcast.sqlite3"
+    BROADCAST_POLL_INTERVAL_SECONDS: float = 0.2
+    # Seconds a published message is kept in the SQLite file
+    BROADCAST_RETENTION_SECONDS: float = 60.0
+
     # Configuration for BaseSettings itself
     model_config = SettingsConfigDict(
         env_file=None, # Look for variables in .env file
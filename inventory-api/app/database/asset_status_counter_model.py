@@ -0,0 +1,25 @@
+from app.database.base import Base
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import Integer, String, DateTime, ForeignKey
+from datetime import datetime
+
+
+class AssetStatusCounter(Base):
+  """
+  Number of assets per purchase order, product and asset status.
+  The manifest and goods receipt services apply their asset creations and
+  status transitions here in the same transaction, so the purchase order
+  detail view reads a few counter rows instead of grouping the Asset table.
+  """
+  __tablename__ = "AssetStatusCounter"
+
+  PurchaseOrderId: Mapped[int] = mapped_column("PurchaseOrderId", Integer, ForeignKey("PurchaseOrder.PurchaseOrderId"), primary_key=True)
+  ProductId: Mapped[int] = mapped_column("ProductId", Integer, ForeignKey("Product.ProductId"), primary_key=True)
+  AssetStatus: Mapped[str] = mapped_column("AssetStatus", String(20), primary_key=True)
+
+  AssetCount: Mapped[int] = mapped_column("AssetCount", Integer, nullable=False, default=0)
+
+  UpdatedAt: Mapped[datetime] = mapped_column("UpdatedAt", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+  def __repr__(self):
+    return f"<AssetStatusCounter(PurchaseOrderId={self.PurchaseOrderId}, ProductId={self.ProductId}, AssetStatus='{self.AssetStatus}', AssetCount={self.AssetCount})>"
@@ -0,0 +1,121 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, insert, update, bindparam, inspect
+from sqlalchemy.engine import Engine
+from collections import defaultdict
+from itertools import groupby
+from typing import Iterator
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# SQL Server accepts at most 2100 parameters per statement, keep a margin for the statement's own
+MSSQL_MAX_PARAMETERS = 2100
+DEFAULT_MAX_PARAMETERS = 2000
+
+# Rows sent per executemany call (one parameter set per row, the limit above does not apply)
+DEFAULT_EXECUTEMANY_CHUNK_SIZE = 10000
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _enable_fast_executemany(conn, cursor, statement, parameters, context, executemany):
+  """
+  Switch pyodbc to fast_executemany (one round trip per parameter array instead
+  of one per row) for the statements executed with the 'fast_executemany' option.
+  """
+  if executemany and context is not None and context.execution_options.get("fast_executemany"):
+    if hasattr(cursor, "fast_executemany"):
+      cursor.fast_executemany = True
+
+def _chunks(rows: list, size: int) -> Iterator[list]:
+  for start in range(0, len(rows), size):
+    yield rows[start:start + size]
+
+class BulkWriter():
+  """
+  Bulk INSERT/UPDATE helper shared by the procurement services.
+
+  - insert_returning: multi row INSERT ... OUTPUT, chunked under the parameter limit,
+    generated ids come back in the order of the input rows
+  - insert_many / update_many: executemany with pyodbc fast_executemany
+
+  Rows use the ORM attribute names (PascalCase keys), like the ORM bulk methods.
+  Nothing is committed here, the caller owns the transaction.
+  """
+  def __init__(
+    self,
+    db: Session,
+    max_parameters: int = DEFAULT_MAX_PARAMETERS,
+    executemany_chunk_size: int = DEFAULT_EXECUTEMANY_CHUNK_SIZE
+  ):
+    self.db = db
+    self.max_parameters = max_parameters
+    self.executemany_chunk_size = executemany_chunk_size
+
+  def _rows_per_statement(self, rows: list[dict]) -> int:
+    columns_per_row = max(len(row) for row in rows)
+    return max(1, self.max_parameters // max(1, columns_per_row))
+
+  def insert_returning(self, model, rows: list[dict], returning: tuple) -> list:
+    """
+    Insert rows and return the requested columns of each inserted row, in input order.
+
+    Args:
+        model: ORM class
+        rows (list[dict]): column mappings with ORM attribute keys
+        returning (tuple): ORM attributes to return, e.g. (Asset.AssetId, Asset.PurchaseOrderLineId)
+
+    Returns:
+        list: one RowMapping per input row, same order
+    """
+    if not rows:
+      return []
+    stmt = insert(model).returning(*returning, sort_by_parameter_order=True)
+    rows_per_statement = self._rows_per_statement(rows)
+    results = []
+    # Consecutive rows with the same keys share one statement shape, so the order is kept across shapes
+    for _, run in groupby(rows, key=lambda row: frozenset(row)):
+      for chunk in _chunks(list(run), rows_per_statement):
+        results.extend(self.db.execute(stmt, chunk).mappings().all())
+    logger.info(f"Bulk inserted {len(rows)} {model.__tablename__} rows in chunks of {rows_per_statement}")
+    return results
+
+  def insert_many(self, model, rows: list[dict]):
+    """
+    Insert rows without returning anything (link tables, ledgers).
+    """
+    if not rows:
+      return
+    stmt = insert(model).execution_options(fast_executemany=True)
+    for chunk in _chunks(rows, self.executemany_chunk_size):
+      self.db.execute(stmt, chunk)
+    logger.info(f"Bulk inserted {len(rows)} {model.__tablename__} rows")
+
+  def update_many(self, model, rows: list[dict]):
+    """
+    Update rows by primary key. Each row must contain the primary key attributes,
+    rows updating different sets of columns are grouped into one statement per set.
+    """
+    if not rows:
+      return
+    mapper = inspect(model)
+    primary_keys = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+    table = mapper.local_table
+
+    # Group by the updated attributes, executemany needs one statement shape per group
+    groups: dict[tuple[str, ...], list[dict]] = defaultdict(list)
+    for row in rows:
+      groups[tuple(sorted(key for key in row if key not in primary_keys))].append(row)
+
+    for attributes, group_rows in groups.items():
+      if not attributes:
+        continue
+      # Bind names are prefixed so they never clash with the column names of the SET clause
+      stmt = (
+        update(table)
+        .where(*[mapper.attrs[key].columns[0] == bindparam(f"b_{key}") for key in primary_keys])
+        .values({mapper.attrs[key].columns[0].name: bindparam(f"b_{key}") for key in attributes})
+        .execution_options(fast_executemany=True)
+      )
+      parameters = [{f"b_{key}": value for key, value in row.items()} for row in group_rows]
+      for chunk in _chunks(parameters, self.executemany_chunk_size):
+        self.db.execute(stmt, chunk)
+    logger.info(f"Bulk updated {len(rows)} {model.__tablename__} rows in {len(groups)} statement shapes")
@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine
 # from app.core.config import settings
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy import select
+from fastapi import Request
 from app.core.config import settings
 # Define database models
 # app/database/models.py (Corrected version)
@@ -12,8 +14,11 @@ from app.core.config import settings
 # from typing import Optional, List # Keep Optional for nullable fields
 # from DBModel import User
 import urllib
+import threading
+import time
 # from app.core.config import settings
 
+from app.database.pool_monitor import InstrumentedQueuePool, instrument_engine
 from app.utils.logger import setup_logger
 logger = setup_logger()
 # Server details
@@ -22,29 +27,177 @@ database = settings.DATABASE_NAME
 username = settings.DATABASE_USERNAME
 password = settings.DATABASE_PASSWORD
 
-# Build the connection string.
-params = urllib.parse.quote_plus(
+def build_odbc_params(server: str, read_only: bool = False) -> str:
+  # Build the connection string.
+  return urllib.parse.quote_plus(
     "DRIVER={ODBC Driver 18 for SQL Server};"
     f"SERVER={server};"
     f"DATABASE={database};"
     f"UID={username};"
     f"PWD={password};"
     "TrustServerCertificate=yes;"
-)
+    + ("ApplicationIntent=ReadOnly;" if read_only else "")
+  )
 
+params = build_odbc_params(server)
 url = f"mssql+pyodbc:///?odbc_connect={params}"
-engine = create_engine(
-	# url = settings.DATABASE_URL,
-	url = url,
-	echo = False    
-)
+
+def create_pooled_engine(url: str, name: str):
+  new_engine = create_engine(
+    # url = settings.DATABASE_URL,
+    url = url,
+    echo = False,
+    poolclass = InstrumentedQueuePool,
+    pool_size = settings.DATABASE_POOL_SIZE,
+    max_overflow = settings.DATABASE_MAX_OVERFLOW,
+    pool_timeout = settings.DATABASE_POOL_TIMEOUT,
+    pool_pre_ping = settings.DATABASE_POOL_PRE_PING,
+    pool_recycle = settings.DATABASE_POOL_RECYCLE
+  )
+  instrument_engine(new_engine, name=name, leak_threshold_seconds=settings.DATABASE_POOL_LEAK_SECONDS)
+  return new_engine
+
+engine = create_pooled_engine(url, name="primary")
+
+SessionLocal = sessionmaker(bind=engine)
 
 def get_db():
-  session = Session(engine)
+  session = SessionLocal()
   try:
-    logger.info("Start the database session")
+    logger.debug("Start the database session")
     yield session
   finally:
     session.close()
-    logger.info("End database session")
+    logger.debug("End database session")
+
+# Async engine for the async route handlers, so their queries do not block the event loop
+def create_pooled_async_engine(async_url: str, name: str):
+  async_pool_options = {} if async_url.startswith("sqlite") else {
+    "pool_size": settings.DATABASE_POOL_SIZE,
+    "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+    "pool_recycle": settings.DATABASE_POOL_RECYCLE
+  }
+  new_engine = create_async_engine(
+    async_url,
+    echo = False,
+    pool_pre_ping = settings.DATABASE_POOL_PRE_PING,
+    **async_pool_options
+  )
+  instrument_engine(new_engine.sync_engine, name=name, leak_threshold_seconds=settings.DATABASE_POOL_LEAK_SECONDS)
+  return new_engine
+
+async_url = settings.ASYNC_DATABASE_URL or f"mssql+aioodbc:///?odbc_connect={params}"
+async_engine = create_pooled_async_engine(async_url, name="primary_async")
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+async def get_async_db():
+  async with AsyncSessionLocal() as session:
+    logger.debug("Start the async database session")
+    yield session
+  logger.debug("End async database session")
+
+
+# Read replica engines, they fall back to the primary engines when no replica is configured
+if settings.DATABASE_READ_HOSTNAME:
+  read_server = f'{settings.DATABASE_READ_HOSTNAME},{settings.DATABASE_READ_PORT or settings.DATABASE_PORT}'
+  read_params = build_odbc_params(read_server, read_only=True)
+  read_engine = create_pooled_engine(f"mssql+pyodbc:///?odbc_connect={read_params}", name="replica")
+  async_read_url = settings.ASYNC_DATABASE_READ_URL or f"mssql+aioodbc:///?odbc_connect={read_params}"
+  async_read_engine = create_pooled_async_engine(async_read_url, name="replica_async")
+  logger.info(f"Read only endpoints use the replica {read_server}")
+elif settings.ASYNC_DATABASE_READ_URL:
+  read_engine = engine
+  async_read_engine = create_pooled_async_engine(settings.ASYNC_DATABASE_READ_URL, name="replica_async")
+else:
+  read_engine = engine
+  async_read_engine = async_engine
+
+ReadSessionLocal = sessionmaker(bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, expire_on_commit=False)
+
+class ReadAfterWriteGuard():
+  """
+  Keeps reads on the primary for max_staleness_seconds after a write the
+  client expects to see right away (e.g. a goods receipt), longer than the
+  usual replica lag. The timestamp is per worker process: with several workers
+  the client carries its own marker (ReadAfterWriteMiddleware), or sends
+  X-Read-Consistency: primary.
+  """
+  def __init__(self, max_staleness_seconds: float):
+    self.max_staleness_seconds = max_staleness_seconds
+    self._last_write_at = 0.0
+    self._lock = threading.Lock()
+
+  def mark_write(self):
+    with self._lock:
+      self._last_write_at = time.monotonic()
+
+  def must_read_primary(self) -> bool:
+    if self.max_staleness_seconds <= 0:
+      return False
+    with self._lock:
+      return time.monotonic() - self._last_write_at < self.max_staleness_seconds
+
+read_after_write_guard = ReadAfterWriteGuard(settings.DATABASE_READ_MAX_STALENESS_SECONDS)
 
+# Time of the client's last write (epoch seconds), set on the write responses and sent back by the client
+LAST_WRITE_HEADER = "X-Last-Write-At"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+class ReadAfterWriteMiddleware():
+  """
+  ASGI middleware carrying the read-after-write marker with the client, so it holds
+  whichever worker serves the next request: successful write requests are answered
+  with X-Last-Write-At, and a read sending it back within max_staleness_seconds of
+  that time goes to the primary (see _use_primary_for_read).
+  """
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+      await self.app(scope, receive, send)
+      return
+
+    async def send_with_last_write(message):
+      if message["type"] == "http.response.start" and message["status"] < 400:
+        message.setdefault("headers", [])
+        message["headers"] = list(message["headers"]) + [(LAST_WRITE_HEADER.lower().encode("latin-1"), f"{time.time():.3f}".encode("latin-1"))]
+      await send(message)
+
+    await self.app(scope, receive, send_with_last_write)
+
+def _client_wrote_recently(request: Request) -> bool:
+  max_staleness_seconds = read_after_write_guard.max_staleness_seconds
+  if max_staleness_seconds <= 0:
+    return False
+  try:
+    last_write_at = float(request.headers.get(LAST_WRITE_HEADER, ""))
+  except ValueError:
+    return False
+  return time.time() - last_write_at < max_staleness_seconds
+
+def _use_primary_for_read(request: Request) -> bool:
+  # Clients can ask for a consistent read explicitly
+  if request.headers.get("X-Read-Consistency", "").lower() == "primary":
+    return True
+  return _client_wrote_recently(request) or read_after_write_guard.must_read_primary()
+
+def get_read_db(request: Request):
+  session = SessionLocal() if read_engine is engine or _use_primary_for_read(request) else ReadSessionLocal()
+  try:
+    logger.debug("Start the read database session")
+    yield session
+  finally:
+    session.close()
+    logger.debug("End read database session")
+
+async def get_async_read_db(request: Request):
+  session_factory = AsyncSessionLocal if async_read_engine is async_engine or _use_primary_for_read(request) else AsyncReadSessionLocal
+  async with session_factory() as session:
+    logger.debug("Start the async read database session")
+    yield session
+  logger.debug("End async read database session")
@@ -0,0 +1,72 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+
+def apply_counter_deltas(
+  db: Session,
+  model,
+  key_columns: tuple[str, ...],
+  deltas: dict[tuple, dict[str, int]],
+  retry_on_conflict: bool = True
+):
+  """
+  Increment counter columns of a pre-aggregated table inside the caller's transaction.
+
+  The rows are read with UPDLOCK + HOLDLOCK: on SQL Server the lock also covers the
+  key range of the rows that do not exist yet, so concurrent writers serialize on the
+  same keys, existing or not. Missing rows are created with the delta as their initial
+  value, in a savepoint: if another transaction created one of them in between (a
+  database without key range locks), those keys are read again and updated instead.
+  Nothing is committed here, the caller owns the transaction.
+
+  Args:
+      db (Session): session of the transaction writing the source rows
+      model: ORM class of the counter table
+      key_columns (tuple[str, ...]): attribute names forming the primary key, in key order
+      deltas (dict[tuple, dict[str, int]]): key tuple -> {counter column: delta}
+      retry_on_conflict (bool): retry the conflicting inserts once as updates
+  """
+  deltas = {key: values for key, values in deltas.items() if any(values.values())}
+  if not deltas:
+    return
+
+  # SQL Server has no tuple IN, so narrow with one IN per key column and match exactly in python
+  conditions = []
+  for index, column in enumerate(key_columns):
+    distinct_values = {key[index] for key in deltas}
+    conditions.append(getattr(model, column).in_(distinct_values))
+
+  stmt = (
+    select(model)
+    .where(*conditions)
+    .with_hint(model, "WITH (UPDLOCK, HOLDLOCK, ROWLOCK)", "mssql")
+    .with_for_update()
+  )
+  existing_rows = db.execute(stmt).scalars().all()
+  existing_map = {
+    tuple(getattr(row, column) for column in key_columns): row
+    for row in existing_rows
+  }
+
+  missing: dict[tuple, dict[str, int]] = {}
+  for key, values in deltas.items():
+    row = existing_map.get(key)
+    if row is None:
+      missing[key] = values
+      continue
+    for column, delta in values.items():
+      setattr(row, column, (getattr(row, column) or 0) + delta)
+  db.flush()
+  if not missing:
+    return
+
+  try:
+    # The updates above are flushed before the savepoint, a conflict only undoes the inserts
+    with db.begin_nested():
+      db.add_all([model(**dict(zip(key_columns, key)), **values) for key, values in missing.items()])
+  except IntegrityError:
+    if not retry_on_conflict:
+      raise
+    # Created by a concurrent transaction since the lookup: the rows exist now, update them
+    apply_counter_deltas(db, model, key_columns, missing, retry_on_conflict=False)
@@ -0,0 +1,168 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from collections import deque
+import threading
+import time
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Number of recent checkout waits kept for the percentiles
+WAIT_SAMPLE_SIZE = 1000
+
+class PoolMetrics():
+  """
+  Thread safe counters of one connection pool, filled by the pool events.
+  """
+  def __init__(self, name: str, leak_threshold_seconds: float):
+    self.name = name
+    self.leak_threshold_seconds = leak_threshold_seconds
+    self._lock = threading.Lock()
+    self._pool = None
+    self.connects = 0
+    self.checkouts = 0
+    self.checkins = 0
+    self.invalidations = 0
+    self.checkout_timeouts = 0
+    self.long_held_checkins = 0
+    self.max_checked_out = 0
+    self.max_overflow_used = 0
+    self.wait_count = 0
+    self.wait_total_seconds = 0.0
+    self.wait_max_seconds = 0.0
+    self._recent_waits: deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+    # id(connection record) -> (checkout monotonic time, thread name)
+    self._checked_out: dict[int, tuple[float, str]] = {}
+
+  def record_wait(self, seconds: float, timed_out: bool = False):
+    with self._lock:
+      self.wait_count += 1
+      self.wait_total_seconds += seconds
+      self.wait_max_seconds = max(self.wait_max_seconds, seconds)
+      self._recent_waits.append(seconds)
+      if timed_out:
+        self.checkout_timeouts += 1
+
+  def on_connect(self, dbapi_connection, connection_record):
+    with self._lock:
+      self.connects += 1
+
+  def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+    with self._lock:
+      self.checkouts += 1
+      self._checked_out[id(connection_record)] = (time.monotonic(), threading.current_thread().name)
+      self.max_checked_out = max(self.max_checked_out, len(self._checked_out))
+      if self._pool is not None:
+        self.max_overflow_used = max(self.max_overflow_used, self._pool.overflow())
+
+  def on_checkin(self, dbapi_connection, connection_record):
+    with self._lock:
+      self.checkins += 1
+      checkout = self._checked_out.pop(id(connection_record), None)
+    if checkout is None:
+      return
+    held_seconds = time.monotonic() - checkout[0]
+    if held_seconds > self.leak_threshold_seconds:
+      with self._lock:
+        self.long_held_checkins += 1
+      logger.warning(f"Connection of pool '{self.name}' was held for {held_seconds:.1f}s by thread {checkout[1]} (possible leaked session)")
+
+  def on_invalidate(self, dbapi_connection, connection_record, exception):
+    with self._lock:
+      self.invalidations += 1
+
+  def snapshot(self) -> dict:
+    """Current counters, pool state and the connections held longer than the leak threshold."""
+    now = time.monotonic()
+    with self._lock:
+      waits = sorted(self._recent_waits)
+      checked_out = list(self._checked_out.values())
+      data = {
+        "name": self.name,
+        "connects": self.connects,
+        "checkouts": self.checkouts,
+        "checkins": self.checkins,
+        "invalidations": self.invalidations,
+        "checkout_timeouts": self.checkout_timeouts,
+        "long_held_checkins": self.long_held_checkins,
+        "max_checked_out": self.max_checked_out,
+        "max_overflow_used": self.max_overflow_used,
+        "wait": {
+          "count": self.wait_count,
+          "total_ms": round(self.wait_total_seconds * 1000, 3),
+          "avg_ms": round(self.wait_total_seconds * 1000 / self.wait_count, 3) if self.wait_count else 0.0,
+          "max_ms": round(self.wait_max_seconds * 1000, 3),
+          "p50_ms": round(_percentile(waits, 0.50) * 1000, 3),
+          "p95_ms": round(_percentile(waits, 0.95) * 1000, 3),
+          "p99_ms": round(_percentile(waits, 0.99) * 1000, 3),
+        }
+      }
+    pool = self._pool
+    if isinstance(pool, QueuePool):
+      data["pool"] = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "timeout": pool.timeout(),
+      }
+    data["suspected_leaks"] = [
+      {"held_seconds": round(now - started_at, 1), "thread": thread_name}
+      for started_at, thread_name in checked_out
+      if now - started_at > self.leak_threshold_seconds
+    ]
+    return data
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+  if not sorted_values:
+    return 0.0
+  index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+  return sorted_values[index]
+
+class InstrumentedQueuePool(QueuePool):
+  """
+  QueuePool that reports how long each checkout waited for a connection.
+  The pool events only fire once a connection is handed out, so the wait
+  itself is timed around QueuePool._do_get.
+  """
+  metrics: PoolMetrics | None = None
+
+  def _do_get(self):
+    started_at = time.perf_counter()
+    try:
+      connection_record = super()._do_get()
+    except PoolTimeoutError:
+      if self.metrics:
+        self.metrics.record_wait(time.perf_counter() - started_at, timed_out=True)
+      raise
+    if self.metrics:
+      self.metrics.record_wait(time.perf_counter() - started_at)
+    return connection_record
+
+  def recreate(self):
+    # engine.dispose() swaps in a new pool, keep reporting to the same metrics
+    new_pool = super().recreate()
+    new_pool.metrics = self.metrics
+    if self.metrics:
+      self.metrics._pool = new_pool
+    return new_pool
+
+# engine name -> metrics, read by the internal metrics endpoint
+POOL_METRICS: dict[str, PoolMetrics] = {}
+
+def instrument_engine(engine: Engine, name: str, leak_threshold_seconds: float) -> PoolMetrics:
+  """
+  Attach the pool event listeners of an engine and register its metrics under name.
+  """
+  metrics = PoolMetrics(name=name, leak_threshold_seconds=leak_threshold_seconds)
+  metrics._pool = engine.pool
+  if isinstance(engine.pool, InstrumentedQueuePool):
+    engine.pool.metrics = metrics
+  event.listen(engine, "connect", metrics.on_connect)
+  event.listen(engine, "checkout", metrics.on_checkout)
+  event.listen(engine, "checkin", metrics.on_checkin)
+  event.listen(engine, "invalidate", metrics.on_invalidate)
+  POOL_METRICS[name] = metrics
+  return metrics
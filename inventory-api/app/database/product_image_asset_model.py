@@ -0,0 +1,35 @@
+from app.database.base import Base
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import Integer, String, DateTime, Index
+from datetime import datetime
+
+
+class ProductImageAsset(Base):
+  """
+  Stored product image per content hash (SHA-256 of the uploaded bytes) and storage
+  backend. An upload of bytes already stored reuses the image instead of sending
+  the file to the storage again.
+  """
+  __tablename__ = "ProductImageAsset"
+
+  ContentHash: Mapped[str] = mapped_column("ContentHash", String(64), primary_key=True)
+  Storage: Mapped[str] = mapped_column("Storage", String(20), primary_key=True)
+
+  ImageId: Mapped[str] = mapped_column("ImageId", String(255), nullable=False)
+  ImageUrl: Mapped[str] = mapped_column("ImageUrl", String(1000), nullable=False)
+  ThumbnailUrl: Mapped[str] = mapped_column("ThumbnailUrl", String(1000), nullable=True)
+  MediumUrl: Mapped[str] = mapped_column("MediumUrl", String(1000), nullable=True)
+  SizeBytes: Mapped[int] = mapped_column("SizeBytes", Integer, nullable=False)
+  # Uploads answered with this image, the first one included
+  UseCount: Mapped[int] = mapped_column("UseCount", Integer, nullable=False, default=1)
+
+  CreatedAt: Mapped[datetime] = mapped_column("CreatedAt", DateTime, default=datetime.utcnow, nullable=False)
+  LastUsedAt: Mapped[datetime] = mapped_column("LastUsedAt", DateTime, default=datetime.utcnow, nullable=False)
+
+  __table_args__ = (
+    # Forgetting an image when the storage deletes it
+    Index('ix_ProductImageAsset_ImageId', 'ImageId'),
+  )
+
+  def __repr__(self):
+    return f"<ProductImageAsset(ContentHash='{self.ContentHash}', Storage='{self.Storage}', ImageId='{self.ImageId}', UseCount={self.UseCount})>"
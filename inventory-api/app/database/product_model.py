@@ -1,7 +1,7 @@
 # In app/database/DBModel.py
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Float, Integer, DateTime, FLOAT
+from sqlalchemy import String, Float, Integer, DateTime, FLOAT, Index
 from datetime import datetime
 from app.database.base import Base
 from app.database.purchase_order_model import PurchaseOrderItem
@@ -16,7 +16,7 @@ class Product(Base):
   
   # Product Identity
   ProductId: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-  ModelNumber_SKU: Mapped[str] = mapped_column(String, nullable=False)
+  ModelNumber_SKU: Mapped[str] = mapped_column(String(255), nullable=False)
   ProductName: Mapped[str] = mapped_column(String(255), nullable=False)
   
   # General info
@@ -30,6 +30,9 @@ class Product(Base):
   # Media
   ProductImageId: Mapped[str] = mapped_column(String, nullable=True)
   ProductImageUrl: Mapped[str] = mapped_column(String, nullable=True)
+  # Downscaled copies of the image for the lists (null for images uploaded before them)
+  ProductImageThumbnailUrl: Mapped[str] = mapped_column(String, nullable=True)
+  ProductImageMediumUrl: Mapped[str] = mapped_column(String, nullable=True)
   
   # Technical stats
   PackageWeight_KG: Mapped[float] = mapped_column(FLOAT, nullable=True)
@@ -49,5 +52,11 @@ class Product(Base):
   assets: Mapped[list["Asset"]] = relationship(
     back_populates="product"
   )
+  __table_args__ = (
+    # Keyset pagination of the product list sorted by name
+    Index('ix_Product_ProductName_ProductId', 'ProductName', 'ProductId'),
+    # SKU lookup of the import, its key range locks cover only the SKUs read
+    Index('ix_Product_ModelNumber_SKU', 'ModelNumber_SKU'),
+  )
   class Config:
     from_attributes = True
\ No newline at end of file
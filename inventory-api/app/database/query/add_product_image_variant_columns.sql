@@ -0,0 +1,8 @@
+-- Downscaled image variants (thumbnail and medium) of the product images
+alter table Product
+add ProductImageThumbnailUrl NVARCHAR(1000) null,
+    ProductImageMediumUrl NVARCHAR(1000) null;
+
+alter table ProductImageAsset
+add ThumbnailUrl NVARCHAR(1000) null,
+    MediumUrl NVARCHAR(1000) null;
@@ -0,0 +1,26 @@
+-- Zones recorded on each stock move, read by the on-hand projection instead of Asset.CurrentZoneId
+ALTER TABLE StockMove
+ADD SourceZoneId INT NULL,
+    DestinationZoneId INT NULL;
+
+ALTER TABLE StockMove ADD CONSTRAINT FK_StockMove_SourceZone FOREIGN KEY (SourceZoneId) REFERENCES Zone(ZoneId);
+ALTER TABLE StockMove ADD CONSTRAINT FK_StockMove_DestinationZone FOREIGN KEY (DestinationZoneId) REFERENCES Zone(ZoneId);
+GO
+
+-- Backfill the goods receipt moves (from IN_TRANSIT = 3) with the zone their assets were put in,
+-- as goods_receipt.py records it on new moves.
+-- Receipts from a shipment manifest (the moves carry GoodsReceiptId): accepted units go to the
+-- default storage (7), declined ones to quarantine (14)
+UPDATE StockMove SET DestinationZoneId = 7
+WHERE GoodsReceiptId IS NOT NULL AND SourceLocationId = 3 AND DestinationLocationId = 4;
+
+UPDATE StockMove SET DestinationZoneId = 14
+WHERE GoodsReceiptId IS NOT NULL AND SourceLocationId = 3 AND DestinationLocationId = 7;
+
+-- Receipts from a purchase order (no GoodsReceiptId on their moves): the accepted and the declined
+-- assets are both created in the default storage (7)
+UPDATE StockMove SET DestinationZoneId = 7
+WHERE GoodsReceiptId IS NULL AND SourceLocationId = 3 AND DestinationLocationId IN (1, 7);
+
+-- The stored checkpoints were folded with the asset zones, the periodic job rebuilds them
+DELETE FROM StockCheckpoint;
@@ -0,0 +1,2 @@
+-- Keyset pagination of GET /products/?after=...&sort=product_name
+CREATE INDEX ix_Product_ProductName_ProductId ON Product (ProductName, ProductId);
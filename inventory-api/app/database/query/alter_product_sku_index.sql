@@ -0,0 +1,6 @@
+-- Product import: the SKU lookup takes UPDLOCK + HOLDLOCK, the key range locks of this index
+-- cover only the SKUs of the chunk (without it the scan locks the whole table).
+-- An index key cannot be NVARCHAR(MAX), the SKU gets the length of the other product texts
+ALTER TABLE Product ALTER COLUMN ModelNumber_SKU NVARCHAR(255) NOT NULL;
+GO
+CREATE INDEX ix_Product_ModelNumber_SKU ON Product (ModelNumber_SKU);
@@ -0,0 +1,12 @@
+-- Refresh tokens are stored as "hmac-sha256$<hex digest>" and looked up by TokenHash
+CREATE INDEX ix_RefreshToken_TokenHash ON RefreshToken (TokenHash);
+
+-- Rows written before the keyed digest hold a bcrypt hash ("$2b$..."). The API still
+-- accepts them (REFRESH_TOKEN_ACCEPT_LEGACY_HASH) and rotates each one to a digest on
+-- its first refresh. Expired legacy rows can never be used again:
+DELETE FROM RefreshToken
+WHERE TokenHash LIKE '$2%' AND ExpiresAt < GETUTCDATE();
+
+-- Once REFRESH_TOKEN_EXPIRE_DAYS have passed, no legacy row is still valid: remove the
+-- remaining ones and set REFRESH_TOKEN_ACCEPT_LEGACY_HASH=false
+-- DELETE FROM RefreshToken WHERE TokenHash LIKE '$2%';
@@ -0,0 +1,10 @@
+-- Jti/UserId lookup of the refresh route and the per user cap on live refresh tokens
+CREATE INDEX ix_RefreshToken_UserId_Jti_ExpiresAt ON RefreshToken (UserId, Jti, ExpiresAt);
+
+-- One-off cleanup before enabling the purge job, in batches to keep the locks short
+-- (the API then purges every REFRESH_TOKEN_PURGE_INTERVAL_MINUTES)
+WHILE 1 = 1
+BEGIN
+    DELETE TOP (1000) FROM RefreshToken WHERE ExpiresAt <= GETUTCDATE();
+    IF @@ROWCOUNT < 1000 BREAK;
+END;
@@ -0,0 +1,25 @@
+CREATE TABLE AssetStatusCounter (
+    PurchaseOrderId INT NOT NULL,
+    ProductId INT NOT NULL,
+    AssetStatus VARCHAR(20) NOT NULL,
+    AssetCount INT NOT NULL DEFAULT 0,
+    UpdatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_AssetStatusCounter PRIMARY KEY (PurchaseOrderId, ProductId, AssetStatus),
+    FOREIGN KEY (PurchaseOrderId) REFERENCES PurchaseOrder(PurchaseOrderId),
+    FOREIGN KEY (ProductId) REFERENCES Product(ProductId)
+);
+
+-- Backfill the counters from the existing assets (run once, before deploying the API)
+-- Assets are attached to their purchase order through the shipment manifest, or the PO line
+INSERT INTO AssetStatusCounter (PurchaseOrderId, ProductId, AssetStatus, AssetCount)
+SELECT
+    COALESCE(sm.PurchaseOrderId, poi.PurchaseOrderId) AS PurchaseOrderId,
+    a.ProductId,
+    a.AssetStatus,
+    COUNT(a.AssetId)
+FROM Asset a
+LEFT JOIN ShipmentManifestLine sml ON a.ShipmentManifestLineId = sml.Id
+LEFT JOIN ShipmentManifest sm ON sml.ShipmentManifestId = sm.Id
+LEFT JOIN PurchaseOrderItem poi ON a.PurchaseOrderLineId = poi.POItemId
+WHERE COALESCE(sm.PurchaseOrderId, poi.PurchaseOrderId) IS NOT NULL
+GROUP BY COALESCE(sm.PurchaseOrderId, poi.PurchaseOrderId), a.ProductId, a.AssetStatus;
@@ -0,0 +1,14 @@
+-- Content hash -> stored image index of the product image uploads (deduplication)
+CREATE TABLE ProductImageAsset (
+    ContentHash CHAR(64) NOT NULL,
+    Storage VARCHAR(20) NOT NULL,
+    ImageId NVARCHAR(255) NOT NULL,
+    ImageUrl NVARCHAR(1000) NOT NULL,
+    SizeBytes INT NOT NULL,
+    UseCount INT NOT NULL DEFAULT 1,
+    CreatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    LastUsedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_ProductImageAsset PRIMARY KEY (ContentHash, Storage)
+);
+
+CREATE INDEX ix_ProductImageAsset_ImageId ON ProductImageAsset (ImageId);
@@ -0,0 +1,29 @@
+CREATE TABLE StockBalance (
+    PurchaseOrderItemId INT NOT NULL,
+    LocationId INT NOT NULL,
+    Quantity INT NOT NULL DEFAULT 0,
+    ReceivedQuantity INT NOT NULL DEFAULT 0,
+    UpdatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_StockBalance PRIMARY KEY (PurchaseOrderItemId, LocationId),
+    FOREIGN KEY (PurchaseOrderItemId) REFERENCES PurchaseOrderItem(POItemId),
+    FOREIGN KEY (LocationId) REFERENCES Location(Id)
+);
+
+-- Backfill the balances from the existing StockMove ledger (run once, before deploying the API)
+INSERT INTO StockBalance (PurchaseOrderItemId, LocationId, Quantity, ReceivedQuantity)
+SELECT
+    moves.PurchaseOrderItemId,
+    moves.LocationId,
+    SUM(moves.Quantity),
+    SUM(moves.ReceivedQuantity)
+FROM (
+    SELECT PurchaseOrderItemId, DestinationLocationId AS LocationId, Quantity,
+           CASE WHEN SourceLocationId = 3 THEN Quantity ELSE 0 END AS ReceivedQuantity
+    FROM StockMove
+    WHERE PurchaseOrderItemId IS NOT NULL
+    UNION ALL
+    SELECT PurchaseOrderItemId, SourceLocationId AS LocationId, -Quantity, 0
+    FROM StockMove
+    WHERE PurchaseOrderItemId IS NOT NULL
+) moves
+GROUP BY moves.PurchaseOrderItemId, moves.LocationId;
@@ -0,0 +1,23 @@
+CREATE TABLE StockCheckpoint (
+    Id INT IDENTITY(1,1) PRIMARY KEY,
+    CreatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    HighWaterMarkMoveId INT NOT NULL,
+    LastMovementDate DATE NULL
+);
+
+CREATE INDEX IX_StockCheckpoint_HighWaterMark ON StockCheckpoint (HighWaterMarkMoveId DESC);
+
+CREATE TABLE StockCheckpointLine (
+    Id INT IDENTITY(1,1) PRIMARY KEY,
+    CheckpointId INT NOT NULL,
+    ProductId INT NOT NULL,
+    LocationId INT NOT NULL,
+    ZoneId INT NULL,
+    Quantity INT NOT NULL,
+    FOREIGN KEY (CheckpointId) REFERENCES StockCheckpoint(Id) ON DELETE CASCADE,
+    FOREIGN KEY (ProductId) REFERENCES Product(ProductId),
+    FOREIGN KEY (LocationId) REFERENCES Location(Id),
+    FOREIGN KEY (ZoneId) REFERENCES Zone(ZoneId)
+);
+
+CREATE INDEX IX_StockCheckpointLine_CheckpointId ON StockCheckpointLine (CheckpointId, ProductId);
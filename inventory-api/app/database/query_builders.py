@@ -0,0 +1,111 @@
+"""
+Core statements of the hot read paths.
+
+Each builder constructs its statement once (lru_cache) with named bind parameters,
+callers pass the values at execution time:
+
+    db.execute(manifest_lines_query(), {"manifest_id": manifest_id})
+
+The statement object is reused, so SQLAlchemy finds its compiled form in the
+engine's compiled cache instead of parsing and compiling SQL text on every call,
+and the SQL is rendered per dialect (SQL Server in production, SQLite for benchmarks).
+"""
+from sqlalchemy import select, func, case, bindparam, Select
+from functools import lru_cache
+from app.database.purchase_order_model import PurchaseOrder as PurchaseOrderORM
+from app.database.shipment_manifest_model import ShipmentManifest as ShipmentManifestORM, ShipmentManifestLine as ShipmentManifestLineORM
+from app.database.asset_model import Asset as AssetORM
+from app.database.product_model import Product as ProductORM
+
+# Asset statuses counted as received on a shipment manifest line
+MANIFEST_RECEIVED_STATUSES = ('Available', 'Awaiting QC')
+
+# Columns read by ProductPublic (SafetyStock and PrimarySupplierID are excluded from it).
+# Selecting them skips the eager PurchaseOrderItems join of the Product mapping, and
+# the PurchaseOrder, Supplier and User joins it brings, that ProductPublic never reads.
+PRODUCT_PUBLIC_COLUMNS = (
+  ProductORM.ProductId,
+  ProductORM.ModelNumber_SKU,
+  ProductORM.ProductName,
+  ProductORM.Category,
+  ProductORM.ProductSeries,
+  ProductORM.Manufacturer,
+  ProductORM.Measurement,
+  ProductORM.SellingPrice,
+  ProductORM.InternalPrice,
+  ProductORM.ProductImageId,
+  ProductORM.ProductImageUrl,
+  ProductORM.ProductImageThumbnailUrl,
+  ProductORM.ProductImageMediumUrl,
+  ProductORM.PackageWeight_KG,
+  ProductORM.Dimensions_H_CM,
+  ProductORM.Dimensions_W_CM,
+  ProductORM.Dimensions_D_CM,
+  ProductORM.WarrantyPeriod_Days
+)
+
+@lru_cache(maxsize=None)
+def purchase_order_status_query() -> Select:
+  """Params: po_id"""
+  return select(
+    PurchaseOrderORM.PurchaseOrderId,
+    PurchaseOrderORM.Status
+  ).where(PurchaseOrderORM.PurchaseOrderId == bindparam("po_id"))
+
+@lru_cache(maxsize=None)
+def product_public_query() -> Select:
+  """
+  Products as rows of PRODUCT_PUBLIC_COLUMNS, validated by ProductPublic like ORM objects.
+  Callers add their order, filters and paging, e.g. .order_by(ProductORM.ProductId).limit(n)
+  """
+  return select(*PRODUCT_PUBLIC_COLUMNS)
+
+@lru_cache(maxsize=None)
+def product_public_by_id_query() -> Select:
+  """Params: product_id"""
+  return product_public_query().where(ProductORM.ProductId == bindparam("product_id"))
+
+@lru_cache(maxsize=None)
+def manifest_header_query() -> Select:
+  """Params: manifest_id"""
+  return select(
+    ShipmentManifestORM.Id,
+    ShipmentManifestORM.SupplierId,
+    ShipmentManifestORM.PurchaseOrderId,
+    ShipmentManifestORM.TrackingNumber,
+    ShipmentManifestORM.CarrierName,
+    ShipmentManifestORM.EstimatedArrival,
+    ShipmentManifestORM.CreatedByUserId,
+    ShipmentManifestORM.Status
+  ).where(ShipmentManifestORM.Id == bindparam("manifest_id"))
+
+@lru_cache(maxsize=None)
+def manifest_lines_query() -> Select:
+  """
+  Lines of a shipment manifest with the product name and the number of received assets.
+  Params: manifest_id
+  """
+  received_asset = case(
+    (AssetORM.AssetStatus.in_(MANIFEST_RECEIVED_STATUSES), 1),
+    else_=0
+  )
+  return (
+    select(
+      ShipmentManifestLineORM.Id,
+      ShipmentManifestLineORM.SupplierSku,
+      ShipmentManifestLineORM.QuantityDeclared,
+      ShipmentManifestLineORM.ReceivingStrategy,
+      func.max(ProductORM.ProductName).label("ProductName"),
+      func.coalesce(func.sum(received_asset), 0).label("QuantityReceived")
+    )
+    .select_from(ShipmentManifestLineORM)
+    .outerjoin(AssetORM, ShipmentManifestLineORM.Id == AssetORM.ShipmentManifestLineId)
+    .outerjoin(ProductORM, AssetORM.ProductId == ProductORM.ProductId)
+    .where(ShipmentManifestLineORM.ShipmentManifestId == bindparam("manifest_id"))
+    .group_by(
+      ShipmentManifestLineORM.Id,
+      ShipmentManifestLineORM.SupplierSku,
+      ShipmentManifestLineORM.QuantityDeclared,
+      ShipmentManifestLineORM.ReceivingStrategy
+    )
+  )
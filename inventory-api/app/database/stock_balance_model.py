@@ -0,0 +1,27 @@
+from app.database.base import Base
+from sqlalchemy.orm import mapped_column, Mapped
+from sqlalchemy import Integer, DateTime, ForeignKey
+from datetime import datetime
+
+
+class StockBalance(Base):
+  """
+  Running balance of the StockMove ledger per purchase order item and location.
+  Every StockMove insert applies its delta here in the same transaction, so the
+  procurement checks read O(lines) rows instead of aggregating the whole ledger.
+  """
+  __tablename__ = "StockBalance"
+
+  PurchaseOrderItemId: Mapped[int] = mapped_column("PurchaseOrderItemId", Integer, ForeignKey("PurchaseOrderItem.POItemId"), primary_key=True)
+  LocationId: Mapped[int] = mapped_column("LocationId", Integer, ForeignKey("Location.Id"), primary_key=True)
+
+  # Net quantity sitting in this location right now (inflow - outflow)
+  Quantity: Mapped[int] = mapped_column("Quantity", Integer, nullable=False, default=0)
+
+  # Cumulative quantity that arrived in this location straight from In Transit
+  ReceivedQuantity: Mapped[int] = mapped_column("ReceivedQuantity", Integer, nullable=False, default=0)
+
+  UpdatedAt: Mapped[datetime] = mapped_column("UpdatedAt", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+  def __repr__(self):
+    return f"<StockBalance(PurchaseOrderItemId={self.PurchaseOrderItemId}, LocationId={self.LocationId}, Quantity={self.Quantity})>"
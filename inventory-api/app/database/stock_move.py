@@ -14,6 +14,9 @@ class StockMove (Base):
   MovementDate: Mapped[date | None] = mapped_column("MovementDate", Date, nullable= True)
   SourceLocationId: Mapped[int] = mapped_column("SourceLocationId",Integer, ForeignKey("Location.Id"), nullable=False)
   DestinationLocationId: Mapped[int] = mapped_column("DestinationLocationId",Integer,ForeignKey("Location.Id"), nullable=False)
+  # Zones the units left and entered, recorded with the move (NULL: no zone, e.g. in transit)
+  SourceZoneId: Mapped[int | None] = mapped_column("SourceZoneId", Integer, ForeignKey("Zone.ZoneId"), nullable=True)
+  DestinationZoneId: Mapped[int | None] = mapped_column("DestinationZoneId", Integer, ForeignKey("Zone.ZoneId"), nullable=True)
   AssetLinks: Mapped[list["AssetStockMove"]] = relationship(back_populates="stock_move")
   SourceLocation = relationship(
         "Location", 
@@ -0,0 +1,47 @@
+from app.database.base import Base
+from typing import Optional
+from sqlalchemy.orm import mapped_column, Mapped, relationship
+from sqlalchemy import Integer, Date, DateTime, ForeignKey
+from datetime import date, datetime
+
+
+class StockCheckpoint(Base):
+  """
+  Periodic checkpoint of the on-hand projection.
+  It contains the effect of every StockMove with Id <= HighWaterMarkMoveId,
+  so an on-hand or as-of query only replays the moves written after it.
+  """
+  __tablename__ = "StockCheckpoint"
+
+  Id: Mapped[int] = mapped_column("Id", Integer, primary_key=True, autoincrement=True, nullable=False)
+  CreatedAt: Mapped[datetime] = mapped_column("CreatedAt", DateTime, default=datetime.utcnow, nullable=False)
+
+  # Ledger high-water mark: last StockMove.Id folded into this checkpoint
+  HighWaterMarkMoveId: Mapped[int] = mapped_column("HighWaterMarkMoveId", Integer, nullable=False)
+
+  # Latest MovementDate among the folded moves, used to pick the checkpoint of an as-of query
+  LastMovementDate: Mapped[Optional[date]] = mapped_column("LastMovementDate", Date, nullable=True)
+
+  lines: Mapped[list["StockCheckpointLine"]] = relationship(
+    back_populates="checkpoint",
+    cascade="all, delete-orphan"
+  )
+
+  def __repr__(self):
+    return f"<StockCheckpoint(Id={self.Id}, HighWaterMarkMoveId={self.HighWaterMarkMoveId})>"
+
+class StockCheckpointLine(Base):
+  """
+  On-hand quantity of one product in one location and zone at the checkpoint.
+  ZoneId is NULL for moves that are not linked to any asset.
+  """
+  __tablename__ = "StockCheckpointLine"
+
+  Id: Mapped[int] = mapped_column("Id", Integer, primary_key=True, autoincrement=True, nullable=False)
+  CheckpointId: Mapped[int] = mapped_column("CheckpointId", Integer, ForeignKey("StockCheckpoint.Id"), nullable=False, index=True)
+  ProductId: Mapped[int] = mapped_column("ProductId", Integer, ForeignKey("Product.ProductId"), nullable=False)
+  LocationId: Mapped[int] = mapped_column("LocationId", Integer, ForeignKey("Location.Id"), nullable=False)
+  ZoneId: Mapped[Optional[int]] = mapped_column("ZoneId", Integer, ForeignKey("Zone.ZoneId"), nullable=True)
+  Quantity: Mapped[int] = mapped_column("Quantity", Integer, nullable=False)
+
+  checkpoint: Mapped["StockCheckpoint"] = relationship(back_populates="lines")
@@ -1,7 +1,7 @@
 # app/database/models.py (Corrected version)
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship# Keep these
-from sqlalchemy import String, Integer, DateTime, CheckConstraint, text, ForeignKey # Import DateTime and text
+from sqlalchemy import String, Integer, DateTime, CheckConstraint, text, ForeignKey, Index # Import DateTime and text
 from datetime import datetime
 from typing import Optional, List # Keep Optional for nullable fields
 from app.database.base import Base
@@ -66,9 +66,14 @@ class RefreshToken(Base):
   __tablename__ = 'RefreshToken'
   Id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True, autoincrement=True)
   Jti: Mapped[str] = mapped_column(String(36), nullable=False, unique=True)  # Corrected to String
-  TokenHash: Mapped[str] = mapped_column(String(255), nullable=False)
+  # "hmac-sha256$<hex digest>" (see app/services/auth/refresh_token.py), bcrypt on older rows
+  TokenHash: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
   UserId: Mapped[int] = mapped_column(Integer, ForeignKey('User.UserId'), nullable=False)
   ExpiresAt: Mapped[datetime] = mapped_column(DateTime, nullable=False)
   user: Mapped["User"] = relationship(
         back_populates="refresh_tokens"
-    )
\ No newline at end of file
+    )
+  __table_args__ = (
+    # Jti/UserId lookup of the refresh route, per user cap and expiry purge
+    Index('ix_RefreshToken_UserId_Jti_ExpiresAt', 'UserId', 'Jti', 'ExpiresAt'),
+  )
\ No newline at end of file
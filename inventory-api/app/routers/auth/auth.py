@@ -5,8 +5,7 @@ from sqlalchemy import select
 import sqlalchemy
 from sqlalchemy.exc import IntegrityError
 from app.database.connection import get_db
-from app.database.user_model import User as UserORM, RefreshToken as RefreshTokenORM
-from passlib.context import CryptContext
+from app.database.user_model import User as UserORM
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from app.schemas.user import UserLogin
@@ -14,8 +13,9 @@ from app.schemas.refresh_token import RefreshToken
 from app.utils.random_string import generate_random_string
 from app.utils.dependencies import get_current_user
 from app.utils.logger import setup_logger
+from app.services.auth.refresh_token import RefreshTokenService
+from app.services.password_hasher import password_hasher
 import os
-import secrets
 # from app.schemas.user import UserLogin
 # Declare the router
 router = APIRouter(
@@ -24,8 +24,6 @@ router = APIRouter(
 )
 # Declare logger for debugging
 logger = setup_logger()
-# Declare the Encrypt model
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") 
 # The JWT settings
 # Automatically generate a token
 SECRET_KEY = str(os.getenv('SECRET_KEY'))
@@ -51,16 +49,6 @@ def create_access_token (input_data: dict, time_delta: timedelta |None = None):
   access_token = jwt.encode(to_encoded_data, SECRET_KEY, ALGORITHM)
   return access_token
 
-def create_refresh_token(user_id: int):
-  jti = secrets.token_hex(18)
-  expires_delta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-  expires_at = datetime.now(timezone.utc) + expires_delta
-
-  to_encode = {"UserId": user_id, "Jti": jti, "exp": expires_at}
-  logger.info(f'Encode with Agorithm {ALGORITHM}')
-  refresh_token = jwt.encode(to_encode, SECRET_KEY, ALGORITHM)
-  return refresh_token, jti, expires_at
-
 @router.post('/login')
 def login_user_with_json(UserLogin: UserLogin = None,
                db:Session = Depends(get_db)):
@@ -87,7 +75,8 @@ def process_login_user (Username:str,
               status_code=status.HTTP_401_UNAUTHORIZED,
               detail="Incorrect username or password",
           )
-    if not pwd_context.verify(Password, found_user.PasswordHash):
+    # bcrypt runs in the hashing pool, a full pool answers 503 + Retry-After
+    if not password_hasher.verify(Password, found_user.PasswordHash):
       raise HTTPException(
               status_code=status.HTTP_401_UNAUTHORIZED,
               detail="Incorrect username or password",
@@ -101,18 +90,9 @@ def process_login_user (Username:str,
     time_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(input_data= access_token_payload, time_delta=time_delta)
     
-    refresh_token, refresh_token_jti, expires_at = create_refresh_token(user_id=found_user.UserId)
-    # Save new refresh token (hashed) to database
-    refresh_token_hashed = pwd_context.hash(refresh_token)
-    new_refresh_token_record = RefreshTokenORM (
-      Jti = refresh_token_jti,
-      TokenHash = refresh_token_hashed,
-      UserId = found_user.UserId,
-      ExpiresAt = expires_at
-    )
-    db.add(new_refresh_token_record)
+    # Save new refresh token (keyed digest) to database
+    refresh_token = RefreshTokenService(db).issue(user_id=found_user.UserId)
     db.commit()
-    db.refresh(new_refresh_token_record)
   except IntegrityError as e:
     db.rollback() # Rollback on error
     # Catch the specific error for a duplicate username
@@ -150,51 +130,33 @@ def refresh_token(request_data: RefreshToken, db: Session = Depends(get_db)):
   
   
   # if succeed continue to check if received refresh token match with old refresh token in db
+  refresh_token_service = RefreshTokenService(db)
   try:
-    result = db.query(RefreshTokenORM,UserORM).filter(
-      RefreshTokenORM.UserId == UserORM.UserId,
-      RefreshTokenORM.Jti == Jti,
-      RefreshTokenORM.UserId == int(UserId)).one_or_none()
-    # Check if the return tuple is empty
-    if not result:
-      raise HTTPException(status_code=401, detail='Invalid or used refresh token')
+    old_refresh_token = refresh_token_service.find(request_data.Token, user_id=int(UserId), jti=Jti)
     # if not throw error that in matching refresh token
-    old_refresh_token, found_user = result
     if not old_refresh_token:
       raise HTTPException(status_code=401, detail='Invalid or used refresh token')
-    logger.info(f'Can see the refresh token: {request_data.Token } and the hash: {old_refresh_token.TokenHash}')
-    if not pwd_context.verify(request_data.Token, old_refresh_token.TokenHash):
-      raise HTTPException(status_code=401, detail='Invalid or used refresh token | can not veify hash')
-    # Remove existing refresh token
-    db.delete(old_refresh_token)
-    db.commit()
-  except IntegrityError as e:
+    found_user = db.get(UserORM, old_refresh_token.UserId)
+    if not found_user:
+      raise HTTPException(status_code=401, detail='Invalid or used refresh token')
+  except sqlalchemy.exc.SQLAlchemyError as e:
     raise HTTPException(status_code=400, detail=f"Error when finding refresh token")
-      # if success give user new access token and refresh token
   # Create new access token and refresh token if refresh token is valid
   try:
-    # Find that user
     new_access_token_payload = {
       "sub": found_user.Username,
       'UserId': UserId
     }
     new_access_token = create_access_token(input_data= new_access_token_payload, 
                                            time_delta=timedelta(ACCESS_TOKEN_EXPIRE_MINUTES))
-    new_refresh_token, new_jti, new_expires_at = create_refresh_token(user_id=UserId)
-    # We must hashed the new refresh token before save to db
-    new_refresh_token_hash = pwd_context.hash(new_refresh_token)
-    # Save new record to db
-    new_refresh_token_record = RefreshTokenORM(
-      Jti=new_jti,
-      TokenHash=new_refresh_token_hash,
-      UserId=found_user.UserId,
-      ExpiresAt = new_expires_at
-  )
-    db.add(new_refresh_token_record)
+    # Remove the used refresh token and save its replacement in the same transaction
+    new_refresh_token = refresh_token_service.rotate(old_refresh_token)
     db.commit()
   except IntegrityError as e:
+    db.rollback()
     raise HTTPException(status_code= 400, detail= f"Error when saving new refresh token to db: {e}")
   except Exception as e:
+    db.rollback()
     raise HTTPException(status_code=500, detail=f'Unexpected error when create new tokens: {e}')
   return {
     'refresh_token' :new_refresh_token,
@@ -7,16 +7,15 @@ from typing import List
 from app.database.user_model import User as UserORM
 import sqlalchemy
 from app.database.connection import get_db
-from passlib.context import CryptContext
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_user, invalidate_cached_user
+from app.services.password_hasher import password_hasher
 
 router = APIRouter(
 	prefix= '/users',
 	tags =['users']
 )
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 @router.get("/", response_model=List[UserPublic])
 def get_all_users(db: Session = Depends(get_db)):
 	try:
@@ -47,7 +46,7 @@ def create_user (user_data: UserCreate,
 		found_user = query.one_or_none()
 		if found_user:
 			raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
-		input_hashed_password = pwd_context.hash(user_data.password)
+		input_hashed_password = password_hasher.hash(user_data.password)
 		new_user = UserORM(
             Username=user_data.username,
             PasswordHash=input_hashed_password,
@@ -58,6 +57,9 @@ def create_user (user_data: UserCreate,
 		db.add(new_user)
 		db.commit()
 		db.refresh(new_user)
+	except HTTPException:
+		db.rollback()
+		raise
 	except IntegrityError as e:
 		db.rollback() # Rollback on error
 		# Catch the specific error for a duplicate username
@@ -80,17 +82,22 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
     user_orm = db.query(UserORM).filter(UserORM.UserId == user_id).first()
     if not user_orm:
       raise HTTPException(status_code=404, detail="User not found")
+    previous_username = user_orm.Username
 
     # 2. THE INTERMEDIATE LAYER IN ACTION
     # The schema converts itself and updates the ORM object
-    user_orm = user_update.apply_to_orm(user_orm, pwd_context=pwd_context)
+    user_orm = user_update.apply_to_orm(user_orm, pwd_context=password_hasher)
 
     # 3. Save
     db.commit()
     db.refresh(user_orm)
+    invalidate_cached_user(user_id=user_id, username=previous_username)
     
     # 4. Return (FastAPI uses AutoReadSchema to convert Pascal -> Snake for JSON)
     return user_orm
+  except HTTPException:
+    db.rollback()
+    raise
   except sqlalchemy.exc.SQLalchemyError as e:
     db.rollback()
     raise HTTPException(status_code=500, detail=f"Database error: {e}")
@@ -108,6 +115,7 @@ def delete_user(
     user = db.query(UserORM).filter(UserORM.UserId == user_id).one_or_none()
     db.delete(user)
     db.commit()    
+    invalidate_cached_user(user_id=user_id)
   except sqlalchemy.exc.SQLAlchemyError as e:
     db.rollback()
     raise HTTPException(status_code=500, detail =f'Database error {e}')
@@ -2,6 +2,7 @@ from typing import List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, selectinload, joinedload
 from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from enum import Enum
 from datetime import datetime, date
 from collections import Counter
@@ -16,6 +17,7 @@ from app.database.purchase_order_model import PurchaseOrder as PurchaseOrderORM,
 from app.database.warehouse_zone_model import Zone as ZoneORM
 from app.database.user_model import User as UserORM
 from app.database.good_receipt_model import GoodsReceipt as GoodsReceiptORM
+from app.database.query_builders import manifest_header_query, manifest_lines_query
 # Assuming these are available:
 from app.schemas.shipment import (
 
@@ -35,7 +37,7 @@ ShipmentReceptionInput,
 FinalizeManifestItem
 )
 from app.schemas.base import StandardResponse
-from app.utils.dependencies import get_db, get_current_user
+from app.utils.dependencies import get_db, get_async_db, get_async_read_db, get_current_user
 from app.utils.logger import setup_logger
 from app.utils.random_string import generate_random_string
 
@@ -54,20 +56,12 @@ logger = setup_logger()
 )
 async def get_manifest_lines_raw_sql(
     manifest_id: int, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # ---------------------------------------------------------
     # 1. Fetch the Manifest Header
     # ---------------------------------------------------------
-    header_query = text("""
-        SELECT 
-            Id, SupplierId, PurchaseOrderId, TrackingNumber, 
-            CarrierName, EstimatedArrival, CreatedByUserId, Status
-        FROM ShipmentManifest 
-        WHERE Id = :manifest_id
-    """)
-    
-    header_row = db.execute(header_query, {"manifest_id": manifest_id}).mappings().first()
+    header_row = (await db.execute(manifest_header_query(), {"manifest_id": manifest_id})).mappings().first()
 
     if not header_row:
         raise HTTPException(
@@ -78,25 +72,7 @@ async def get_manifest_lines_raw_sql(
     # ---------------------------------------------------------
     # 2. Fetch Aggregated Lines
     # ---------------------------------------------------------
-    lines_query = text("""
-        SELECT 
-            sml.Id,
-            sml.SupplierSku,
-            sml.QuantityDeclared,
-            sml.ReceivingStrategy,
-            MAX(p.ProductName) AS ProductName,
-            SUM(CASE 
-                WHEN a.AssetStatus IN ('Available', 'Awaiting QC') THEN 1 
-                ELSE 0 
-            END) AS QuantityReceived
-        FROM ShipmentManifestLine sml
-        LEFT JOIN Asset a ON sml.Id = a.ShipmentManifestLineId
-        LEFT JOIN Product p ON a.ProductId = p.ProductId
-        WHERE sml.ShipmentManifestId = :manifest_id
-        GROUP BY sml.Id, sml.SupplierSku, sml.QuantityDeclared, sml.ReceivingStrategy
-    """)
-
-    line_rows = db.execute(lines_query, {"manifest_id": manifest_id}).mappings().all()
+    line_rows = (await db.execute(manifest_lines_query(), {"manifest_id": manifest_id})).mappings().all()
 
     # ---------------------------------------------------------
     # 3. Construct Response (Safe Access)
@@ -153,13 +129,13 @@ async def get_manifest_lines_raw_sql(
 async def verify_assets(
     line_id: int,
     asset_inputs: list[AssetInput],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     # Check if the shipment line id exist
-    line_id_orm = db.execute(select(ShipmentManifestLine.Id).where(
+    line_id_orm = (await db.execute(select(ShipmentManifestLine.Id).where(
         ShipmentManifestLine.Id == line_id
-    )).scalars().first()
+    ))).scalars().first()
     
     if not line_id_orm:
         raise HTTPException(
@@ -187,7 +163,7 @@ async def verify_assets(
                                      AssetORM.AssetStatus == "In Transit",
                                      AssetORM.ShipmentManifestLineId == line_id
                                  )
-    assets_orm = db.execute(asset_serials_query).mappings().all()
+    assets_orm = (await db.execute(asset_serials_query)).mappings().all()
     # handle if shipment line doesn't have any assets
     if len(assets_orm) == 0:
         raise HTTPException(status_code=400, detail="Shipment line id doesn't has any asset record")
@@ -214,7 +190,7 @@ async def verify_assets(
 )
 async def verify_assets_uniqueness(
     asset_inputs: list[AssetInput],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
         
@@ -236,7 +212,7 @@ async def verify_assets_uniqueness(
     asset_serials_query = select(AssetORM.SerialNumber).where(
                                      AssetORM.SerialNumber.in_(input_asset_serials),
                                  )
-    assets_orm = db.execute(asset_serials_query).mappings().all()
+    assets_orm = (await db.execute(asset_serials_query)).mappings().all()
     # handle if shipment line doesn't have any assets
     if len(assets_orm) == 0:
         return AssetUniquenessVerifyResponse(
@@ -268,57 +244,56 @@ async def search_manifests(
     tracking_number: Optional[str] = Query(None, description="Partial match for Tracking Number"),
     date_from: Optional[date] = Query(None, description="Arrival date from (inclusive)"),
     date_to: Optional[date] = Query(None, description="Arrival date to (inclusive)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     logger.info(f"Searching manifests. Params: ID={manifest_id}, Supplier={supplier_name}/{supplier_id}")
 
     try:
         # 1. Base Query: The "In Transit" Logic
-        query = (
-            db.query(ShipmentManifest)
-            .join(ShipmentManifest.manifest_lines)
+        # Manifests having at least one asset still In Transit (subquery instead of join + distinct)
+        in_transit_manifest_ids = (
+            select(ShipmentManifestLine.ShipmentManifestId)
             .join(ShipmentManifestLine.assets)
+            .where(AssetORM.AssetStatus == "In Transit")
+        )
+        query = (
+            select(ShipmentManifest, SupplierORM.SupplierName)
             # Join Supplier for filtering and fetching the name
             .join(SupplierORM, ShipmentManifest.SupplierId == SupplierORM.SupplierId)
-            .filter(ShipmentManifest.Status == "posted")
-            .filter(AssetORM.AssetStatus == "In Transit")
+            .where(ShipmentManifest.Status == "posted")
+            .where(ShipmentManifest.Id.in_(in_transit_manifest_ids))
+            # Lines are counted below, load them up front (no lazy load on an async session)
+            .options(selectinload(ShipmentManifest.manifest_lines))
         )
 
         # 2. Apply Dynamic Filters
         if manifest_id:
             logger.info(f"Just searching with manifest id: {manifest_id}")
-            query = query.filter(ShipmentManifest.Id == manifest_id)
+            query = query.where(ShipmentManifest.Id == manifest_id)
         # Skipp searching other condition if already has manifest id
         else:
             if supplier_id:
-                query = query.filter(ShipmentManifest.SupplierId == supplier_id)
+                query = query.where(ShipmentManifest.SupplierId == supplier_id)
             if supplier_name:
-                query = query.filter(SupplierORM.SupplierName.ilike(f"%{supplier_name}%"))
+                query = query.where(SupplierORM.SupplierName.ilike(f"%{supplier_name}%"))
 
             if tracking_number:
-                query = query.filter(ShipmentManifest.TrackingNumber.ilike(f"%{tracking_number}%"))
+                query = query.where(ShipmentManifest.TrackingNumber.ilike(f"%{tracking_number}%"))
 
             if date_from:
-                query = query.filter(ShipmentManifest.EstimatedArrival >= date_from)
+                query = query.where(ShipmentManifest.EstimatedArrival >= date_from)
             if date_to:
-                query = query.filter(ShipmentManifest.EstimatedArrival <= date_to)
+                query = query.where(ShipmentManifest.EstimatedArrival <= date_to)
 
-        # 3. Execute & Deduplicate
-        manifests = query.distinct().all()
-        logger.info(f"Seeing list of manifests: {manifests}")
+        # 3. Execute
+        manifest_rows = (await db.execute(query)).all()
+        logger.info(f"Found {len(manifest_rows)} manifests")
 
         # 4. Map to Response (using snake_case arguments)
         results = []
-        for man in manifests:
-            # Fetch Supplier Name explicitly or access via relationship if configured
-            supp_name = "Unknown"
-            
-            # Since we performed an inner join on Supplier, the record typically exists.
-            # If you have a lazy-loaded relationship: supp_name = man.supplier.SupplierName
-            # Otherwise, a quick safe lookup (or optimization via add_entity in the query):
-            supplier_obj = db.query(SupplierORM).filter(SupplierORM.SupplierId == man.SupplierId).first()
-            if supplier_obj:
-                supp_name = supplier_obj.SupplierName
+        for man, supplier_name_db in manifest_rows:
+            # Supplier name comes with the inner join on Supplier
+            supp_name = supplier_name_db or "Unknown"
 
             item_count = len(man.manifest_lines) if man.manifest_lines else 0
 
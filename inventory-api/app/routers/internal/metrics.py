@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, status, Query
+from app.utils.dependencies import get_current_user, get_current_admin
+from app.utils.logger import setup_logger
+from app.database.user_model import User as UserORM
+from app.database.pool_monitor import POOL_METRICS
+from app.utils.slow_query_log import slow_query_log
+from app.utils.ttl_cache import CACHES
+from app.utils.resource_version import RESOURCE_VERSIONS
+from app.services.password_hasher import password_hasher
+from app.services.image_upload_queue import image_upload_queue
+from app.services.socket_manager import CONNECTION_MANAGERS
+from app.services.broadcast_backplane import broadcast_backplane
+from typing import Literal
+
+logger = setup_logger()
+
+# Statement texts with their parameters, pool and cache state: administrators only
+router = APIRouter(prefix='/internal', tags=['internal'], dependencies=[Depends(get_current_admin)])
+
+
+@router.get('/metrics/pool',
+            status_code=status.HTTP_200_OK,
+            description="Connection pool state, checkout wait times and suspected leaked sessions per engine")
+def get_pool_metrics(current_user: UserORM = Depends(get_current_user)):
+  return {name: metrics.snapshot() for name, metrics in POOL_METRICS.items()}
+
+@router.get('/metrics/caches',
+            status_code=status.HTTP_200_OK,
+            description="Size, hit/miss and eviction counters of the in-process caches")
+def get_cache_metrics(current_user: UserORM = Depends(get_current_user)):
+  return {name: cache.stats() for name, cache in CACHES.items()}
+
+@router.get('/metrics/etags',
+            status_code=status.HTTP_200_OK,
+            description="Version, bumps and 304 ratio of the ETag protected lists")
+def get_etag_metrics(current_user: UserORM = Depends(get_current_user)):
+  return {name: version.stats() for name, version in RESOURCE_VERSIONS.items()}
+
+@router.get('/metrics/password-hasher',
+            status_code=status.HTTP_200_OK,
+            description="Password hashing pool: operations in flight, queue length, rejections and average wait/run times")
+def get_password_hasher_metrics(current_user: UserORM = Depends(get_current_user)):
+  return password_hasher.stats()
+
+@router.get('/metrics/image-uploads',
+            status_code=status.HTTP_200_OK,
+            description="Background image upload queue: jobs waiting and running, outcomes and average upload time")
+def get_image_upload_metrics(current_user: UserORM = Depends(get_current_user)):
+  return image_upload_queue.stats()
+
+@router.get('/metrics/websockets',
+            status_code=status.HTTP_200_OK,
+            description="Websocket fan-out per endpoint: clients, outbound queue depth, send latency and evictions")
+def get_websocket_metrics(current_user: UserORM = Depends(get_current_user)):
+  return {name: manager.stats() for name, manager in CONNECTION_MANAGERS.items()}
+
+@router.get('/metrics/broadcast',
+            status_code=status.HTTP_200_OK,
+            description="Broadcast backplane between the workers: channels, messages published and received, errors")
+def get_broadcast_metrics(current_user: UserORM = Depends(get_current_user)):
+  return broadcast_backplane.stats()
+
+@router.get('/metrics/slow-queries',
+            status_code=status.HTTP_200_OK,
+            description="Slow statements of the in-memory buffer aggregated per route and statement, top N first")
+def get_slow_queries(
+  current_user: UserORM = Depends(get_current_user),
+  top: int = Query(20, ge=1, le=500, description="Number of statements to return"),
+  order_by: Literal['total_ms', 'max_ms', 'avg_ms', 'count'] = Query('total_ms', description="Sort key")
+):
+  return {
+    **slow_query_log.stats(),
+    "top": slow_query_log.top(limit=top, order_by=order_by)
+  }
+
+@router.get('/metrics/slow-queries/recent',
+            status_code=status.HTTP_200_OK,
+            description="Latest slow statements with their route, duration, row count and redacted parameters")
+def get_recent_slow_queries(
+  current_user: UserORM = Depends(get_current_user),
+  limit: int = Query(50, ge=1, le=500, description="Number of statements to return")
+):
+  return slow_query_log.recent(limit=limit)
+
+@router.delete('/metrics/slow-queries',
+               status_code=status.HTTP_204_NO_CONTENT,
+               description="Empty the in-memory slow query buffer (the log file is kept)")
+def clear_slow_queries(current_user: UserORM = Depends(get_current_user)):
+  slow_query_log.clear()
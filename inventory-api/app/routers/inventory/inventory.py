@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, status, HTTPException, Query
+from app.utils.dependencies import get_db, get_current_user
+from app.utils.logger import setup_logger
+from app.database.user_model import User as UserORM
+from app.schemas.inventory import OnHandResponse, StockCheckpointPublic
+from app.services.inventory.stock_snapshot import StockSnapshotService
+from app.services.inventory.asset_export import AssetExportFilter, iter_asset_export
+from app.services.enum import LocationID, AssetStatus
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime
+from typing import Optional, Literal
+
+logger = setup_logger()
+
+router = APIRouter(prefix='/inventory', tags=['inventory'])
+
+
+def _parse_locations(locations: Optional[list[str]]) -> Optional[list[int]]:
+  if not locations:
+    return None
+  location_ids = []
+  for location in locations:
+    try:
+      location_ids.append(LocationID[location.strip().upper()].value)
+    except KeyError:
+      raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unknown location '{location}', expected one of {[member.name for member in LocationID]}"
+      )
+  return location_ids
+
+@router.get('/on-hand',
+            response_model=OnHandResponse,
+            status_code=status.HTTP_200_OK,
+            description="Current on-hand quantities per product, location and zone")
+def get_on_hand(
+  db: Session = Depends(get_db),
+  current_user: UserORM = Depends(get_current_user),
+  product_id: Optional[int] = Query(None, description="Filter by product ID"),
+  location: Optional[list[str]] = Query(None, description="Filter by location name, e.g. AVAILABLE (repeatable)")
+):
+  location_ids = _parse_locations(location)
+  try:
+    return StockSnapshotService(db).get_on_hand(product_id=product_id, location_ids=location_ids)
+  except SQLAlchemyError as e:
+    logger.error(f'Database error while computing on-hand quantities: {e}')
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal database error: {e}")
+
+@router.get('/on-hand/as-of',
+            response_model=OnHandResponse,
+            status_code=status.HTTP_200_OK,
+            description="On-hand quantities per product, location and zone at the end of a past day")
+def get_on_hand_as_of(
+  as_of: date = Query(..., description="Day to compute the quantities for (ISO 8601: YYYY-MM-DD)"),
+  db: Session = Depends(get_db),
+  current_user: UserORM = Depends(get_current_user),
+  product_id: Optional[int] = Query(None, description="Filter by product ID"),
+  location: Optional[list[str]] = Query(None, description="Filter by location name, e.g. AVAILABLE (repeatable)")
+):
+  location_ids = _parse_locations(location)
+  try:
+    return StockSnapshotService(db).get_on_hand(as_of=as_of, product_id=product_id, location_ids=location_ids)
+  except SQLAlchemyError as e:
+    logger.error(f'Database error while computing as-of quantities: {e}')
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal database error: {e}")
+
+@router.post('/checkpoints',
+             response_model=Optional[StockCheckpointPublic],
+             status_code=status.HTTP_200_OK,
+             description="Fold the settled stock moves into a new checkpoint now (empty when there is nothing to fold)")
+def create_stock_checkpoint(
+  db: Session = Depends(get_db),
+  current_user: UserORM = Depends(get_current_user)
+):
+  try:
+    return StockSnapshotService(db).create_checkpoint()
+  except SQLAlchemyError as e:
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal database error: {e}")
+
+@router.get('/assets/export',
+            status_code=status.HTTP_200_OK,
+            description="Stream the assets as CSV or NDJSON (optionally gzip-compressed)")
+def export_assets(
+  current_user: UserORM = Depends(get_current_user),
+  export_format: Literal['csv', 'ndjson'] = Query('csv', alias='format', description="Export format"),
+  gzip: bool = Query(False, description="Compress the export with gzip"),
+  status_filter: Optional[list[str]] = Query(None, alias='status', description="Filter by asset status, e.g. Available (repeatable)"),
+  zone_id: Optional[int] = Query(None, description="Filter by current zone ID"),
+  product_id: Optional[int] = Query(None, description="Filter by product ID"),
+  start_date: Optional[date] = Query(None, description="Assets moved on or after this date (ISO 8601: YYYY-MM-DD)"),
+  end_date: Optional[date] = Query(None, description="Assets moved on or before this date (ISO 8601: YYYY-MM-DD)")
+):
+  valid_statuses = [member.value for member in AssetStatus]
+  for asset_status in status_filter or []:
+    if asset_status not in valid_statuses:
+      raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unknown asset status '{asset_status}', expected one of {valid_statuses}"
+      )
+  if start_date and end_date and start_date > end_date:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must be before end_date")
+
+  filters = AssetExportFilter(
+    statuses=status_filter,
+    zone_id=zone_id,
+    product_id=product_id,
+    start_date=start_date,
+    end_date=end_date
+  )
+  filename = f"assets-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+  media_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+  if gzip:
+    filename += '.gz'
+    media_type = 'application/gzip'
+  headers = {
+    'Content-Disposition': f'attachment; filename="{filename}"'
+  }
+  return StreamingResponse(
+    iter_asset_export(filters, export_format=export_format, compress=gzip),
+    headers=headers,
+    media_type=media_type
+  )
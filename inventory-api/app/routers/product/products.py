@@ -1,24 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect, UploadFile, Form, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect, UploadFile, Form, File, Request, Response
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.product import (ProductPublic, 
                                  ProductBase, 
                                  ProductCreate, 
                                  ProductUpdate,
                                  ProductBroadcastMessage,
                                  ProductBroadcastType,
-                                 ProductPaginationResponse)
+                                 ProductPaginationResponse,
+                                 ProductCursorResponse,
+                                 ProductSearchHit,
+                                 ProductSearchResponse,
+                                 ProductImportBroadcastMessage,
+                                 ProductImportResponse,
+                                 ImageUploadJobRead,
+                                 ProductImageUploadBroadcastMessage)
 from app.utils.dependencies import get_current_user
-from app.database.connection import get_db
+from app.database.connection import get_db, get_async_db, get_read_db, SessionLocal, read_after_write_guard
 from app.database.user_model import User as UserORM
 from app.database.product_model import Product as ProductORM
-from typing import List, Annotated
-from app.services.socket_manager import ConnectionManager
+from typing import List, Annotated, Optional, Literal, Union
+from app.utils.pagination_cursor import encode_cursor, decode_cursor
+from app.database.query_builders import product_public_query, product_public_by_id_query
+from app.services.product_search import product_search_index, ProductSearchDocument, MAX_SEARCH_LIMIT
+from app.services.product_import import ProductImportService, detect_import_format, IMPORT_FORMATS
+from app.services.image_upload_queue import image_upload_queue, ImageUploadJob
+from app.services.image_storage import StoredImage
+from datetime import datetime, timezone
+from app.utils.resource_version import ResourceVersion, register_resource_version, cache_headers
+from app.core.config import settings
+import time
+import asyncio
+from app.services.socket_manager import create_connection_manager
+from app.services.broadcast_backplane import broadcast_backplane
+from dataclasses import asdict
 from app.utils.logger import setup_logger
 from app.utils.dependencies import FormBody
-import cloudinary.uploader
-import cloudinary
-
 import json
 
 router = APIRouter(
@@ -29,18 +48,59 @@ router = APIRouter(
 # logger
 logger = setup_logger()
 
-manager = ConnectionManager()
+manager = create_connection_manager("products")
+
+# Bumped by every product write of this router, ETag of '/all/'
+product_list_version = register_resource_version(
+  ResourceVersion('products', max_age_seconds=settings.LIST_ETAG_MAX_AGE_SECONDS)
+)
+
+# Websocket messages, sent to the clients of every worker through the backplane
+PRODUCT_CHANNEL = "products"
+# Search index and list ETag changes, applied by the other workers (the writing one already did)
+PRODUCT_CACHE_CHANNEL = "products.cache"
+
+broadcast_backplane.subscribe(PRODUCT_CHANNEL, manager.broadcast)
+
+async def _publish_product_change(upserted: Optional[list[ProductSearchDocument]] = None, removed: Optional[list[int]] = None):
+  await broadcast_backplane.publish(PRODUCT_CACHE_CHANNEL, json.dumps({
+    "upserted": [asdict(document) for document in upserted or []],
+    "removed": removed or []
+  }))
+
+async def _apply_product_change(message: str):
+  change = json.loads(message)
+  for document in change["upserted"]:
+    product_search_index.upsert(ProductSearchDocument(**document))
+  for product_id in change["removed"]:
+    product_search_index.remove(product_id)
+  product_list_version.bump()
+
+broadcast_backplane.subscribe(PRODUCT_CACHE_CHANNEL, _apply_product_change, include_own=False)
+
 # Get all products
 @router.get('/all/', 
             response_model= List[ProductPublic], 
             status_code=status.HTTP_200_OK, 
-            description="Fetch all product records")  
-def get_products_all (current_user: UserORM = Depends(get_current_user), db: Session = Depends(get_db)):
+            description="Fetch all product records, 304 when If-None-Match holds the current ETag")  
+def get_products_all (request: Request,
+                      response: Response,
+                      current_user: UserORM = Depends(get_current_user),
+                      db: Session = Depends(get_db)):
+  # Primary, not the replica: the ETag of this worker's counter must never label a body
+  # read before the write that bumped it (clients would keep it on 304s). Most requests
+  # end at the 304 below, without touching the database.
+  # The client's copy is still current: no query, no serialization
+  etag, not_modified = product_list_version.not_modified_response(request)
+  if not_modified is not None:
+    return not_modified
+  response.headers.update(cache_headers(etag))
   # Get all products
   try:
-    query = db.query(ProductORM)
+    # Column projection, the PurchaseOrderItems eager join is not needed by ProductPublic
+    query = product_public_query()
     logger.info(f"Get the query to fetch all products: {query}")
-    products = query.all()
+    products = db.execute(query).all()
     logger.info(f"Can receive the products list: {products[:4]}")
     return products
   except SQLAlchemyError as e:
@@ -48,21 +108,94 @@ def get_products_all (current_user: UserORM = Depends(get_current_user), db: Ses
   except Exception as e:
       raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
     
+# Page sizes of the page/limit mode (web UI) and of the cursor mode (integrations)
+PAGE_MIN_LIMIT = 10
+PAGE_MAX_LIMIT = 25
+CURSOR_MAX_LIMIT = 500
+
+# Cursor mode sort keys, each backed by an index ending with ProductId
+CURSOR_SORT_COLUMNS = {
+  'product_id': None,
+  'product_name': ProductORM.ProductName
+}
+
+def get_products_after_cursor(db: Session, after: str, limit: int, sort: str, include_total: bool) -> dict:
+  """
+  One page of products after an opaque cursor (keyset pagination): the page
+  starts with an index seek past the last row of the previous page, whatever
+  the depth, and the total count is only computed when asked.
+  An empty cursor starts at the first page.
+  """
+  sort_column = CURSOR_SORT_COLUMNS[sort]
+  query = product_public_query()
+  if after:
+    try:
+      cursor = decode_cursor(after)
+      if cursor.get('sort') != sort:
+        raise ValueError(f"cursor was created for sort '{cursor.get('sort')}'")
+      last_id = int(cursor['id'])
+    except (ValueError, KeyError, TypeError) as e:
+      raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
+    if sort_column is None:
+      query = query.where(ProductORM.ProductId > last_id)
+    else:
+      # No row value comparison on SQL Server: (value, id) > (last value, last id) spelled out
+      last_value = cursor.get('value')
+      query = query.where(or_(
+        sort_column > last_value,
+        and_(sort_column == last_value, ProductORM.ProductId > last_id)
+      ))
+  order_by = [ProductORM.ProductId] if sort_column is None else [sort_column, ProductORM.ProductId]
+  # One extra row tells whether another page follows
+  products = db.execute(query.order_by(*order_by).limit(limit + 1)).all()
+  has_more = len(products) > limit
+  products = products[:limit]
+  next_cursor = None
+  if has_more:
+    last_product = products[-1]
+    cursor_values = {'sort': sort, 'id': last_product.ProductId}
+    if sort_column is not None:
+      cursor_values['value'] = getattr(last_product, sort_column.key)
+    next_cursor = encode_cursor(cursor_values)
+  total_records = db.execute(select(func.count(ProductORM.ProductId))).scalar_one() if include_total else None
+  return {
+    "items": products,
+    "limit": limit,
+    "next_cursor": next_cursor,
+    "has_more": has_more,
+    "total_records": total_records
+  }
+
 # Get some products with parameter
 @router.get('/',
             status_code=status.HTTP_200_OK,
-            response_model=ProductPaginationResponse,
-            description="Get products based on page number"
+            response_model=Union[ProductPaginationResponse, ProductCursorResponse],
+            description="Get products based on page number, or after a cursor when 'after' is given (empty to start)"
             )
 def get_products_paginated (current_user: UserORM = Depends(get_current_user),
-                  db:Session = Depends(get_db),
+                  db:Session = Depends(get_read_db),
                   page: int = Query(1, ge=1, description="Page index, must be >= 1"),
-                  limit: int = Query(10, ge=10, le=25, description="Item per page, from 10 to 25")):
+                  limit: int = Query(10, ge=1, le=CURSOR_MAX_LIMIT, description="Item per page, from 10 to 25 (up to 500 in cursor mode)"),
+                  after: Optional[str] = Query(None, description="Cursor mode: next_cursor of the previous page, empty for the first page"),
+                  sort: Literal['product_id', 'product_name'] = Query('product_id', description="Cursor mode: sort key"),
+                  include_total: bool = Query(False, description="Cursor mode: also count all products")):
+  if after is not None:
+    try:
+      return get_products_after_cursor(db, after=after, limit=limit, sort=sort, include_total=include_total)
+    except SQLAlchemyError as e:
+      raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+  if not PAGE_MIN_LIMIT <= limit <= PAGE_MAX_LIMIT:
+    raise HTTPException(
+      status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+      detail=f"limit must be from {PAGE_MIN_LIMIT} to {PAGE_MAX_LIMIT}, use the cursor mode ('after') for larger pages"
+    )
   try:
     # Set offset and limit
     offset = (page-1)*limit
-    total_products = db.query(ProductORM).count()
-    products = db.query(ProductORM).order_by(ProductORM.ProductId).offset(offset).limit(limit).all()
+    total_products = db.execute(select(func.count(ProductORM.ProductId))).scalar_one()
+    products = db.execute(
+      product_public_query().order_by(ProductORM.ProductId).offset(offset).limit(limit)
+    ).all()
     total_page =( total_products + limit - 1 ) // limit
     return {
       "items" : products,
@@ -83,21 +216,52 @@ async def websocket_endpoint(websocket: WebSocket):
     logger.info('A client connected to server')
     try:
         while True:
+            # Pongs and any other message keep the client from being dropped as idle
             await websocket.receive_text()
+            manager.touch(websocket)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         logger.info('Disconnect to a client')
+    finally:
+        manager.disconnect(websocket)
+# Type-ahead search, declared before '/{product_id}'
+@router.get('/search',
+            response_model=ProductSearchResponse,
+            status_code=status.HTTP_200_OK,
+            description="Search products by name, SKU, manufacturer or series (word, prefix or substring), best matches first")
+async def search_products(
+  q: str = Query(..., min_length=1, max_length=100, description="Search text, e.g. 'dell lat' or 'X200'"),
+  limit: int = Query(20, ge=1, le=MAX_SEARCH_LIMIT, description="Maximum number of results"),
+  current_user: UserORM = Depends(get_current_user)
+):
+  # In-memory index, no database round trip
+  started_at = time.perf_counter()
+  results = product_search_index.search(q, limit=limit)
+  return {
+    "query": q,
+    "items": [
+      ProductSearchHit(
+        product_id=document.product_id,
+        model_number_sku=document.model_number_sku,
+        product_name=document.product_name,
+        manufacturer=document.manufacturer,
+        product_series=document.product_series,
+        score=round(score, 3)
+      )
+      for document, score in results
+    ],
+    "took_ms": round((time.perf_counter() - started_at) * 1000, 3)
+  }
+
 # Get one product by id 
 @router.get('/{product_id}', response_model=ProductPublic, status_code=status.HTTP_200_OK)
 def get_product_by_id(
   product_id: int,
   current_user: UserORM = Depends(get_current_user),
-  db: Session = Depends(get_db) 
+  db: Session = Depends(get_read_db) 
 ):
   try:
     #Get single product
-    query = db.query(ProductORM).filter(ProductORM.ProductId == product_id)
-    product = query.one_or_none()
+    product = db.execute(product_public_by_id_query(), {"product_id": product_id}).one_or_none()
     return product
   except SQLAlchemyError as e:
     raise HTTPException(status_code=500, detail=f"Database error {e}")
@@ -108,7 +272,7 @@ def get_product_by_id(
 @router.post('/', response_model=ProductPublic, status_code=status.HTTP_201_CREATED)
 async def create_product(new_product: ProductCreate,
                    current_user: UserORM = Depends(get_current_user),
-                   db: Session = Depends(get_db),
+                   db: AsyncSession = Depends(get_async_db),
                    ):
   try:
     added_product = ProductORM(
@@ -127,6 +291,8 @@ async def create_product(new_product: ProductCreate,
       # Media
       ProductImageId = new_product.product_image_id,
       ProductImageUrl = new_product.product_image_url,
+      ProductImageThumbnailUrl = new_product.product_image_thumbnail_url,
+      ProductImageMediumUrl = new_product.product_image_medium_url,
       
       # Technical stats
       PackageWeight_KG = new_product.package_weight_kg,
@@ -142,8 +308,12 @@ async def create_product(new_product: ProductCreate,
     
     # add product to db
     db.add(added_product)
-    db.commit()
-    db.refresh(added_product)
+    await db.commit()
+    read_after_write_guard.mark_write()
+    await db.refresh(added_product)
+    product_search_index.upsert(added_product)
+    product_list_version.bump()
+    await _publish_product_change(upserted=[ProductSearchDocument.from_orm(added_product)])
     
     # Broadcast message
     broadcast_data = ProductPublic.model_validate(added_product)
@@ -153,17 +323,122 @@ async def create_product(new_product: ProductCreate,
       payload= broadcast_data.model_dump()
     )
     logger.info('have create a message')
-    await manager.broadcast(message.model_dump_json())
+    await broadcast_backplane.publish(PRODUCT_CHANNEL, message.model_dump_json())
     return added_product
 
   except SQLAlchemyError as e:
-    db.rollback()
+    await db.rollback()
     raise HTTPException(status_code=500, detail =f"Database error {e}")
   except Exception as e:
-    db.rollback()
+    await db.rollback()
     raise HTTPException(status_code=500, detail= f"Unexpected error {e}")
 
-@router.post("/upload-image", status_code=status.HTTP_201_CREATED)
+def _image_upload_job_read(job: ImageUploadJob) -> ImageUploadJobRead:
+  return ImageUploadJobRead(
+    job_id=job.job_id,
+    status=job.status,
+    product_id=job.product_id,
+    image_url=job.image.url if job.image else None,
+    thumbnail_url=job.image.thumbnail_url if job.image else None,
+    medium_url=job.image.medium_url if job.image else None,
+    public_id=job.image.image_id if job.image else None,
+    error=job.error,
+    status_url=router.url_path_for('get_image_upload_job', job_id=job.job_id),
+    created_at=datetime.fromtimestamp(job.created_at, timezone.utc),
+    finished_at=datetime.fromtimestamp(job.finished_at, timezone.utc) if job.finished_at else None
+  )
+
+async def _broadcast_image_upload(job: ImageUploadJob):
+  message = ProductImageUploadBroadcastMessage(payload=_image_upload_job_read(job))
+  await broadcast_backplane.publish(PRODUCT_CHANNEL, message.model_dump_json())
+  if job.product_id is not None and job.status == "succeeded":
+    # The worker thread applied the new image and bumped the list ETag of this worker
+    await _publish_product_change()
+
+image_upload_queue.add_listener(_broadcast_image_upload)
+
+def _replace_product_image(product_id: int):
+  # Runs in an upload worker thread once the new image is stored
+  def apply(image: StoredImage) -> Optional[str]:
+    with SessionLocal() as db:
+      replaced_image_id = db.execute(
+        select(ProductORM.ProductImageId).where(ProductORM.ProductId == product_id)
+      ).one_or_none()
+      if replaced_image_id is None:
+        raise LookupError(f"Product {product_id} was deleted during the upload")
+      db.execute(
+        update(ProductORM)
+        .where(ProductORM.ProductId == product_id)
+        .values(
+          ProductImageUrl=image.url,
+          ProductImageId=image.image_id,
+          ProductImageThumbnailUrl=image.thumbnail_url,
+          ProductImageMediumUrl=image.medium_url
+        )
+      )
+      # Deduplicated uploads share images: keep the old one while another product shows it
+      replaced_image_id = replaced_image_id[0]
+      if replaced_image_id is not None and db.execute(
+        select(ProductORM.ProductId).where(ProductORM.ProductImageId == replaced_image_id).limit(1)
+      ).first() is not None:
+        replaced_image_id = None
+      db.commit()
+    read_after_write_guard.mark_write()
+    product_list_version.bump()
+    return replaced_image_id
+  return apply
+
+# Bulk create/update from a catalog file
+@router.post('/import',
+             response_model=ProductImportResponse,
+             status_code=status.HTTP_200_OK,
+             description="Create or update products from a CSV (header row of ProductCreate fields) or NDJSON file, matched on model_number_sku. "
+                         "Rows are validated and written in chunks, rejected rows are listed in the report.")
+async def import_products(upload_file: UploadFile = File(...),
+                          file_format: Optional[Literal['csv', 'ndjson']] = Form(None, description="Default: from the file extension or content type"),
+                          current_user: UserORM = Depends(get_current_user),
+                          db: Session = Depends(get_db)):
+  file_format = file_format or detect_import_format(upload_file.filename, upload_file.content_type)
+  if file_format not in IMPORT_FORMATS:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Unknown file format, upload a .csv or .ndjson file or set file_format")
+  started_at = time.perf_counter()
+  service = ProductImportService(db,
+                                 chunk_size=settings.PRODUCT_IMPORT_CHUNK_SIZE,
+                                 max_reported_errors=settings.PRODUCT_IMPORT_MAX_REPORTED_ERRORS)
+  try:
+    # Parsing, validation and the database writes run off the event loop
+    report = await asyncio.to_thread(service.import_file, upload_file.file, file_format)
+  except Exception as e:
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unexpected error: {e}")
+
+  if report.documents:
+    for document in report.documents:
+      product_search_index.upsert(document)
+    product_list_version.bump()
+    await _publish_product_change(upserted=report.documents)
+    # One message for the whole import instead of one per product
+    message = ProductImportBroadcastMessage(
+      created=report.created,
+      updated=report.updated,
+      product_ids=[document.product_id for document in report.documents]
+    )
+    await broadcast_backplane.publish(PRODUCT_CHANNEL, message.model_dump_json())
+  return {
+    "message": f"Imported {report.created + report.updated} of {report.total_rows} rows",
+    "total_rows": report.total_rows,
+    "created": report.created,
+    "updated": report.updated,
+    "failed": report.failed,
+    "errors": report.errors,
+    "errors_truncated": report.errors_truncated,
+    "took_ms": round((time.perf_counter() - started_at) * 1000, 3)
+  }
+
+@router.post("/upload-image",
+             response_model=ImageUploadJobRead,
+             status_code=status.HTTP_202_ACCEPTED,
+             description="Queue the upload of a new product image, poll status_url (or wait for the websocket event) for its url and public_id")
 async def upload_product_image (upload_file: UploadFile = File(...),
                                 current_user = Depends(get_current_user),
                                 ):
@@ -171,37 +446,32 @@ async def upload_product_image (upload_file: UploadFile = File(...),
   if not upload_file.content_type.startswith('image/'):
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, 
                         detail="Only image file is valid")
-  try:
-    upload_result = cloudinary.uploader.upload(file = upload_file.file
-                                                        )
-    logger.info("Upload image can be performed")
-    image_url = upload_result.get("secure_url")
-    public_id = upload_result.get("public_id")
-    
-    logger.info(f"Image url returned by cloudinary server is: {image_url}")
-    if not image_url:
-      raise Exception("Cloudinary failed to return an url")
-  except Exception as e:
-    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Uncaught Internal Server Error: {e}")
-  return {
-    'image_url': image_url,
-    'public_id': public_id,
-    'message': "Upload Product image successfully",
-    'image_category': "product"
-  }
+  # The storage round trip happens in the upload workers, not in this handler
+  job = await image_upload_queue.submit(upload_file)
+  logger.info(f"Queued the upload of a product image as job {job.job_id}")
+  return _image_upload_job_read(job)
+
+@router.get('/image-uploads/{job_id}',
+            response_model=ImageUploadJobRead,
+            status_code=status.HTTP_200_OK,
+            description="Status of a queued image upload, with the image url and public_id once it succeeded")
+async def get_image_upload_job(job_id: str, current_user: UserORM = Depends(get_current_user)):
+  job = image_upload_queue.get(job_id)
+  if job is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Image upload {job_id} not found or expired")
+  return _image_upload_job_read(job)
 
 @router.put('/{product_id}', response_model=ProductPublic, status_code=status.HTTP_200_OK)
 async def update_product(
     product: ProductUpdate,
     product_id: int,
     current_user: UserORM = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # 1. Find the product
-        query = db.query(ProductORM).filter(ProductORM.ProductId == product_id)
-        found_product = query.one_or_none()
+        query = select(ProductORM).where(ProductORM.ProductId == product_id)
+        found_product = (await db.execute(query)).unique().scalars().one_or_none()
 
         if not found_product:
             raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found.")
@@ -241,6 +511,9 @@ async def update_product(
             found_product.ProductImageId = product.product_image_id
         if 'product_image_url' in update_data:
             found_product.ProductImageUrl = product.product_image_url
+            # Variants of the previous image would no longer match, unset ones fall back to the url
+            found_product.ProductImageThumbnailUrl = product.product_image_thumbnail_url
+            found_product.ProductImageMediumUrl = product.product_image_medium_url
             
         # Technical stats
         if 'package_weight_kg' in update_data:
@@ -263,8 +536,12 @@ async def update_product(
 
         # 4. Commit the changes
         db.add(found_product)
-        db.commit()
-        db.refresh(found_product)
+        await db.commit()
+        read_after_write_guard.mark_write()
+        await db.refresh(found_product)
+        product_search_index.upsert(found_product)
+        product_list_version.bump()
+        await _publish_product_change(upserted=[ProductSearchDocument.from_orm(found_product)])
         
         # Broadcast an update message
         broadcast_data = ProductPublic.model_validate(found_product)
@@ -272,23 +549,26 @@ async def update_product(
             type = ProductBroadcastType.Update,
             payload= broadcast_data.model_dump()
         )
-        await manager.broadcast(message.model_dump_json())
+        await broadcast_backplane.publish(PRODUCT_CHANNEL, message.model_dump_json())
         
         return found_product
 
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f'Database error: {e}')
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f'Unexpected error: {e}')
 
-@router.put('/{product_id}/image')
+@router.put('/{product_id}/image',
+            response_model=ImageUploadJobRead,
+            status_code=status.HTTP_202_ACCEPTED,
+            description="Queue the replacement of a product image, the product is updated and the old image deleted once the upload succeeded")
 async def update_product_image(
     product_id: int,
     upload_file: UploadFile = File(...),
     current_user: UserORM = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Step 1: Validate the incoming file
     if not upload_file.content_type.startswith('image/'):
@@ -297,64 +577,49 @@ async def update_product_image(
             detail="Only image files are valid"
         )
     
-    # Step 2: Retrieve the existing product from the database
-    product = db.query(ProductORM).filter(ProductORM.ProductId == product_id).first()
-    if not product:
+    # Step 2: Check the product exists before queueing the upload
+    found_product_id = (await db.execute(
+        select(ProductORM.ProductId).where(ProductORM.ProductId == product_id)
+    )).scalar_one_or_none()
+    if found_product_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product with id {product_id} not found."
         )
 
-    public_id = None
-    try:
-        # Step 3: Delete the old image from Cloudinary if it exists
-        if product.ProductImageId:
-            cloudinary.uploader.destroy(product.ProductImageId)
-
-        # Step 4: Upload the new image to Cloudinary
-        upload_result = cloudinary.uploader.upload(upload_file.file)
-        
-        # Step 5: Update the database record with the new image info
-        product.ProductImageUrl = upload_result.get("secure_url")
-        product.ProductImageId = upload_result.get("public_id")
-
-        db.commit()
-        db.refresh(product)
-        
-        return {
-            "message": "Product image updated successfully",
-            "image_url": product.ProductImageUrl,
-            "public_id": product.ProductImageId
-        }
-    
-    except Exception as e:
-        # Rollback the database if the upload or commit fails
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An error occurred during image update: {e}"
-        )
+    # Step 3: Upload, update the record and delete the old image in the upload workers
+    job = await image_upload_queue.submit(
+        upload_file,
+        product_id=product_id,
+        apply=_replace_product_image(product_id)
+    )
+    logger.info(f"Queued the image replacement of product {product_id} as job {job.job_id}")
+    return _image_upload_job_read(job)
 
 @router.delete('/{product_id}', status_code=status.HTTP_202_ACCEPTED)
 async def delete_product(
   product_id: int,
   current_user: UserORM = Depends(get_current_user),
-  db: Session = Depends(get_db)
+  db: AsyncSession = Depends(get_async_db)
 ):
   try:
     # Get product
-    query = db.query(ProductORM).filter(ProductORM.ProductId == product_id)
-    product_orm = query.one_or_none()
+    query = select(ProductORM).where(ProductORM.ProductId == product_id)
+    product_orm = (await db.execute(query)).unique().scalars().one_or_none()
     if not product_orm:
       raise HTTPException(status_code=404, detail="Not found product")
-    db.delete(product_orm)
-    db.commit()
+    await db.delete(product_orm)
+    await db.commit()
+    read_after_write_guard.mark_write()
+    product_search_index.remove(product_id)
+    product_list_version.bump()
+    await _publish_product_change(removed=[product_id])
     return {
       'message': f'Successfully deleted product_id {product_id}'
     }
   except SQLAlchemyError as e:
-    db.rollback()
+    await db.rollback()
     raise HTTPException(status_code=500, detail=f"database error: {e}")
   except Exception as e:
-    db.rollback()
+    await db.rollback()
     raise HTTPException(status_code=500, detail=f'Unexpected error: {e}')
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Query, Body
-from app.utils.dependencies import get_db, get_current_user
+from app.utils.dependencies import get_db, get_read_db, get_current_user
 from app.utils.logger import setup_logger
 from app.database.purchase_order_model import PurchaseOrder as PurchaseOrderORM, PurchaseOrderItem as PurchaseOrderItemORM
 from app.database.supplier_model import Supplier as SupplierORM
@@ -9,6 +9,7 @@ from app.database.shipment_manifest_model import (
   ShipmentManifestLine
 )
 from app.database.user_model import User as UserORM 
+from app.services.inventory.asset_status_counter import AssetStatusCounterService
 from app.schemas.purchase_order import (
   PurchaseOrderRead,
   PurchaseOrderPublic, 
@@ -40,7 +41,7 @@ router = APIRouter(prefix='/purchase-order', tags=['po'])
 @router.get('/all', 
             response_model=list[PurchaseOrderRead], 
             status_code=status.HTTP_200_OK)
-def get_all_purchase_orders(db:Session =  Depends(get_db),
+def get_all_purchase_orders(db:Session =  Depends(get_read_db),
                             current_user: UserORM = Depends(get_current_user)):
   # Try fetch data from sqlachemy
   try:
@@ -58,7 +59,7 @@ def get_all_purchase_orders(db:Session =  Depends(get_db),
             response_model=PurchaseOrderResponse,
             status_code=status.HTTP_200_OK)
 def get_purchase_order_paginated(
-  db: Session = Depends(get_db),
+  db: Session = Depends(get_read_db),
   current_user: UserORM = Depends(get_current_user),
   page: int = Query(1, ge=1, description='Page number (1-based)'),
   limit: int = Query(10, ge=1, le=100, description='Items per page'),
@@ -162,7 +163,7 @@ def get_purchase_order_paginated(
     })
 def get_purchase_order_items(purchase_order_id:int,
                              current_user:UserORM = Depends(get_current_user),
-                             db:Session = Depends(get_db)):
+                             db:Session = Depends(get_read_db)):
   # First check if purchase order id exists and get header data
   try:
     po = db.query(PurchaseOrderORM).filter(
@@ -185,44 +186,18 @@ def get_purchase_order_items(purchase_order_id:int,
     product_stats = {}
 
     
-    # Only run this expensive aggregation if the PO is in a relevant status
+    # Only read the stats if the PO is in a relevant status
     valid_stat_statuses = {
         'Issued', 'Acknowledged', 'Partially Delivered', 
         'Partially Received', 'Received'
     }
 
-    # 2. Calculate Stats (Received, In Transit)
-    # Logic: Asset -> ShipmentManifestLine -> ShipmentManifest (filter by PO ID)
-    # We group by ProductId and AssetStatus to get counts
+    # 2. Read Stats (Received, In Transit) from the maintained asset status counters
     logger.info(f"Handle purchase order item specific line: quantity shipped/in transit/remaining") if po.Status in valid_stat_statuses else logger.info("No specifc fields are calculated")
     if po.Status in valid_stat_statuses:
-        stats_query = (
-            db.query(
-                AssetORM.ProductId,
-                AssetORM.AssetStatus,
-                func.count(AssetORM.AssetId).label("count")
-            )
-            .join(ShipmentManifestLine, AssetORM.ShipmentManifestLineId == ShipmentManifestLine.Id)
-            .join(ShipmentManifest, ShipmentManifestLine.ShipmentManifestId == ShipmentManifest.Id)
-            .filter(ShipmentManifest.PurchaseOrderId == purchase_order_id)
-            .filter(AssetORM.AssetStatus.in_(['Awaiting QC', 'Accepted', 'In Transit']))
-            .group_by(AssetORM.ProductId, AssetORM.AssetStatus)
-        )
-    
-        asset_stats = stats_query.all()
-
-        # 3. Process Stats into a lookup dictionary
-        # Structure: { product_id: {'received': 0, 'in_transit': 0} }
-        for pid, status, count in asset_stats:
-            if pid not in product_stats:
-                product_stats[pid] = {'received': 0, 'in_transit': 0}
-            
-            if status in ['Awaiting QC', 'Accepted']:
-                product_stats[pid]['received'] += count
-            elif status == 'In Transit':
-                product_stats[pid]['in_transit'] += count
-
-    # 4. Merge Stats with Items
+        product_stats = AssetStatusCounterService(db).get_po_product_stats(purchase_order_id)
+
+    # 3. Merge Stats with Items
     final_items = []
     for item in purchase_order_items:
         pid = item.ProductId
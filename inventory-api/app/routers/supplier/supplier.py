@@ -1,4 +1,4 @@
-from fastapi import APIRouter, status, Depends, HTTPException, Body
+from fastapi import APIRouter, status, Depends, HTTPException, Body, Request, Response
 from app.utils.logger import setup_logger
 from app.database.supplier_model import Supplier as SupplierORM
 from app.database.user_model import User as UserORM
@@ -13,6 +13,8 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from app.services.procurement.supplier import SupplierService, get_supplier_service
+from app.utils.resource_version import ResourceVersion, register_resource_version, cache_headers
+from app.core.config import settings
 import traceback
 import uuid
 
@@ -23,13 +25,24 @@ router = APIRouter(
 )
 logger = setup_logger()
 
+# ETag of '/all', supplier writes must bump() it after their commit
+supplier_list_version = register_resource_version(
+  ResourceVersion('suppliers', max_age_seconds=settings.LIST_ETAG_MAX_AGE_SECONDS)
+)
+
 # Get all suppliers
 @router.get("/all",
         response_model=list[SupplierPublic],
         status_code= status.HTTP_200_OK 
         )
-def get_all_supplers(db: Session = Depends(get_db),
+def get_all_supplers(request: Request,
+                     response: Response,
+                     db: Session = Depends(get_db),
                      current_user: UserORM = Depends(get_current_user)):
+  etag, not_modified = supplier_list_version.not_modified_response(request)
+  if not_modified is not None:
+    return not_modified
+  response.headers.update(cache_headers(etag))
   try:
     # Get all suppliers
     suppliers = db.query(SupplierORM).all()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, status, HTTPException,Depends
+from fastapi import APIRouter, status, HTTPException,Depends, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError 
 from app.database.warehouse_zone_model import Zone as ZoneORM
@@ -10,6 +10,8 @@ from typing import List
 # Dependencies
 from app.utils.dependencies import get_current_user
 from app.database.connection import get_db
+from app.utils.resource_version import ResourceVersion, register_resource_version, cache_headers
+from app.core.config import settings
 
 # Logginf
 from app.utils.logger import setup_logger
@@ -22,13 +24,24 @@ router = APIRouter(prefix="/warehouse_zones",
                    tags=["warehouse_zones"])
 logger = setup_logger()
 
+# ETag of '/all/', zone writes must bump() it after their commit
+zone_list_version = register_resource_version(
+  ResourceVersion('warehouse_zones', max_age_seconds=settings.LIST_ETAG_MAX_AGE_SECONDS)
+)
+
 # Get API
 @router.get(path='/all/', 
             response_model= List[ZonePublic],
             status_code=status.HTTP_200_OK, 
-            description="Get all warehouse zones in database")
-def get_zones_all(db: Session = Depends(get_db),
+            description="Get all warehouse zones in database, 304 when If-None-Match holds the current ETag")
+def get_zones_all(request: Request,
+              response: Response,
+              db: Session = Depends(get_db),
               current_user: UserORM = Depends(get_current_user)):
+  etag, not_modified = zone_list_version.not_modified_response(request)
+  if not_modified is not None:
+    return not_modified
+  response.headers.update(cache_headers(etag))
   # Query from database
   try:
     query = db.query(ZoneORM)
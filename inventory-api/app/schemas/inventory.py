@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import date, datetime
+from app.schemas.base import AutoReadSchema
+
+
+class OnHandItem(BaseModel):
+  product_id: int = Field(..., description="Product ID")
+  location_id: int = Field(..., description="Stock location ID (see LocationID)")
+  location: Optional[str] = Field(default=None, description="Stock location name, e.g. AVAILABLE, AWAITING_QC")
+  zone_id: Optional[int] = Field(default=None, description="Warehouse zone of the linked assets, empty when the move has no assets")
+  quantity: int = Field(..., description="On-hand quantity")
+
+class OnHandResponse(BaseModel):
+  as_of: Optional[date] = Field(default=None, description="End of day the quantities are computed for, empty for right now")
+  checkpoint_id: Optional[int] = Field(default=None, description="Checkpoint the projection started from")
+  high_water_mark: int = Field(..., description="Last stock move id contained in the checkpoint")
+  items: list[OnHandItem] = Field(..., description="On-hand quantities per product, location and zone")
+
+class StockCheckpointPublic(AutoReadSchema):
+  id: int
+  created_at: datetime
+  high_water_mark_move_id: int
+  last_movement_date: Optional[date] = None
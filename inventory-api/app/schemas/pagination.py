@@ -1,8 +1,15 @@
 from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
 
 class PaginationMetaData(BaseModel):
   current_page: int = Field(..., description="Current page")
   total_pages: int = Field(..., description="Total number of pages")
   limit: int = Field(..., description="Total of item in a page")
   total_records: int = Field(..., description="Total purchase order records in database")
-  model_config = ConfigDict(populate_by_name=True)
\ No newline at end of file
+  model_config = ConfigDict(populate_by_name=True)
+class CursorMetaData(BaseModel):
+  limit: int = Field(..., description="Maximum number of items in a page")
+  next_cursor: Optional[str] = Field(None, description="Value of 'after' for the next page, null on the last page")
+  has_more: bool = Field(..., description="Whether another page follows")
+  total_records: Optional[int] = Field(None, description="Total number of records, only when requested")
+  model_config = ConfigDict(populate_by_name=True)
@@ -1,13 +1,13 @@
 # app/schemas/product.py
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from pydantic.fields import FieldInfo, PydanticUndefined
 from fastapi import UploadFile
 from datetime import datetime
-from typing import Optional, TypeVar, Type, Any, get_args, get_origin, Dict
+from typing import Optional, TypeVar, Type, Any, get_args, get_origin, Dict, Literal
 from enum import Enum
-from app.schemas.base import AutoWriteSchema, AutoReadSchema
-from app.schemas.pagination import PaginationMetaData
+from app.schemas.base import AutoWriteSchema, AutoReadSchema, StandardResponse
+from app.schemas.pagination import PaginationMetaData, CursorMetaData
 # --- REUSABLE ATTRIBUTE BLOCKS (MIXINS) ---
 
 # Block 1: Product Identity (Primary Keys and Identifiers)
@@ -37,6 +37,9 @@ class SpecsMixin(BaseModel):
 class MediaInventoryMixin(BaseModel):
     product_image_id: Optional[str] = None
     product_image_url: Optional[str] = None
+    # Downscaled copies of the image (thumbnail_url and medium_url of the upload job)
+    product_image_thumbnail_url: Optional[str] = None
+    product_image_medium_url: Optional[str] = None
     safety_stock: Optional[int] = None
     primary_supplier_id: Optional[int] = Field(...)
 
@@ -149,16 +152,76 @@ class ProductPublic(ProductBase, AutoReadSchema):
     primary_supplier_id: Optional[int] = Field(default=None, exclude=True, validation_alias="PrimarySupplierID")
     safety_stock: Optional[int] = Field(default=None, exclude=True)
 
+    @model_validator(mode="after")
+    def default_image_variants(self):
+        # Images uploaded before the variants existed: the full image, so clients can always use the variants
+        if self.product_image_thumbnail_url is None:
+            self.product_image_thumbnail_url = self.product_image_url
+        if self.product_image_medium_url is None:
+            self.product_image_medium_url = self.product_image_url
+        return self
+
 
 class ProductBroadcastType(Enum):
     Add= "product_added"
     Update = "product_updated"
     Delete = "product_deleted"
+    Import = "products_imported"
+    ImageUpload = "product_image_uploaded"
 class ProductBroadcastPayload(ProductPublic):
     pass
 class ProductBroadcastMessage(BaseModel):
     type: ProductBroadcastType
     payload: Optional[ProductPublic] = None  # Use a flexible dict for the payload
     model_config = ConfigDict(use_enum_values=True)
+class ProductImportBroadcastMessage(BaseModel):
+    """One message for a whole import, clients reload the listed products."""
+    type: ProductBroadcastType = ProductBroadcastType.Import
+    created: int
+    updated: int
+    product_ids: list[int]
+    model_config = ConfigDict(use_enum_values=True)
 class ProductPaginationResponse(PaginationMetaData):
-    items: list[ProductPublic] = Field(..., description = "List of products in one page")
\ No newline at end of file
+    items: list[ProductPublic] = Field(..., description = "List of products in one page")
+class ProductCursorResponse(CursorMetaData):
+    items: list[ProductPublic] = Field(..., description = "List of products in one page")
+class ProductSearchHit(BaseModel):
+    product_id: int
+    model_number_sku: str
+    product_name: str
+    manufacturer: Optional[str] = None
+    product_series: Optional[str] = None
+    score: float = Field(..., description="Relevance, higher first")
+class ProductSearchResponse(BaseModel):
+    query: str
+    items: list[ProductSearchHit] = Field(..., description="Best matches first")
+    took_ms: float = Field(..., description="Time spent in the search index")
+class ProductImportRowError(BaseModel):
+    line: Optional[int] = Field(..., description="Line of the row in the file, null for a file level error")
+    model_number_sku: Optional[str] = None
+    errors: list[str]
+class ProductImportResponse(StandardResponse):
+    total_rows: int
+    created: int
+    updated: int
+    failed: int
+    errors: list[ProductImportRowError] = Field(..., description="Rejected rows, the other rows were imported")
+    errors_truncated: bool = Field(..., description="More rows failed than the errors listed")
+    took_ms: float
+class ImageUploadJobRead(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    product_id: Optional[int] = Field(default=None, description="Product whose image is replaced, null for a new image")
+    image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = Field(default=None, description="Downscaled copy for lists, null when the image has no variants")
+    medium_url: Optional[str] = Field(default=None, description="Downscaled copy for detail views, null when the image has no variants")
+    public_id: Optional[str] = Field(default=None, description="Id of the image in the storage")
+    error: Optional[str] = None
+    status_url: str = Field(..., description="Poll it until the status is succeeded or failed")
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+class ProductImageUploadBroadcastMessage(BaseModel):
+    """Sent when a background image upload finishes (succeeded or failed)."""
+    type: ProductBroadcastType = ProductBroadcastType.ImageUpload
+    payload: ImageUploadJobRead
+    model_config = ConfigDict(use_enum_values=True)
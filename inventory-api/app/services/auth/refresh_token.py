@@ -0,0 +1,176 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from jose import jwt
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+from app.database.user_model import RefreshToken as RefreshTokenORM
+from app.database.connection import engine
+from app.core.config import settings
+from app.services.password_hasher import password_hasher
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+SECRET_KEY = str(os.getenv('SECRET_KEY'))
+ALGORITHM = str(os.getenv('ALGORITHM'))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', 7))
+
+# Prefix of the keyed digests, rows written before it hold a bcrypt hash ("$2b$...")
+TOKEN_HASH_SCHEME = "hmac-sha256$"
+LEGACY_BCRYPT_PREFIX = "$2"
+
+def hash_refresh_token(token: str) -> str:
+  """
+  Keyed digest of a refresh token, stored in RefreshToken.TokenHash.
+
+  The token is a signed JWT with a random jti, so a slow password hash adds
+  nothing: an HMAC keyed by SECRET_KEY cannot be recomputed from a leaked table,
+  and being deterministic it can be looked up through the TokenHash index.
+  """
+  digest = hmac.new(SECRET_KEY.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+  return f"{TOKEN_HASH_SCHEME}{digest}"
+
+def _utc_now() -> datetime:
+  # ExpiresAt is a naive DATETIME holding UTC
+  return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def create_refresh_token(user_id: int) -> tuple[str, str, datetime]:
+  jti = secrets.token_hex(18)
+  expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+  to_encode = {"UserId": user_id, "Jti": jti, "exp": expires_at}
+  refresh_token = jwt.encode(to_encode, SECRET_KEY, ALGORITHM)
+  return refresh_token, jti, expires_at
+
+class RefreshTokenService():
+  """
+  Issues, finds and rotates the stored refresh tokens.
+  Nothing is committed here, the caller owns the transaction.
+  """
+  def __init__(self, db: Session):
+    self.db = db
+
+  def issue(self, user_id: int) -> str:
+    """Create a refresh token for the user and add its record to the session."""
+    if settings.REFRESH_TOKEN_MAX_PER_USER > 0:
+      self.revoke_oldest(user_id, keep=settings.REFRESH_TOKEN_MAX_PER_USER - 1)
+    refresh_token, jti, expires_at = create_refresh_token(user_id=user_id)
+    self.db.add(RefreshTokenORM(
+      Jti=jti,
+      TokenHash=hash_refresh_token(refresh_token),
+      UserId=user_id,
+      ExpiresAt=expires_at
+    ))
+    return refresh_token
+
+  def find(self, token: str, user_id: int, jti: str) -> Optional[RefreshTokenORM]:
+    """
+    Stored record of a decoded refresh token, None when it was already used or revoked.
+
+    Keyed digests are found with one seek on the TokenHash index. Tokens issued
+    before the digest (bcrypt rows) are found by Jti and checked with bcrypt, they
+    disappear on their first refresh (the rotation stores a digest) or once expired.
+    """
+    token_hash = hash_refresh_token(token)
+    record = self.db.execute(
+      select(RefreshTokenORM).where(RefreshTokenORM.TokenHash == token_hash)
+    ).scalars().one_or_none()
+    if record is not None:
+      # The digest comparison already happened in the index, the claims must still match the row
+      if record.Jti != jti or record.UserId != user_id:
+        return None
+      return record
+
+    if not settings.REFRESH_TOKEN_ACCEPT_LEGACY_HASH:
+      return None
+    record = self.db.execute(
+      select(RefreshTokenORM).where(
+        RefreshTokenORM.Jti == jti,
+        RefreshTokenORM.UserId == user_id
+      )
+    ).scalars().one_or_none()
+    if record is None or not record.TokenHash.startswith(LEGACY_BCRYPT_PREFIX):
+      return None
+    if not password_hasher.verify(token, record.TokenHash):
+      return None
+    logger.info(f"Accepted a legacy bcrypt refresh token of user {user_id}, it is rotated to a keyed digest")
+    return record
+
+  def rotate(self, record: RefreshTokenORM) -> str:
+    """Revoke a used refresh token and issue its replacement."""
+    self.db.delete(record)
+    return self.issue(record.UserId)
+
+  def revoke_oldest(self, user_id: int, keep: int) -> int:
+    """
+    Delete the refresh tokens of a user beyond the keep most recent live ones
+    (expired ones included). Returns the number of deleted tokens.
+    """
+    token_ids = self.db.execute(
+      select(RefreshTokenORM.Id, RefreshTokenORM.ExpiresAt)
+      .where(RefreshTokenORM.UserId == user_id)
+      # Every token lives REFRESH_TOKEN_EXPIRE_DAYS, the latest expiry is the latest issued
+      .order_by(RefreshTokenORM.ExpiresAt.desc(), RefreshTokenORM.Id.desc())
+    ).all()
+    now = _utc_now()
+    live_ids = [row.Id for row in token_ids if row.ExpiresAt > now]
+    expired_ids = [row.Id for row in token_ids if row.ExpiresAt <= now]
+    revoked_ids = live_ids[max(keep, 0):] + expired_ids
+    if not revoked_ids:
+      return 0
+    self.db.execute(
+      delete(RefreshTokenORM)
+      .where(RefreshTokenORM.Id.in_(revoked_ids))
+      .execution_options(synchronize_session=False)
+    )
+    logger.info(f"Revoked {len(revoked_ids)} old refresh tokens of user {user_id}")
+    return len(revoked_ids)
+
+  def purge_expired(self, batch_size: int, max_batches: Optional[int] = None) -> int:
+    """
+    Delete the expired refresh tokens, batch_size rows per statement and transaction,
+    so the purge never holds long locks on the table. Returns the number of deleted rows.
+    """
+    now = _utc_now()
+    purged = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+      expired_ids = (
+        select(RefreshTokenORM.Id)
+        .where(RefreshTokenORM.ExpiresAt <= now)
+        # Ids grow with the issue time, the oldest rows (the expired ones) come first on the clustered key
+        .order_by(RefreshTokenORM.Id)
+        .limit(batch_size)
+        .scalar_subquery()
+      )
+      result = self.db.execute(
+        delete(RefreshTokenORM)
+        .where(RefreshTokenORM.Id.in_(expired_ids))
+        .execution_options(synchronize_session=False)
+      )
+      self.db.commit()
+      batches += 1
+      purged += result.rowcount
+      if result.rowcount < batch_size:
+        break
+    if purged:
+      logger.info(f"Purged {purged} expired refresh tokens in {batches} batches")
+    return purged
+
+def purge_expired_refresh_tokens_job(batch_size: int) -> int:
+  """Purge the expired refresh tokens in its own session (used by the background loop)."""
+  with Session(engine) as db:
+    return RefreshTokenService(db).purge_expired(batch_size=batch_size)
+
+async def run_refresh_token_purge_loop(interval_minutes: int, batch_size: int):
+  """Purge the expired refresh tokens at startup and then every interval_minutes."""
+  while True:
+    try:
+      await asyncio.to_thread(purge_expired_refresh_tokens_job, batch_size)
+    except Exception as e:
+      logger.error(f"Refresh token purge failed: {e}")
+    await asyncio.sleep(interval_minutes * 60)
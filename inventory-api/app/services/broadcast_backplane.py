@@ -0,0 +1,205 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+import asyncio
+import os
+import secrets
+import sqlite3
+import time
+from app.core.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+BroadcastHandler = Callable[[str], Awaitable[None]]
+
+class BroadcastBackplane():
+  """
+  Pub/sub between the API workers. publish() hands a message to the subscribers
+  of its channel in this worker right away, and to the ones of the other workers
+  through the backplane. A subscriber can skip the messages of its own worker
+  (include_own=False), e.g. to apply a change the publishing worker already made.
+  """
+  name = "base"
+
+  def __init__(self):
+    self.worker_id = f"{os.getpid()}-{secrets.token_hex(4)}"
+    self._subscribers: dict[str, list[tuple[BroadcastHandler, bool]]] = {}
+    self.published = 0
+    self.received = 0
+    self.handler_errors = 0
+    self.send_errors = 0
+
+  def subscribe(self, channel: str, handler: BroadcastHandler, include_own: bool = True):
+    self._subscribers.setdefault(channel, []).append((handler, include_own))
+
+  async def start(self):
+    pass
+
+  async def stop(self):
+    pass
+
+  async def publish(self, channel: str, message: str):
+    self.published += 1
+    await self._deliver(channel, message, own=True)
+    try:
+      await self._send(channel, message)
+    except Exception as e:
+      # The local subscribers already have it, the other workers miss this message
+      self.send_errors += 1
+      logger.error(f"Could not publish to the {self.name} backplane on {channel}: {e}")
+
+  async def _send(self, channel: str, message: str):
+    """Hands the message to the other workers."""
+    raise NotImplementedError
+
+  async def _deliver(self, channel: str, message: str, own: bool):
+    for handler, include_own in self._subscribers.get(channel, ()):
+      if own and not include_own:
+        continue
+      try:
+        await handler(message)
+      except Exception as e:
+        self.handler_errors += 1
+        logger.error(f"Broadcast handler failed on {channel}: {e}")
+
+  def stats(self) -> dict:
+    return {
+      "backplane": self.name,
+      "worker_id": self.worker_id,
+      "channels": {channel: len(handlers) for channel, handlers in self._subscribers.items()},
+      "published": self.published,
+      "received": self.received,
+      "send_errors": self.send_errors,
+      "handler_errors": self.handler_errors
+    }
+
+class InProcessBackplane(BroadcastBackplane):
+  """Single worker: the local delivery of publish() is all there is."""
+  name = "memory"
+
+  async def _send(self, channel: str, message: str):
+    pass
+
+class SQLiteBackplane(BroadcastBackplane):
+  """
+  Workers of one host sharing a SQLite file (WAL mode): publish() appends a row,
+  every worker polls the rows after the last one it read every poll_interval_seconds
+  and delivers the ones of the other workers. Rows older than retention_seconds are
+  pruned. A worker only reads the messages published after it started. The file
+  is opened by one thread per worker, the event loop never waits on it.
+  """
+  name = "sqlite"
+
+  def __init__(self, path: str, poll_interval_seconds: float, retention_seconds: float):
+    super().__init__()
+    self.path = path
+    self.poll_interval_seconds = poll_interval_seconds
+    self.retention_seconds = retention_seconds
+    self._executor: Optional[ThreadPoolExecutor] = None
+    self._connection: Optional[sqlite3.Connection] = None
+    self._poller: Optional[asyncio.Task] = None
+    self._last_id = 0
+    self._last_pruned_at = 0.0
+    self.polls = 0
+    self.poll_errors = 0
+    self.max_delay_seconds = 0.0
+
+  async def _run(self, function, *args):
+    return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+  def _open(self):
+    self._connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+    self._connection.execute("PRAGMA journal_mode=WAL")
+    self._connection.execute("PRAGMA synchronous=NORMAL")
+    self._connection.execute(
+      "CREATE TABLE IF NOT EXISTS BroadcastMessage ("
+      "Id INTEGER PRIMARY KEY AUTOINCREMENT, Channel TEXT NOT NULL, Message TEXT NOT NULL, "
+      "Origin TEXT NOT NULL, CreatedAt REAL NOT NULL)"
+    )
+    self._last_id = self._connection.execute("SELECT COALESCE(MAX(Id), 0) FROM BroadcastMessage").fetchone()[0]
+
+  def _close(self):
+    if self._connection is not None:
+      self._connection.close()
+      self._connection = None
+
+  def _insert(self, channel: str, message: str):
+    self._connection.execute(
+      "INSERT INTO BroadcastMessage (Channel, Message, Origin, CreatedAt) VALUES (?, ?, ?, ?)",
+      (channel, message, self.worker_id, time.time())
+    )
+
+  def _fetch(self) -> list[tuple[int, str, str, str, float]]:
+    rows = self._connection.execute(
+      "SELECT Id, Channel, Message, Origin, CreatedAt FROM BroadcastMessage WHERE Id > ? ORDER BY Id",
+      (self._last_id,)
+    ).fetchall()
+    if rows:
+      self._last_id = rows[-1][0]
+    now = time.time()
+    if now - self._last_pruned_at >= self.retention_seconds:
+      self._connection.execute("DELETE FROM BroadcastMessage WHERE CreatedAt < ?", (now - self.retention_seconds,))
+      self._last_pruned_at = now
+    return rows
+
+  async def start(self):
+    if self._executor is not None:
+      return
+    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="broadcast-backplane")
+    await self._run(self._open)
+    self._poller = asyncio.create_task(self._poll())
+    logger.info(f"Started the SQLite broadcast backplane on {self.path} as worker {self.worker_id}")
+
+  async def stop(self):
+    if self._executor is None:
+      return
+    self._poller.cancel()
+    await asyncio.gather(self._poller, return_exceptions=True)
+    await self._run(self._close)
+    self._executor.shutdown(wait=False)
+    self._executor = None
+    self._poller = None
+
+  async def _send(self, channel: str, message: str):
+    # Started on first use when the application lifespan did not (tests)
+    await self.start()
+    await self._run(self._insert, channel, message)
+
+  async def _poll(self):
+    while True:
+      await asyncio.sleep(self.poll_interval_seconds)
+      try:
+        rows = await self._run(self._fetch)
+      except Exception as e:
+        self.poll_errors += 1
+        logger.error(f"Polling the broadcast backplane failed: {e}")
+        continue
+      self.polls += 1
+      for _, channel, message, origin, created_at in rows:
+        if origin == self.worker_id:
+          continue
+        self.received += 1
+        self.max_delay_seconds = max(self.max_delay_seconds, time.time() - created_at)
+        await self._deliver(channel, message, own=False)
+
+  def stats(self) -> dict:
+    return {
+      **super().stats(),
+      "path": self.path,
+      "poll_interval_seconds": self.poll_interval_seconds,
+      "polls": self.polls,
+      "poll_errors": self.poll_errors,
+      "last_id": self._last_id,
+      "max_delay_ms": round(self.max_delay_seconds * 1000, 3)
+    }
+
+def create_broadcast_backplane() -> BroadcastBackplane:
+  if settings.BROADCAST_BACKPLANE == "sqlite":
+    return SQLiteBackplane(
+      settings.BROADCAST_SQLITE_PATH,
+      poll_interval_seconds=settings.BROADCAST_POLL_INTERVAL_SECONDS,
+      retention_seconds=settings.BROADCAST_RETENTION_SECONDS
+    )
+  return InProcessBackplane()
+
+broadcast_backplane = create_broadcast_backplane()
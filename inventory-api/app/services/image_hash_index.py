@@ -0,0 +1,99 @@
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from typing import Optional
+from app.database.product_image_asset_model import ProductImageAsset
+from app.services.image_storage import StoredImage
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class ImageHashIndex():
+  """
+  Persistent content hash -> stored image index (ProductImageAsset), so the same
+  bytes are sent to the storage once. Entries are per storage backend, an image id
+  of one storage means nothing to another. Blocking calls, made from the upload
+  worker threads with their own sessions.
+  """
+  def __init__(self, session_factory: sessionmaker, storage_name: str):
+    self.session_factory = session_factory
+    self.storage_name = storage_name
+    self.hits = 0
+    self.misses = 0
+    self.bytes_saved = 0
+
+  def find(self, content_hash: str) -> Optional[StoredImage]:
+    """The image already stored with these bytes, recorded as used again."""
+    with self.session_factory() as db:
+      asset = db.execute(
+        select(ProductImageAsset.ImageId, ProductImageAsset.ImageUrl, ProductImageAsset.ThumbnailUrl,
+               ProductImageAsset.MediumUrl, ProductImageAsset.SizeBytes)
+        .where(ProductImageAsset.ContentHash == content_hash, ProductImageAsset.Storage == self.storage_name)
+      ).one_or_none()
+      if asset is None:
+        self.misses += 1
+        return None
+      db.execute(
+        update(ProductImageAsset)
+        .where(ProductImageAsset.ContentHash == content_hash, ProductImageAsset.Storage == self.storage_name)
+        .values(UseCount=ProductImageAsset.UseCount + 1, LastUsedAt=datetime.utcnow())
+      )
+      db.commit()
+    self.hits += 1
+    self.bytes_saved += asset.SizeBytes
+    return StoredImage(image_id=asset.ImageId, url=asset.ImageUrl, thumbnail_url=asset.ThumbnailUrl, medium_url=asset.MediumUrl)
+
+  def remember(self, content_hash: str, image: StoredImage, size_bytes: int):
+    with self.session_factory() as db:
+      db.add(ProductImageAsset(
+        ContentHash=content_hash,
+        Storage=self.storage_name,
+        ImageId=image.image_id,
+        ImageUrl=image.url,
+        ThumbnailUrl=image.thumbnail_url,
+        MediumUrl=image.medium_url,
+        SizeBytes=size_bytes
+      ))
+      try:
+        db.commit()
+      except IntegrityError:
+        # The same bytes were uploaded concurrently, the first image stays the indexed one
+        db.rollback()
+        logger.info(f"Image {image.image_id} has the content of an already indexed image, not indexed")
+
+  def release(self, image_id: str, keep_if_used_within_seconds: float) -> bool:
+    """
+    Called before the storage deletes image_id. False when a recent upload was answered
+    with it (its client may not have saved it on a product yet): the image is kept.
+    The upload that stored the image does not count, only the ones answered with it.
+    Otherwise its entry is dropped so no later upload is answered with a deleted image.
+    """
+    with self.session_factory() as db:
+      recently_used = db.execute(
+        select(ProductImageAsset.ContentHash)
+        .where(
+          ProductImageAsset.ImageId == image_id,
+          ProductImageAsset.Storage == self.storage_name,
+          # Answered at least once besides the upload that stored it
+          ProductImageAsset.UseCount > 1,
+          ProductImageAsset.LastUsedAt >= datetime.utcnow() - timedelta(seconds=keep_if_used_within_seconds)
+        )
+      ).first()
+      if recently_used is not None:
+        return False
+      db.execute(
+        delete(ProductImageAsset)
+        .where(ProductImageAsset.ImageId == image_id, ProductImageAsset.Storage == self.storage_name)
+      )
+      db.commit()
+    return True
+
+  def stats(self) -> dict:
+    lookups = self.hits + self.misses
+    return {
+      "hits": self.hits,
+      "misses": self.misses,
+      "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+      "bytes_saved": self.bytes_saved
+    }
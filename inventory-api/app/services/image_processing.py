@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from typing import Optional
+import os
+import tempfile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from app.core.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Variant name -> longest side in pixels, stored next to every processed image
+IMAGE_VARIANTS = {
+  "medium": settings.IMAGE_MEDIUM_SIZE,
+  "thumbnail": settings.IMAGE_THUMBNAIL_SIZE
+}
+
+@dataclass
+class ProcessedImage:
+  """The image to store (original or re-encoded) and its variant files, all to be removed by the caller."""
+  path: str
+  content_type: Optional[str]
+  variants: dict[str, str] = field(default_factory=dict)
+
+  def paths(self) -> list[str]:
+    return [self.path, *self.variants.values()]
+
+def _has_alpha(image: Image.Image) -> bool:
+  return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+def _save(image: Image.Image, transparent: bool) -> str:
+  # PNG keeps the transparency, everything else becomes a progressive JPEG
+  suffix = ".png" if transparent else ".jpg"
+  with tempfile.NamedTemporaryFile(prefix="image-processed-", suffix=suffix, delete=False) as target:
+    if transparent:
+      image.save(target, format="PNG", optimize=True)
+    else:
+      image.convert("RGB").save(target, format="JPEG", quality=settings.IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    return target.name
+
+def _resized(image: Image.Image, max_size: int) -> Image.Image:
+  resized = image.copy()
+  resized.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+  return resized
+
+def process_image(path: str, content_type: Optional[str]) -> ProcessedImage:
+  """
+  Downscales the upload at path to IMAGE_MAX_DIMENSION and recompresses it, and
+  renders the IMAGE_VARIANTS. Blocking, called from the upload worker threads.
+  The uploaded file is kept when the re-encoded one is not smaller, and kept alone,
+  without variants, when Pillow cannot read it (SVG...).
+  """
+  try:
+    image = Image.open(path)
+  except UnidentifiedImageError:
+    logger.info(f"Unreadable image ({content_type}), stored as uploaded without variants")
+    return ProcessedImage(path=path, content_type=content_type)
+  with image:
+    # A JPEG is decoded at a reduced scale directly, far cheaper than decoding it whole
+    if image.format == "JPEG":
+      image.draft("RGB", (settings.IMAGE_MAX_DIMENSION, settings.IMAGE_MAX_DIMENSION))
+    # Phone photos are rotated by an EXIF tag, the re-encoded files carry no EXIF
+    image = _resized(ImageOps.exif_transpose(image), settings.IMAGE_MAX_DIMENSION)
+  transparent = _has_alpha(image)
+  created: list[str] = []
+  try:
+    recompressed = _save(image, transparent)
+    created.append(recompressed)
+    variants = {}
+    for name, max_size in IMAGE_VARIANTS.items():
+      variants[name] = _save(_resized(image, max_size), transparent)
+      created.append(variants[name])
+  except Exception:
+    for created_path in created:
+      os.remove(created_path)
+    raise
+  if os.path.getsize(recompressed) < os.path.getsize(path):
+    return ProcessedImage(path=recompressed, content_type="image/png" if transparent else "image/jpeg", variants=variants)
+  os.remove(recompressed)
+  return ProcessedImage(path=path, content_type=content_type, variants=variants)
@@ -0,0 +1,124 @@
+from dataclasses import dataclass, replace
+from typing import Optional
+import glob
+import mimetypes
+import os
+import shutil
+import time
+import uuid
+import cloudinary.uploader
+from app.core.config import settings
+from app.services.image_processing import IMAGE_VARIANTS, ProcessedImage
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+@dataclass(frozen=True)
+class StoredImage:
+  image_id: str
+  url: str
+  # Downscaled copies for the lists, None for images stored without variants
+  thumbnail_url: Optional[str] = None
+  medium_url: Optional[str] = None
+
+class ImageStorage():
+  """
+  Where the product images live. Blocking calls: the upload queue runs them in its
+  worker threads, never on the event loop.
+  """
+  name = "base"
+
+  def upload(self, path: str, content_type: Optional[str] = None) -> StoredImage:
+    raise NotImplementedError
+
+  def upload_variant(self, image_id: str, variant: str, path: str) -> str:
+    """Stores a variant of image_id, under an id derived from it, returns its url."""
+    raise NotImplementedError
+
+  def delete(self, image_id: str):
+    """Deletes the image and its variants."""
+    raise NotImplementedError
+
+  def store(self, processed: ProcessedImage) -> StoredImage:
+    image = self.upload(processed.path, processed.content_type)
+    try:
+      urls = {variant: self.upload_variant(image.image_id, variant, path) for variant, path in processed.variants.items()}
+    except Exception:
+      try:
+        self.delete(image.image_id)
+      except Exception as e:
+        logger.warning(f"Could not delete the image {image.image_id} of a failed variant upload: {e}")
+      raise
+    return replace(image, thumbnail_url=urls.get("thumbnail"), medium_url=urls.get("medium"))
+
+class CloudinaryImageStorage(ImageStorage):
+  name = "cloudinary"
+
+  def upload(self, path: str, content_type: Optional[str] = None) -> StoredImage:
+    result = cloudinary.uploader.upload(path)
+    url = result.get("secure_url")
+    if not url:
+      raise RuntimeError("Cloudinary failed to return an url")
+    return StoredImage(image_id=result.get("public_id"), url=url)
+
+  def upload_variant(self, image_id: str, variant: str, path: str) -> str:
+    result = cloudinary.uploader.upload(path, public_id=f"{image_id}_{variant}")
+    url = result.get("secure_url")
+    if not url:
+      raise RuntimeError("Cloudinary failed to return an url")
+    return url
+
+  def delete(self, image_id: str):
+    cloudinary.uploader.destroy(image_id)
+    # Images stored before the variants existed have none, destroy answers "not found"
+    for variant in IMAGE_VARIANTS:
+      cloudinary.uploader.destroy(f"{image_id}_{variant}")
+
+class LocalImageStorage(ImageStorage):
+  """
+  Images copied under root_dir and served from base_url (local development, tests
+  and benchmarks). latency_seconds simulates the round trip of a remote store.
+  """
+  name = "local"
+
+  def __init__(self, root_dir: str, base_url: str, latency_seconds: float = 0.0):
+    self.root_dir = root_dir
+    self.base_url = base_url.rstrip("/")
+    self.latency_seconds = latency_seconds
+    os.makedirs(root_dir, exist_ok=True)
+
+  def upload(self, path: str, content_type: Optional[str] = None) -> StoredImage:
+    if self.latency_seconds:
+      time.sleep(self.latency_seconds)
+    extension = (mimetypes.guess_extension(content_type) if content_type else None) or ""
+    image_id = f"{uuid.uuid4().hex}{extension}"
+    shutil.copyfile(path, os.path.join(self.root_dir, image_id))
+    return StoredImage(image_id=image_id, url=f"{self.base_url}/{image_id}")
+
+  def upload_variant(self, image_id: str, variant: str, path: str) -> str:
+    if self.latency_seconds:
+      time.sleep(self.latency_seconds)
+    # <image stem>_<variant> with the extension of the variant file, which can differ from the image's
+    variant_id = f"{os.path.splitext(image_id)[0]}_{variant}{os.path.splitext(path)[1]}"
+    shutil.copyfile(path, os.path.join(self.root_dir, variant_id))
+    return f"{self.base_url}/{variant_id}"
+
+  def delete(self, image_id: str):
+    # Only names this storage created, never a path outside root_dir
+    if os.path.basename(image_id) != image_id:
+      raise ValueError(f"Invalid local image id {image_id!r}")
+    if self.latency_seconds:
+      time.sleep(self.latency_seconds)
+    try:
+      os.remove(os.path.join(self.root_dir, image_id))
+    except FileNotFoundError:
+      logger.warning(f"Local image {image_id} was already deleted")
+    stem = glob.escape(os.path.splitext(image_id)[0])
+    for variant in IMAGE_VARIANTS:
+      for variant_path in glob.glob(os.path.join(glob.escape(self.root_dir), f"{stem}_{variant}.*")):
+        os.remove(variant_path)
+
+def create_image_storage() -> ImageStorage:
+  if settings.IMAGE_STORAGE_BACKEND == "local":
+    return LocalImageStorage(settings.IMAGE_STORAGE_LOCAL_DIR, settings.IMAGE_STORAGE_LOCAL_BASE_URL)
+  return CloudinaryImageStorage()
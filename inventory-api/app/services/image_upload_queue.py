@@ -0,0 +1,364 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from fastapi import HTTPException, UploadFile, status
+from typing import Awaitable, Callable, Optional, IO
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import time
+import uuid
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.services.broadcast_backplane import BroadcastBackplane, broadcast_backplane
+from app.services.image_hash_index import ImageHashIndex
+from app.services.image_processing import ProcessedImage, process_image
+from app.services.image_storage import ImageStorage, StoredImage, create_image_storage
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+class ImageUploadQueueFull(HTTPException):
+  """Every worker is busy and the queue is full, the client should retry later."""
+  def __init__(self, retry_after_seconds: int):
+    super().__init__(
+      status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+      detail="Too many image uploads in progress, please retry shortly",
+      headers={"Retry-After": str(retry_after_seconds)}
+    )
+
+@dataclass
+class ImageUploadJob:
+  job_id: str
+  path: str
+  content_type: Optional[str]
+  product_id: Optional[int] = None
+  # Runs in the worker thread once the image is stored, returns the id of the image it replaced
+  # (deleted afterwards). If it raises, the new image is deleted and the job fails.
+  apply: Optional[Callable[[StoredImage], Optional[str]]] = None
+  status: str = "queued"
+  # SHA-256 of the uploaded bytes
+  content_hash: Optional[str] = None
+  size_bytes: int = 0
+  # Answered with an already stored image of the same content, nothing sent to the storage
+  deduplicated: bool = False
+  image: Optional[StoredImage] = None
+  error: Optional[str] = None
+  created_at: float = 0.0
+  started_at: Optional[float] = None
+  finished_at: Optional[float] = None
+  # Copy of a job of another worker, kept up to date through the backplane
+  mirrored: bool = False
+  # Last state change, mirrored jobs expire job_ttl_seconds after it
+  updated_at: float = 0.0
+
+  @property
+  def finished(self) -> bool:
+    return self.status in ("succeeded", "failed")
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Job states, published by the worker running the job and mirrored by the others
+IMAGE_UPLOAD_CHANNEL = "image_uploads"
+
+# Job fields published on IMAGE_UPLOAD_CHANNEL (path and apply stay in the worker)
+_JOB_STATE_FIELDS = ("job_id", "content_type", "product_id", "status", "content_hash", "size_bytes",
+                     "deduplicated", "error", "created_at", "started_at", "finished_at")
+
+def _spool_to_temp_file(source: IO[bytes], suffix: str) -> tuple[str, str, int]:
+  # The upload's spooled file is closed with the request, the job keeps its own copy.
+  # The bytes are hashed during the copy, the file is read once
+  digest = hashlib.sha256()
+  size = 0
+  with tempfile.NamedTemporaryFile(prefix="image-upload-", suffix=suffix, delete=False) as target:
+    while chunk := source.read(SPOOL_CHUNK_SIZE):
+      digest.update(chunk)
+      target.write(chunk)
+      size += len(chunk)
+    return target.name, digest.hexdigest(), size
+
+def _remove_file(path: str):
+  try:
+    os.remove(path)
+  except FileNotFoundError:
+    pass
+
+class ImageUploadQueue():
+  """
+  Background image uploads: the handlers copy the file aside, queue a job and
+  answer 202 right away; max_workers jobs talk to the storage at once, in a
+  dedicated thread pool, so a slow upload never blocks the event loop nor takes
+  the threads of the sync routes. At most max_queue jobs wait, beyond that
+  submit() fails fast with ImageUploadQueueFull (503 + Retry-After).
+
+  With a hash_index, bytes already stored are not uploaded again: a new image
+  upload is answered succeeded from submit() with the existing image, a product
+  image replacement only applies it. Images are then shared, the image replaced
+  on a product is deleted only when no other product uses it (apply returns None)
+  and no upload was answered with it within job_ttl_seconds.
+
+  Jobs are kept job_ttl_seconds after they finish for status polling, and the
+  listeners (websocket broadcast) are awaited with each finished job. A job runs
+  in the worker process that accepted the upload; with a backplane its state
+  changes are published on IMAGE_UPLOAD_CHANNEL and mirrored by the other workers,
+  so status polling works through any of them (for the jobs published after they
+  started).
+  """
+  def __init__(self, storage: ImageStorage, max_workers: int, max_queue: int, job_ttl_seconds: float, retry_after_seconds: int,
+               hash_index: Optional[ImageHashIndex] = None, backplane: Optional[BroadcastBackplane] = None):
+    self.storage = storage
+    self.hash_index = hash_index
+    self.backplane = backplane
+    self.max_workers = max_workers
+    self.max_queue = max_queue
+    self.job_ttl_seconds = job_ttl_seconds
+    self.retry_after_seconds = retry_after_seconds
+    self._queue: Optional[asyncio.Queue] = None
+    self._workers: list[asyncio.Task] = []
+    self._executor: Optional[ThreadPoolExecutor] = None
+    self._jobs: OrderedDict[str, ImageUploadJob] = OrderedDict()
+    self._listeners: list[Callable[[ImageUploadJob], Awaitable[None]]] = []
+    self.submitted = 0
+    self.succeeded = 0
+    self.failed = 0
+    self.rejected = 0
+    self.deduplicated = 0
+    self.mirrored = 0
+    self.upload_total_seconds = 0.0
+    if backplane is not None:
+      backplane.subscribe(IMAGE_UPLOAD_CHANNEL, self._mirror, include_own=False)
+
+  def add_listener(self, listener: Callable[[ImageUploadJob], Awaitable[None]]):
+    self._listeners.append(listener)
+
+  def start(self):
+    if self._queue is not None:
+      return
+    self._queue = asyncio.Queue(maxsize=self.max_queue)
+    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-upload")
+    self._workers = [asyncio.create_task(self._work()) for _ in range(self.max_workers)]
+    logger.info(f"Started the image upload queue with {self.max_workers} workers ({self.storage.name} storage)")
+
+  async def stop(self):
+    if self._queue is None:
+      return
+    for worker in self._workers:
+      worker.cancel()
+    await asyncio.gather(*self._workers, return_exceptions=True)
+    # Queued jobs are lost with the process, their files are not
+    while not self._queue.empty():
+      _remove_file(self._queue.get_nowait().path)
+    self._executor.shutdown(wait=False, cancel_futures=True)
+    self._queue = None
+    self._workers = []
+    self._executor = None
+
+  async def submit(self, upload_file: UploadFile, product_id: Optional[int] = None,
+                   apply: Optional[Callable[[StoredImage], Optional[str]]] = None) -> ImageUploadJob:
+    # Started on first use when the application lifespan did not (tests)
+    self.start()
+    if self._queue.full():
+      self.rejected += 1
+      logger.warning(f"Image upload queue full ({self._queue.qsize()} jobs waiting), rejecting the upload")
+      raise ImageUploadQueueFull(self.retry_after_seconds)
+    suffix = mimetypes.guess_extension(upload_file.content_type or "") or ""
+    path, content_hash, size_bytes, existing_image = await asyncio.to_thread(self._prepare, upload_file.file, suffix)
+    job = ImageUploadJob(
+      job_id=uuid.uuid4().hex,
+      path=path,
+      content_type=upload_file.content_type,
+      product_id=product_id,
+      apply=apply,
+      content_hash=content_hash,
+      size_bytes=size_bytes,
+      deduplicated=existing_image is not None,
+      image=existing_image,
+      created_at=time.time()
+    )
+    job.updated_at = job.created_at
+    self._purge_finished_jobs()
+    self._jobs[job.job_id] = job
+    if job.deduplicated:
+      self.deduplicated += 1
+      if apply is None:
+        # Nothing left to do in a worker, the job is answered finished
+        job.status = "succeeded"
+        job.started_at = job.finished_at = job.created_at
+        self.submitted += 1
+        self.succeeded += 1
+        await self._publish(job)
+        asyncio.create_task(self._notify(job))
+        return job
+    try:
+      self._queue.put_nowait(job)
+    except asyncio.QueueFull:
+      # Another upload took the last slot while the file was being copied
+      del self._jobs[job.job_id]
+      _remove_file(path)
+      self.rejected += 1
+      raise ImageUploadQueueFull(self.retry_after_seconds)
+    self.submitted += 1
+    await self._publish(job)
+    return job
+
+  def get(self, job_id: str) -> Optional[ImageUploadJob]:
+    self._purge_finished_jobs()
+    return self._jobs.get(job_id)
+
+  def _prepare(self, source: IO[bytes], suffix: str) -> tuple[str, str, int, Optional[StoredImage]]:
+    path, content_hash, size_bytes = _spool_to_temp_file(source, suffix)
+    if self.hash_index is None:
+      return path, content_hash, size_bytes, None
+    try:
+      existing_image = self.hash_index.find(content_hash)
+    except Exception as e:
+      # The index only saves uploads, a failing lookup uploads the file
+      logger.warning(f"Image hash lookup failed, uploading: {e}")
+      return path, content_hash, size_bytes, None
+    if existing_image is not None:
+      logger.info(f"Image upload of {size_bytes} bytes answered with the stored image {existing_image.image_id}")
+      _remove_file(path)
+    return path, content_hash, size_bytes, existing_image
+
+  def _purge_finished_jobs(self):
+    expired_before = time.time() - self.job_ttl_seconds
+    # A mirrored job may never finish here (its worker stopped), it expires with its last update
+    expired = [
+      job_id for job_id, job in self._jobs.items()
+      if (job.finished and job.finished_at < expired_before) or (job.mirrored and job.updated_at < expired_before)
+    ]
+    for job_id in expired:
+      del self._jobs[job_id]
+
+  def _store(self, job: ImageUploadJob) -> StoredImage:
+    # Worker thread: downscale and upload (unless deduplicated), apply to the database, then drop the replaced image
+    if job.deduplicated:
+      image = job.image
+    else:
+      processed: Optional[ProcessedImage] = None
+      try:
+        processed = process_image(job.path, job.content_type)
+        image = self.storage.store(processed)
+      finally:
+        for path in {job.path, *(processed.paths() if processed else ())}:
+          _remove_file(path)
+    replaced_image_id = None
+    if job.apply is not None:
+      try:
+        replaced_image_id = job.apply(image)
+      except Exception:
+        # A deduplicated image belongs to other uploads, it is never an orphan
+        if not job.deduplicated:
+          try:
+            self.storage.delete(image.image_id)
+          except Exception as e:
+            logger.warning(f"Could not delete the orphan image {image.image_id}: {e}")
+        raise
+    if not job.deduplicated and self.hash_index is not None:
+      try:
+        self.hash_index.remember(job.content_hash, image, job.size_bytes)
+      except Exception as e:
+        logger.warning(f"Could not index the image {image.image_id}: {e}")
+    if replaced_image_id and replaced_image_id != image.image_id:
+      self._delete_replaced(replaced_image_id)
+    return image
+
+  def _delete_replaced(self, image_id: str):
+    try:
+      if self.hash_index is not None and not self.hash_index.release(image_id, keep_if_used_within_seconds=self.job_ttl_seconds):
+        logger.info(f"Kept the replaced image {image_id}, a recent upload was answered with it")
+        return
+      self.storage.delete(image_id)
+    except Exception as e:
+      logger.warning(f"Could not delete the replaced image {image_id}: {e}")
+
+  async def _work(self):
+    loop = asyncio.get_running_loop()
+    while True:
+      job = await self._queue.get()
+      job.status = "running"
+      job.started_at = job.updated_at = time.time()
+      await self._publish(job)
+      try:
+        job.image = await loop.run_in_executor(self._executor, self._store, job)
+        job.status = "succeeded"
+        self.succeeded += 1
+      except Exception as e:
+        job.status = "failed"
+        job.error = str(e) or e.__class__.__name__
+        self.failed += 1
+        logger.error(f"Image upload {job.job_id} failed: {job.error}")
+      finally:
+        job.finished_at = job.updated_at = time.time()
+        self.upload_total_seconds += job.finished_at - job.started_at
+        self._queue.task_done()
+      # Published before the listeners: a worker gets the state before the websocket event
+      await self._publish(job)
+      await self._notify(job)
+
+  async def _publish(self, job: ImageUploadJob):
+    if self.backplane is None:
+      return
+    state = {name: getattr(job, name) for name in _JOB_STATE_FIELDS}
+    state["image"] = asdict(job.image) if job.image else None
+    try:
+      await self.backplane.publish(IMAGE_UPLOAD_CHANNEL, json.dumps(state))
+    except Exception as e:
+      # Only the status polling through the other workers misses it
+      logger.warning(f"Could not publish the state of image upload {job.job_id}: {e}")
+
+  async def _mirror(self, message: str):
+    state = json.loads(message)
+    image = state.pop("image")
+    job = self._jobs.get(state["job_id"])
+    if job is not None and not job.mirrored:
+      return
+    self._purge_finished_jobs()
+    self._jobs[state["job_id"]] = ImageUploadJob(
+      path="",
+      image=StoredImage(**image) if image else None,
+      mirrored=True,
+      updated_at=time.time(),
+      **state
+    )
+    self.mirrored += 1
+
+  async def _notify(self, job: ImageUploadJob):
+    for listener in self._listeners:
+      try:
+        await listener(job)
+      except Exception as e:
+        logger.error(f"Image upload listener failed for job {job.job_id}: {e}")
+
+  def stats(self) -> dict:
+    finished = self.succeeded + self.failed
+    return {
+      "storage": self.storage.name,
+      "max_workers": self.max_workers,
+      "max_queue": self.max_queue,
+      "queued": self._queue.qsize() if self._queue is not None else 0,
+      "running": sum(1 for job in self._jobs.values() if job.status == "running" and not job.mirrored),
+      "submitted": self.submitted,
+      "succeeded": self.succeeded,
+      "failed": self.failed,
+      "rejected": self.rejected,
+      "deduplicated": self.deduplicated,
+      "mirrored": self.mirrored,
+      "hash_index": self.hash_index.stats() if self.hash_index is not None else None,
+      "avg_upload_ms": round(self.upload_total_seconds * 1000 / finished, 3) if finished else 0.0
+    }
+
+_image_storage = create_image_storage()
+
+image_upload_queue = ImageUploadQueue(
+  _image_storage,
+  max_workers=settings.IMAGE_UPLOAD_WORKERS,
+  max_queue=settings.IMAGE_UPLOAD_MAX_QUEUE,
+  job_ttl_seconds=settings.IMAGE_UPLOAD_JOB_TTL_SECONDS,
+  retry_after_seconds=settings.IMAGE_UPLOAD_RETRY_AFTER_SECONDS,
+  hash_index=ImageHashIndex(SessionLocal, _image_storage.name) if settings.IMAGE_UPLOAD_DEDUP_ENABLED else None,
+  backplane=broadcast_backplane
+)
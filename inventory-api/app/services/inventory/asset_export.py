@@ -0,0 +1,147 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator
+import csv
+import io
+import json
+import zlib
+from app.database.asset_model import Asset as AssetORM
+from app.database.product_model import Product as ProductORM
+from app.database.warehouse_zone_model import Zone as ZoneORM
+from app.database.purchase_order_model import PurchaseOrderItem as PurchaseOrderItemORM
+from app.database.connection import engine
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Rows fetched from the cursor per round trip, also the size of one streamed chunk
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = (
+  "asset_id",
+  "serial_number",
+  "asset_status",
+  "product_id",
+  "model_number_sku",
+  "product_name",
+  "zone_id",
+  "zone_name",
+  "purchase_order_id",
+  "purchase_order_line_id",
+  "shipment_manifest_line_id",
+  "goods_receipt_id",
+  "last_movement_date"
+)
+
+@dataclass
+class AssetExportFilter:
+  statuses: list[str] | None = None
+  zone_id: int | None = None
+  product_id: int | None = None
+  start_date: date | None = None
+  end_date: date | None = None
+
+def _build_export_query(filters: AssetExportFilter):
+  query = (
+    select(
+      AssetORM.AssetId,
+      AssetORM.SerialNumber,
+      AssetORM.AssetStatus,
+      AssetORM.ProductId,
+      ProductORM.ModelNumber_SKU,
+      ProductORM.ProductName,
+      AssetORM.CurrentZoneId,
+      ZoneORM.ZoneName,
+      PurchaseOrderItemORM.PurchaseOrderId,
+      AssetORM.PurchaseOrderLineId,
+      AssetORM.ShipmentManifestLineId,
+      AssetORM.GoodsReceiptId,
+      AssetORM.LastMovementDate
+    )
+    .join(ProductORM, ProductORM.ProductId == AssetORM.ProductId)
+    .join(ZoneORM, ZoneORM.ZoneId == AssetORM.CurrentZoneId)
+    .outerjoin(PurchaseOrderItemORM, PurchaseOrderItemORM.PurchaseOrderItemId == AssetORM.PurchaseOrderLineId)
+    .order_by(AssetORM.AssetId)
+  )
+  if filters.statuses:
+    query = query.where(AssetORM.AssetStatus.in_(filters.statuses))
+  if filters.zone_id is not None:
+    query = query.where(AssetORM.CurrentZoneId == filters.zone_id)
+  if filters.product_id is not None:
+    query = query.where(AssetORM.ProductId == filters.product_id)
+  if filters.start_date:
+    query = query.where(AssetORM.LastMovementDate >= datetime.combine(filters.start_date, datetime.min.time()))
+  if filters.end_date:
+    # Include the whole end day
+    query = query.where(AssetORM.LastMovementDate < datetime.combine(filters.end_date + timedelta(days=1), datetime.min.time()))
+  return query
+
+def _json_default(value):
+  if isinstance(value, (date, datetime)):
+    return value.isoformat()
+  return str(value)
+
+def _format_csv(rows, include_header: bool) -> str:
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  if include_header:
+    writer.writerow(EXPORT_COLUMNS)
+  writer.writerows(
+    [value.isoformat() if isinstance(value, datetime) else value for value in row]
+    for row in rows
+  )
+  return buffer.getvalue()
+
+def _format_ndjson(rows) -> str:
+  return "".join(
+    json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_json_default) + "\n"
+    for row in rows
+  )
+
+def iter_asset_export(
+  filters: AssetExportFilter,
+  export_format: str = "csv",
+  compress: bool = False
+) -> Iterator[bytes]:
+  """
+  Stream the filtered assets as CSV or NDJSON chunks.
+
+  The generator opens its own session (the request session is closed before
+  the response body is sent) and reads through a server side cursor with
+  yield_per, so only one batch of rows is held in memory at a time.
+
+  Args:
+      filters (AssetExportFilter): status, zone, product and date filters
+      export_format (str): 'csv' or 'ndjson'
+      compress (bool): gzip the stream
+
+  Yields:
+      bytes: encoded (and compressed) chunk of rows
+  """
+  compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+  exported_rows = 0
+  with Session(engine) as db:
+    result = db.execute(
+      _build_export_query(filters).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    include_header = export_format == "csv"
+    if include_header:
+      # Emit the header even when nothing matches the filters
+      chunk = _format_csv([], include_header=True).encode("utf-8")
+      yield compressor.compress(chunk) if compressor else chunk
+    for partition in result.partitions():
+      if export_format == "csv":
+        chunk = _format_csv(partition, include_header=False).encode("utf-8")
+      else:
+        chunk = _format_ndjson(partition).encode("utf-8")
+      exported_rows += len(partition)
+      if compressor:
+        chunk = compressor.compress(chunk)
+        if not chunk:
+          continue
+      yield chunk
+  if compressor:
+    yield compressor.flush()
+  logger.info(f"Have exported {exported_rows} assets as {export_format}{' (gzip)' if compress else ''}")
@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from collections import defaultdict
+from typing import Iterable, Optional
+from app.database.asset_status_counter_model import AssetStatusCounter as AssetStatusCounterORM
+from app.database.counter_table import apply_counter_deltas
+from app.services.enum import AssetStatus
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# (ProductId, previous AssetStatus or None for a new asset, new AssetStatus)
+AssetTransition = tuple[int, Optional[str], str]
+
+# Statuses counted as received in the purchase order statistics
+RECEIVED_STATUSES = (AssetStatus.AwaitingQC.value, "Accepted")
+
+class AssetStatusCounterService():
+  """
+  Maintains the AssetStatusCounter table. Callers report every asset they create
+  or move to another status, the counters are updated in the caller's transaction.
+  """
+  def __init__(self, db: Session):
+    self.db = db
+
+  def record_transitions(self, purchase_order_id: int, transitions: Iterable[AssetTransition]):
+    """
+    Apply asset creations and status transitions of one purchase order. Does not commit.
+
+    Args:
+        purchase_order_id (int): purchase order the assets belong to
+        transitions (Iterable[AssetTransition]): (product id, previous status or None, new status)
+    """
+    deltas: dict[tuple, dict[str, int]] = defaultdict(lambda: {"AssetCount": 0})
+    for product_id, previous_status, new_status in transitions:
+      if previous_status == new_status:
+        continue
+      if previous_status is not None:
+        deltas[(purchase_order_id, product_id, previous_status)]["AssetCount"] -= 1
+      deltas[(purchase_order_id, product_id, new_status)]["AssetCount"] += 1
+
+    apply_counter_deltas(
+      db=self.db,
+      model=AssetStatusCounterORM,
+      key_columns=("PurchaseOrderId", "ProductId", "AssetStatus"),
+      deltas=deltas
+    )
+    logger.info(f"Have applied asset status counter deltas for {len(deltas)} keys of purchase order {purchase_order_id}")
+
+  def get_po_product_stats(self, purchase_order_id: int) -> dict[int, dict[str, int]]:
+    """
+    Received and in transit asset counts of a purchase order.
+
+    Returns:
+        dict[int, dict[str, int]]: product id -> {'received': ..., 'in_transit': ...}
+    """
+    query = select(
+      AssetStatusCounterORM.ProductId,
+      AssetStatusCounterORM.AssetStatus,
+      AssetStatusCounterORM.AssetCount
+    ).where(
+      AssetStatusCounterORM.PurchaseOrderId == purchase_order_id,
+      AssetStatusCounterORM.AssetStatus.in_([*RECEIVED_STATUSES, AssetStatus.InTransit.value])
+    )
+    product_stats: dict[int, dict[str, int]] = defaultdict(lambda: {'received': 0, 'in_transit': 0})
+    for row in self.db.execute(query).mappings().all():
+      if row["AssetStatus"] == AssetStatus.InTransit.value:
+        product_stats[row["ProductId"]]['in_transit'] += row["AssetCount"]
+      else:
+        product_stats[row["ProductId"]]['received'] += row["AssetCount"]
+    return dict(product_stats)
@@ -0,0 +1,154 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from collections import defaultdict
+from app.database.purchase_order_model import PurchaseOrderItem as PurchaseOrderItemORM
+from app.database.stock_move import StockMove as StockMoveORM
+from app.database.stock_balance_model import StockBalance as StockBalanceORM
+from app.database.counter_table import apply_counter_deltas
+from app.database.bulk_writer import BulkWriter
+from app.services.enum import LocationID
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Locations whose quantity is already committed against the ordered quantity
+# (used when a supplier declares a new shipment)
+SHIPPED_LOCATIONS = (
+  LocationID.AVAILABLE.value,
+  LocationID.IN_TRANSIT.value,
+  LocationID.AWAITING_QC.value,
+  LocationID.REJECTED_DOCK.value
+)
+
+# Internal locations that count as physically received when stock arrives from In Transit
+RECEIVED_LOCATIONS = (
+  LocationID.AVAILABLE.value,
+  LocationID.IN_RECEIVING.value,
+  LocationID.AWAITING_QC.value,
+  LocationID.DISABLED.value
+)
+
+class StockBalanceService():
+  """
+  Single entry point for writing StockMove rows.
+  Each insert also applies its delta to the StockBalance table in the same transaction,
+  so the quantity checks of shipment manifests and goods receipts read maintained
+  balances instead of scanning the ledger.
+  """
+  def __init__(self, db: Session):
+    self.db = db
+
+  def record_stock_moves(self, stock_moves: list[dict]) -> list:
+    """
+    Insert StockMove rows and update the per location balances. Does not commit.
+
+    Args:
+        stock_moves (list[dict]): StockMove column mappings (PascalCase keys)
+
+    Returns:
+        list: inserted rows with 'Id' and 'PurchaseOrderItemId'
+    """
+    if not stock_moves:
+      return []
+    results = BulkWriter(self.db).insert_returning(
+      StockMoveORM,
+      stock_moves,
+      returning=(StockMoveORM.Id, StockMoveORM.PurchaseOrderItemId)
+    )
+    self.apply_balance_deltas(stock_moves)
+    return results
+
+  def apply_balance_deltas(self, stock_moves: list[dict]):
+    """
+    Fold a batch of stock moves into the StockBalance table. Does not commit.
+    """
+    deltas: dict[tuple, dict[str, int]] = defaultdict(lambda: {"Quantity": 0, "ReceivedQuantity": 0})
+    for stock_move in stock_moves:
+      po_item_id = stock_move.get('PurchaseOrderItemId')
+      quantity = stock_move.get('Quantity') or 0
+      if not po_item_id or quantity == 0:
+        continue
+      source_id = stock_move['SourceLocationId']
+      destination_id = stock_move['DestinationLocationId']
+      deltas[(po_item_id, source_id)]["Quantity"] -= quantity
+      deltas[(po_item_id, destination_id)]["Quantity"] += quantity
+      if source_id == LocationID.IN_TRANSIT.value:
+        deltas[(po_item_id, destination_id)]["ReceivedQuantity"] += quantity
+
+    apply_counter_deltas(
+      db=self.db,
+      model=StockBalanceORM,
+      key_columns=("PurchaseOrderItemId", "LocationId"),
+      deltas=deltas
+    )
+    logger.info(f"Have applied stock balance deltas for {len(deltas)} (po item, location) keys")
+
+  def get_po_item_balances(
+    self,
+    po_id: int,
+    po_item_ids: list[int]
+  ) -> dict[int, dict]:
+    """
+    Read the quantities of some purchase order items from the maintained balances.
+    Items that do not belong to the purchase order are not returned.
+
+    Returns:
+        dict[int, dict]: po item id -> quantities
+        + ordered_quantity, available_quantity, in_transit_quantity, awaiting_qc_quantity,
+          disabled_quantity, rejected_quantity
+        + received_quantity: cumulative quantity received from In Transit
+        + unshipped_quantity: ordered - quantity already shipped or received
+        + unreceived_quantity: ordered - received_quantity
+    """
+    if not po_item_ids:
+      return {}
+    po_items_query = select(
+      PurchaseOrderItemORM.PurchaseOrderItemId,
+      PurchaseOrderItemORM.ProductId,
+      PurchaseOrderItemORM.Quantity
+    ).where(
+      PurchaseOrderItemORM.PurchaseOrderItemId.in_(po_item_ids),
+      PurchaseOrderItemORM.PurchaseOrderId == po_id
+    )
+    po_items = self.db.execute(po_items_query).mappings().all()
+
+    balances_query = select(
+      StockBalanceORM.PurchaseOrderItemId,
+      StockBalanceORM.LocationId,
+      StockBalanceORM.Quantity,
+      StockBalanceORM.ReceivedQuantity
+    ).where(
+      StockBalanceORM.PurchaseOrderItemId.in_([po_item["PurchaseOrderItemId"] for po_item in po_items])
+    )
+    balances_lookup: dict[int, dict[int, dict]] = defaultdict(dict)
+    for balance in self.db.execute(balances_query).mappings().all():
+      balances_lookup[balance["PurchaseOrderItemId"]][balance["LocationId"]] = balance
+
+    stats_map = {}
+    for po_item in po_items:
+      po_item_id = po_item["PurchaseOrderItemId"]
+      locations = balances_lookup.get(po_item_id, {})
+
+      def quantity_at(location_id: int) -> int:
+        balance = locations.get(location_id)
+        return balance["Quantity"] if balance else 0
+
+      shipped_quantity = sum(quantity_at(location_id) for location_id in SHIPPED_LOCATIONS)
+      received_quantity = sum(
+        locations[location_id]["ReceivedQuantity"]
+        for location_id in RECEIVED_LOCATIONS if location_id in locations
+      )
+      stats_map[po_item_id] = {
+        "purchase_order_item_id": po_item_id,
+        "product_id": po_item["ProductId"],
+        "ordered_quantity": po_item["Quantity"],
+        "available_quantity": quantity_at(LocationID.AVAILABLE.value),
+        "in_transit_quantity": quantity_at(LocationID.IN_TRANSIT.value),
+        "awaiting_qc_quantity": quantity_at(LocationID.AWAITING_QC.value),
+        "disabled_quantity": quantity_at(LocationID.DISABLED.value),
+        "rejected_quantity": quantity_at(LocationID.REJECTED_DOCK.value),
+        "received_quantity": received_quantity,
+        "unshipped_quantity": po_item["Quantity"] - shipped_quantity,
+        "unreceived_quantity": po_item["Quantity"] - received_quantity
+      }
+    return stats_map
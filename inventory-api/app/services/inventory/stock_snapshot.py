@@ -0,0 +1,228 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import asyncio
+from app.database.purchase_order_model import PurchaseOrderItem as PurchaseOrderItemORM
+from app.database.stock_move import StockMove as StockMoveORM
+from app.database.stock_snapshot_model import StockCheckpoint as StockCheckpointORM, StockCheckpointLine as StockCheckpointLineORM
+from app.database.connection import engine
+from app.services.enum import LocationID
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# (ProductId, LocationId, ZoneId) -> quantity
+OnHandMap = dict[tuple[int, int, int | None], int]
+
+def _location_name(location_id: int) -> str | None:
+  try:
+    return LocationID(location_id).name
+  except ValueError:
+    return None
+
+class StockSnapshotService():
+  """
+  On-hand projection of the StockMove ledger per product, location and zone.
+
+  Checkpoints store the projection up to a ledger high-water mark (StockMove.Id).
+  A query loads the nearest checkpoint and replays only the moves written after it.
+  The zones are the ones recorded on each move (SourceZoneId, DestinationZoneId),
+  moves without a zone are reported with a NULL zone.
+  """
+  def __init__(self, db: Session):
+    self.db = db
+
+  def _replay_moves(
+    self,
+    after_move_id: int,
+    up_to_move_id: int | None = None,
+    up_to_date: date | None = None,
+    product_id: int | None = None
+  ) -> OnHandMap:
+    """
+    Fold the moves with after_move_id < Id (<= up_to_move_id) into an on-hand delta.
+    """
+    conditions = [StockMoveORM.Id > after_move_id]
+    if up_to_move_id is not None:
+      conditions.append(StockMoveORM.Id <= up_to_move_id)
+    if up_to_date is not None:
+      conditions.append(StockMoveORM.MovementDate <= up_to_date)
+    if product_id is not None:
+      conditions.append(PurchaseOrderItemORM.ProductId == product_id)
+
+    # Each move counts its own Quantity in the zones recorded with it, so a later
+    # move of the assets never rewrites the past (nor the checkpoints)
+    query = (
+      select(
+        PurchaseOrderItemORM.ProductId,
+        StockMoveORM.SourceLocationId,
+        StockMoveORM.SourceZoneId,
+        StockMoveORM.DestinationLocationId,
+        StockMoveORM.DestinationZoneId,
+        func.sum(StockMoveORM.Quantity).label("Quantity")
+      )
+      .join(PurchaseOrderItemORM, StockMoveORM.PurchaseOrderItemId == PurchaseOrderItemORM.PurchaseOrderItemId)
+      .where(*conditions)
+      .group_by(
+        PurchaseOrderItemORM.ProductId,
+        StockMoveORM.SourceLocationId,
+        StockMoveORM.SourceZoneId,
+        StockMoveORM.DestinationLocationId,
+        StockMoveORM.DestinationZoneId
+      )
+    )
+
+    on_hand: OnHandMap = defaultdict(int)
+    for row in self.db.execute(query).mappings().all():
+      quantity = row["Quantity"] or 0
+      on_hand[(row["ProductId"], row["DestinationLocationId"], row["DestinationZoneId"])] += quantity
+      on_hand[(row["ProductId"], row["SourceLocationId"], row["SourceZoneId"])] -= quantity
+    return on_hand
+
+  def _load_checkpoint_lines(
+    self,
+    checkpoint: StockCheckpointORM | None,
+    product_id: int | None = None
+  ) -> OnHandMap:
+    on_hand: OnHandMap = defaultdict(int)
+    if checkpoint is None:
+      return on_hand
+    query = select(
+      StockCheckpointLineORM.ProductId,
+      StockCheckpointLineORM.LocationId,
+      StockCheckpointLineORM.ZoneId,
+      StockCheckpointLineORM.Quantity
+    ).where(StockCheckpointLineORM.CheckpointId == checkpoint.Id)
+    if product_id is not None:
+      query = query.where(StockCheckpointLineORM.ProductId == product_id)
+    for row in self.db.execute(query).mappings().all():
+      on_hand[(row["ProductId"], row["LocationId"], row["ZoneId"])] += row["Quantity"]
+    return on_hand
+
+  def _find_checkpoint(self, as_of: date | None = None) -> StockCheckpointORM | None:
+    """
+    Latest checkpoint, or the latest one whose folded moves are all dated on or before as_of.
+    """
+    query = select(StockCheckpointORM).order_by(StockCheckpointORM.HighWaterMarkMoveId.desc()).limit(1)
+    if as_of is not None:
+      query = query.where(or_(
+        StockCheckpointORM.LastMovementDate <= as_of,
+        StockCheckpointORM.LastMovementDate.is_(None)
+      ))
+    return self.db.execute(query).scalars().first()
+
+  def create_checkpoint(self, min_interval: timedelta | None = None) -> StockCheckpointORM | None:
+    """
+    Fold the settled moves written since the latest checkpoint into a new checkpoint and commit it.
+
+    Only moves dated before today are folded: their transactions are committed,
+    so no identity value below the high-water mark can still show up later.
+
+    Args:
+        min_interval (timedelta | None): skip when the latest checkpoint is younger than this
+        (several workers run the periodic job)
+
+    Returns:
+        StockCheckpointORM | None: the new checkpoint, None when there was nothing to fold
+    """
+    latest_checkpoint = self._find_checkpoint()
+    if latest_checkpoint and min_interval and latest_checkpoint.CreatedAt > datetime.utcnow() - min_interval:
+      logger.info(f"Latest stock checkpoint {latest_checkpoint.Id} is recent enough, skip")
+      return None
+    base_move_id = latest_checkpoint.HighWaterMarkMoveId if latest_checkpoint else 0
+
+    settled_query = select(
+      func.max(StockMoveORM.Id).label("HighWaterMark"),
+      func.max(StockMoveORM.MovementDate).label("LastMovementDate")
+    ).where(
+      StockMoveORM.Id > base_move_id,
+      StockMoveORM.MovementDate < date.today()
+    )
+    settled = self.db.execute(settled_query).mappings().first()
+    if not settled or settled["HighWaterMark"] is None:
+      logger.info("No settled stock moves since the latest checkpoint")
+      return None
+
+    on_hand = self._load_checkpoint_lines(latest_checkpoint)
+    for key, quantity in self._replay_moves(base_move_id, up_to_move_id=settled["HighWaterMark"]).items():
+      on_hand[key] += quantity
+
+    last_movement_dates = [
+      value for value in (
+        latest_checkpoint.LastMovementDate if latest_checkpoint else None,
+        settled["LastMovementDate"]
+      ) if value is not None
+    ]
+    new_checkpoint = StockCheckpointORM(
+      HighWaterMarkMoveId=settled["HighWaterMark"],
+      LastMovementDate=max(last_movement_dates) if last_movement_dates else None,
+      lines=[
+        StockCheckpointLineORM(ProductId=product_id, LocationId=location_id, ZoneId=zone_id, Quantity=quantity)
+        for (product_id, location_id, zone_id), quantity in on_hand.items() if quantity != 0
+      ]
+    )
+    try:
+      self.db.add(new_checkpoint)
+      self.db.commit()
+    except Exception as e:
+      self.db.rollback()
+      logger.error(f"Cannot create stock checkpoint: {e}")
+      raise e
+    logger.info(f"Have created stock checkpoint {new_checkpoint.Id} up to stock move {new_checkpoint.HighWaterMarkMoveId}")
+    return new_checkpoint
+
+  def get_on_hand(
+    self,
+    as_of: date | None = None,
+    product_id: int | None = None,
+    location_ids: list[int] | None = None
+  ) -> dict:
+    """
+    On-hand quantities now, or at the end of the as_of day.
+    Loads the nearest checkpoint and replays the moves written after its high-water mark.
+    """
+    checkpoint = self._find_checkpoint(as_of)
+    base_move_id = checkpoint.HighWaterMarkMoveId if checkpoint else 0
+    if checkpoint is None:
+      logger.warning("No stock checkpoint available, replaying the whole ledger")
+
+    on_hand = self._load_checkpoint_lines(checkpoint, product_id=product_id)
+    for key, quantity in self._replay_moves(base_move_id, up_to_date=as_of, product_id=product_id).items():
+      on_hand[key] += quantity
+
+    items = []
+    for (item_product_id, location_id, zone_id), quantity in sorted(on_hand.items(), key=lambda entry: (entry[0][0], entry[0][1], entry[0][2] or 0)):
+      if quantity == 0:
+        continue
+      if location_ids and location_id not in location_ids:
+        continue
+      items.append({
+        "product_id": item_product_id,
+        "location_id": location_id,
+        "location": _location_name(location_id),
+        "zone_id": zone_id,
+        "quantity": quantity
+      })
+    return {
+      "as_of": as_of,
+      "checkpoint_id": checkpoint.Id if checkpoint else None,
+      "high_water_mark": base_move_id,
+      "items": items
+    }
+
+def create_checkpoint_job(min_interval: timedelta | None = None):
+  """Run one checkpoint in its own session (used by the background loop)."""
+  with Session(engine) as db:
+    return StockSnapshotService(db).create_checkpoint(min_interval=min_interval)
+
+async def run_checkpoint_loop(interval_minutes: int):
+  """Create a stock checkpoint at startup and then every interval_minutes."""
+  interval = timedelta(minutes=interval_minutes)
+  while True:
+    try:
+      # Half the interval keeps one checkpoint per interval when several workers run the loop
+      await asyncio.to_thread(create_checkpoint_job, interval / 2)
+    except Exception as e:
+      logger.error(f"Periodic stock checkpoint failed: {e}")
+    await asyncio.sleep(interval.total_seconds())
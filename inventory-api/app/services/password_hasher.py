@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from typing import Optional
+import multiprocessing
+import threading
+import time
+from app.core.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Lives in every worker process, bcrypt rounds run there
+_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _hash_in_worker(password: str) -> tuple[str, float]:
+  started_at = time.perf_counter()
+  return _pwd_context.hash(password), time.perf_counter() - started_at
+
+def _verify_in_worker(password: str, password_hash: str) -> tuple[bool, float]:
+  started_at = time.perf_counter()
+  return _pwd_context.verify(password, password_hash), time.perf_counter() - started_at
+
+class PasswordHasherOverloaded(HTTPException):
+  """Every worker is busy and the queue is full, the client should retry later."""
+  def __init__(self, retry_after_seconds: int):
+    super().__init__(
+      status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+      detail="Too many password checks in progress, please retry shortly",
+      headers={"Retry-After": str(retry_after_seconds)}
+    )
+
+class PasswordHasher():
+  """
+  Runs the bcrypt hashes and checks in a dedicated process pool, so a burst of
+  logins only occupies those processes instead of the API workers' CPU.
+
+  At most max_workers operations run at once and max_queue more may wait;
+  beyond that the call fails fast with PasswordHasherOverloaded (503 + Retry-After).
+  A call waiting longer than timeout_seconds gets the same 503; the operation is
+  cancelled if it has not started and keeps its slot until its worker is done.
+  Same hash/verify interface as passlib's CryptContext, the calling thread waits
+  for the result (sync routes run in the threadpool, the event loop stays free).
+  With max_workers = 0 the operations run inline (local development).
+  """
+  def __init__(self, max_workers: int, max_queue: int, timeout_seconds: float, retry_after_seconds: int):
+    self.max_workers = max_workers
+    self.max_queue = max_queue
+    self.timeout_seconds = timeout_seconds
+    self.retry_after_seconds = retry_after_seconds
+    self._executor: Optional[ProcessPoolExecutor] = None
+    self._lock = threading.Lock()
+    self.in_flight = 0
+    self.max_in_flight = 0
+    self.submitted = 0
+    self.completed = 0
+    self.rejected = 0
+    self.failed = 0
+    self.timed_out = 0
+    self.wait_total_seconds = 0.0
+    self.run_total_seconds = 0.0
+
+  def _get_executor(self) -> ProcessPoolExecutor:
+    # Created on first use, spawn keeps the database connections and threads of the API out of the workers
+    if self._executor is None:
+      self._executor = ProcessPoolExecutor(
+        max_workers=self.max_workers,
+        mp_context=multiprocessing.get_context("spawn")
+      )
+      logger.info(f"Started the password hashing pool with {self.max_workers} processes")
+    return self._executor
+
+  def _submit(self, function, *args) -> Future:
+    with self._lock:
+      if self.in_flight >= self.max_workers + self.max_queue:
+        self.rejected += 1
+        logger.warning(f"Password hashing pool overloaded ({self.in_flight} operations in flight), rejecting the request")
+        raise PasswordHasherOverloaded(self.retry_after_seconds)
+      self.in_flight += 1
+      self.submitted += 1
+      self.max_in_flight = max(self.max_in_flight, self.in_flight)
+      try:
+        future = self._get_executor().submit(function, *args)
+      except Exception:
+        self.in_flight -= 1
+        raise
+    # Outside the lock: the callback runs right away when the future is already done.
+    # The slot is released when the worker is done with it, not when the caller gives up
+    future.add_done_callback(self._release)
+    return future
+
+  def _release(self, future: Future):
+    with self._lock:
+      self.in_flight -= 1
+
+  def _run(self, function, *args):
+    if self.max_workers <= 0:
+      result, _ = function(*args)
+      return result
+    submitted_at = time.perf_counter()
+    future = self._submit(function, *args)
+    try:
+      result, run_seconds = future.result(timeout=self.timeout_seconds)
+    except FutureTimeoutError:
+      future.cancel()
+      with self._lock:
+        self.timed_out += 1
+      logger.warning(f"Password hashing took longer than {self.timeout_seconds}s, rejecting the request")
+      raise PasswordHasherOverloaded(self.retry_after_seconds)
+    except Exception:
+      with self._lock:
+        self.failed += 1
+      raise
+    with self._lock:
+      self.completed += 1
+      self.run_total_seconds += run_seconds
+      self.wait_total_seconds += max(0.0, time.perf_counter() - submitted_at - run_seconds)
+    return result
+
+  def hash(self, password: str) -> str:
+    return self._run(_hash_in_worker, password)
+
+  def verify(self, password: str, password_hash: str) -> bool:
+    return self._run(_verify_in_worker, password, password_hash)
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        "max_workers": self.max_workers,
+        "max_queue": self.max_queue,
+        "in_flight": self.in_flight,
+        "queued": max(0, self.in_flight - self.max_workers),
+        "max_in_flight": self.max_in_flight,
+        "submitted": self.submitted,
+        "completed": self.completed,
+        "rejected": self.rejected,
+        "failed": self.failed,
+        "timed_out": self.timed_out,
+        "avg_wait_ms": round(self.wait_total_seconds * 1000 / self.completed, 3) if self.completed else 0.0,
+        "avg_run_ms": round(self.run_total_seconds * 1000 / self.completed, 3) if self.completed else 0.0
+      }
+
+  def shutdown(self):
+    if self._executor is not None:
+      self._executor.shutdown(wait=False, cancel_futures=True)
+      self._executor = None
+
+password_hasher = PasswordHasher(
+  max_workers=settings.PASSWORD_HASHER_WORKERS,
+  max_queue=settings.PASSWORD_HASHER_MAX_QUEUE,
+  timeout_seconds=settings.PASSWORD_HASHER_TIMEOUT_SECONDS,
+  retry_after_seconds=settings.PASSWORD_HASHER_RETRY_AFTER_SECONDS
+)
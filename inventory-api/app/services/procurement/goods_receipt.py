@@ -18,6 +18,11 @@ from app.utils.logger import setup_logger
 from datetime import date, datetime
 import collections
 from app.services.enum import LocationID, ZoneID, AssetStatus
+from app.services.inventory.stock_balance import StockBalanceService
+from app.services.inventory.asset_status_counter import AssetStatusCounterService
+from app.database.connection import read_after_write_guard
+from app.database.bulk_writer import BulkWriter
+from app.database.query_builders import purchase_order_status_query
 from collections import defaultdict
 
 logger = setup_logger()
@@ -61,6 +66,7 @@ class GRService():
       # Create n Asset for each matched line item
       all_accepted_asset = []
       all_declined_asset = []
+      stock_moves_inserted: list[dict] = []
       for line in po.lines:
         current_line_accepted_asset = []
         current_line_declined_asset = []
@@ -75,7 +81,7 @@ class GRService():
           if asset_input.isAccepted:
             
             new_asset = AssetORM(
-            ProductId=row_info["ProductId"],
+            ProductId=row_info["product_id"],
             SerialNumber = generate_random_serial(length=12),
             AssetStatus=  "Awaiting QC",
             LastMovementDate = datetime.today(),
@@ -86,7 +92,7 @@ class GRService():
           else:
             # CRITICAL: Record the bad item too!            
             new_asset = AssetORM(
-            ProductId=row_info["ProductId"],
+            ProductId=row_info["product_id"],
             SerialNumber = generate_random_serial(length=12),
             AssetStatus= "Rejected",
             LastMovementDate = datetime.today(),
@@ -102,24 +108,26 @@ class GRService():
         # Create new StockMove record
         if not len(current_line_accepted_asset) > 0:
           continue
-        new_accepted_stock_move = StockMoveORM(
-          PurchaseOrderItemId = line.po_line_id,
-          Quantity= len(current_line_accepted_asset),
-          MovementDate = datetime.today(),
-          SourceLocationId = LocationID.IN_TRANSIT.value,
-          DestinationLocationId = LocationID.AVAILABLE.value
-        )
+        new_accepted_stock_move = {
+          'PurchaseOrderItemId': line.po_line_id,
+          'Quantity': len(current_line_accepted_asset),
+          'MovementDate': datetime.today(),
+          'SourceLocationId': LocationID.IN_TRANSIT.value,
+          'DestinationLocationId': LocationID.AVAILABLE.value,
+          'DestinationZoneId': ZoneID.DEFAULT_STORAGE.value
+        }
         
-        new_declined_stock_move = StockMoveORM (
-          PurchaseOrderItemId = line.po_line_id,
-          Quantity= len(current_line_declined_asset),
-          MovementDate = datetime.today(),
-          SourceLocationId = LocationID.IN_TRANSIT.value,
-          DestinationLocationId = LocationID.REJECTED_DOCK.value
-        )
+        new_declined_stock_move = {
+          'PurchaseOrderItemId': line.po_line_id,
+          'Quantity': len(current_line_declined_asset),
+          'MovementDate': datetime.today(),
+          'SourceLocationId': LocationID.IN_TRANSIT.value,
+          'DestinationLocationId': LocationID.REJECTED_DOCK.value,
+          # The declined assets of this path are created in the default storage zone
+          'DestinationZoneId': ZoneID.DEFAULT_STORAGE.value
+        }
         
-        self.db.add(new_accepted_stock_move)
-        self.db.add(new_declined_stock_move)
+        stock_moves_inserted.extend([new_accepted_stock_move, new_declined_stock_move])
       # Add new accepted Asset records
       if all_accepted_asset:
         asset_to_create_ids = [asset.SerialNumber for asset in all_accepted_asset]
@@ -130,8 +138,15 @@ class GRService():
         asset_to_create_ids = [asset.SerialNumber for asset in all_declined_asset]
         self.db.add_all(all_declined_asset)
         print(f"Add {len(asset_to_create_ids)} declined assets to database")
+      # Insert the stock moves and their balance deltas in the same transaction
+      StockBalanceService(self.db).record_stock_moves(stock_moves_inserted)
+      AssetStatusCounterService(self.db).record_transitions(
+        purchase_order_id=po.po_id,
+        transitions=[(asset.ProductId, None, asset.AssetStatus) for asset in all_accepted_asset + all_declined_asset]
+      )
 
       self.db.commit()
+      read_after_write_guard.mark_write()
       # Temporarily return list of po line item
     except ValueError as e:
       print(e)
@@ -157,8 +172,7 @@ class GRService():
     Args:
         po (PurchaseOrderInput):
     """
-    stmt = text("SELECT PurchaseOrderId, Status FROM PurchaseOrder WHERE PurchaseOrderId = :id")
-    po_orm = self.db.execute(stmt, {"id": po.po_id}).mappings().first()
+    po_orm = self.db.execute(purchase_order_status_query(), {"po_id": po.po_id}).mappings().first()
     
     is_po_existed = True if po_orm else False
     
@@ -216,7 +230,7 @@ class GRService():
   ):
     """
     Check po stats in all po lines
-    - Calculate different quantity types in each po line item:
+    - Read different quantity types of each po line item from the maintained StockBalance table:
     + Available
     + In Receiving
     + In Transit
@@ -224,7 +238,7 @@ class GRService():
     + Committed
     + Disabled
     + Ordered Quantity
-    + Remaining: Ordered Quantity - Available - Awaiting QC
+    + Remaining: Ordered Quantity - quantity received from In Transit
     
     The function check if received quantity of each po line item exceed the remaining quantity of that line
 
@@ -236,72 +250,20 @@ class GRService():
     # get different quantity of that po item line
     
     
-    get_po_item_data_string = """
-    SELECT 
-    poi.PoitemId,
-    poi.PurchaseOrderId,
-    poi.ProductId,
-    poi.Quantity as Ordered_Qty,
-
-    -- 1. CURRENT STATUS COLUMNS (Your logic is perfect here)
-    -- Shows where the stock sits RIGHT NOW
-    SUM(CASE WHEN sm.DestinationLocationId = 1 THEN sm.Quantity WHEN sm.SourceLocationId = 1 THEN -sm.Quantity ELSE 0 END) AS Available_Qty,
-    SUM(CASE WHEN sm.DestinationLocationId = 3 THEN sm.Quantity WHEN sm.SourceLocationId = 3 THEN -sm.Quantity ELSE 0 END) AS InTransit_Qty,
-    SUM(CASE WHEN sm.DestinationLocationId = 4 THEN sm.Quantity WHEN sm.SourceLocationId = 4 THEN -sm.Quantity ELSE 0 END) AS AwaitingQC_Qty,
-    SUM(CASE WHEN sm.DestinationLocationId = 6 THEN sm.Quantity WHEN sm.SourceLocationId = 6 THEN -sm.Quantity ELSE 0 END) AS Disabled_Qty,
-
-    -- 2. THE FIX: CUMULATIVE RECEIVED
-    -- We only sum the INFLOW events. We ignore outbound moves (consumption).
-    -- Logic: Count moves where Source was Transit (3) OR Source was Creation (NULL)
-    -- This represents the "Moment of Arrival".
-    SUM(CASE 
-        WHEN sm.DestinationLocationId IN (1, 2, 4, 6) -- Any internal location
-             AND (sm.SourceLocationId = 3 OR sm.SourceLocationId IS NULL) -- From External
-        THEN sm.Quantity 
-        ELSE 0 
-    END) as Total_Physically_Received,
-
-    -- 3. THE CORRECT REMAINING CALCULATION
-    (
-        poi.Quantity - 
-        SUM(CASE 
-            WHEN sm.DestinationLocationId IN (1, 2, 4, 6) 
-                 AND (sm.SourceLocationId = 3 OR sm.SourceLocationId IS NULL)
-            THEN sm.Quantity 
-            ELSE 0 
-        END)
-    ) AS Remaining_Qty
-
-    FROM PurchaseOrderItem poi
-    LEFT JOIN StockMove sm ON poi.PoitemId = sm.PurchaseOrderItemId -- Ensure you use the specific FK column
-    WHERE poi.PurchaseOrderId = :target_po_id
-    AND poi.Poitemid in :line_ids
-    GROUP BY poi.PoitemId, poi.PurchaseOrderId, poi.ProductId, poi.Quantity;
-    """
-    query = text(get_po_item_data_string).bindparams(
-    bindparam("line_ids", expanding=True)
-)
-    po_stats = self.db.execute(query, 
-    {
-      "target_po_id": po_id,
-      "line_ids": tuple(line_items_ids)
-    }
-                               ).mappings().all()
+    po_stats_hash_map = StockBalanceService(self.db).get_po_item_balances(
+      po_id=po_id,
+      po_item_ids=line_items_ids
+    )
       
     # Check if current quantity exceed the remaining quantity
     
-    # Convert the po_stats to a hashmap
-    po_stats_hash_map = {
-      po_item.PoitemId: po_item
-     for po_item in po_stats}
-    
     # Check if po_stats hash map is empty
     
     # Loop over each input line and check if received quantity exceed remaining quantity"
     error_message = []
     for po_item_input in po_lines:
       
-      remaining_qty = po_stats_hash_map.get(po_item_input.po_line_id)["Remaining_Qty"]
+      remaining_qty = po_stats_hash_map.get(po_item_input.po_line_id)["unreceived_quantity"]
       received_qty = po_item_input.received_quantity
       if received_qty > remaining_qty:
         error_message.append(f"line: {po_item_input.po_line_id} \nhas received {received_qty} > remaining quantity, which is: {remaining_qty}\n")
@@ -318,7 +280,8 @@ class GRService():
     
     # Check if the shipment manifest exists ?
     stmt = select(ShipmentManifestORM.Id, 
-                  ShipmentManifestORM.Status).where(
+                  ShipmentManifestORM.Status,
+                  ShipmentManifestORM.PurchaseOrderId).where(
       ShipmentManifestORM.Id == sm.sm_id
     )
     result = self.db.execute(stmt).mappings().first()
@@ -444,13 +407,15 @@ class GRService():
       
       # Aggregatee a list of updated assets
       assets_update_payload = []
-      assets_lookup_from_po_line_id = defaultdict(list)
+      asset_transitions = []
       stock_moves_inserted: list[dict] = []
+      # Asset ids of each stock move, same order as stock_moves_inserted
+      stock_moves_asset_ids: list[list[int]] = []
       
       for input_sm_line in sm.lines:
         sm_line_id = input_sm_line.sm_line_id
-        current_line_accepted_count = 0
-        current_line_declined_count = 0
+        current_line_accepted_asset_ids: list[int] = []
+        current_line_declined_asset_ids: list[int] = []
         
         current_sm_line_orm = sm_lines_map_db.get(input_sm_line.sm_line_id)
         sm_line_strategy = current_sm_line_orm.get('ReceivingStrategy')
@@ -501,73 +466,70 @@ class GRService():
                 "AssetStatus": AssetStatus.AwaitingQC.value,
                 "CurrentZoneId": ZoneID.DEFAULT_STORAGE.value
             })
-            current_line_accepted_count += 1
+            current_line_accepted_asset_ids.append(asset_id)
           else:
             update_data.update({
                 "AssetStatus": AssetStatus.Rejected.value,
                 "CurrentZoneId": ZoneID.QUARANTINE.value
             })
-            current_line_declined_count += 1
+            current_line_declined_asset_ids.append(asset_id)
           
           assets_update_payload.append(update_data)
-          
-          # Prepare asset lookup map from po line id
-          key = update_data['PurchaseOrderLineId']
-          assets_lookup_from_po_line_id[key].append(asset_id)
-        if current_line_accepted_count > 0:
+          asset_transitions.append((target_asset_orm['ProductId'], target_asset_orm['AssetStatus'], update_data['AssetStatus']))
+        if current_line_accepted_asset_ids:
           new_accepted_stock_move_orm = {
             'PurchaseOrderItemId': current_sm_line_orm['PurchaseOrderLineId'],
             'GoodsReceiptId': new_gr_orm.ReceiptId,
-            'Quantity': current_line_accepted_count,
+            'Quantity': len(current_line_accepted_asset_ids),
             'MovementDate': datetime.now(),
             'SourceLocationId': LocationID.IN_TRANSIT.value,
-            'DestinationLocationId': LocationID.AWAITING_QC.value
+            'DestinationLocationId': LocationID.AWAITING_QC.value,
+            'DestinationZoneId': ZoneID.DEFAULT_STORAGE.value
             }
           
           stock_moves_inserted.append(new_accepted_stock_move_orm)
-        if current_line_declined_count >0:
+          stock_moves_asset_ids.append(current_line_accepted_asset_ids)
+        if current_line_declined_asset_ids:
           new_declined_stock_move_orm = {
             'PurchaseOrderItemId': current_sm_line_orm['PurchaseOrderLineId'],
             'GoodsReceiptId': new_gr_orm.ReceiptId,
-            'Quantity': current_line_declined_count,
+            'Quantity': len(current_line_declined_asset_ids),
             'MovementDate': datetime.now(),
             'SourceLocationId': LocationID.IN_TRANSIT.value,
-            'DestinationLocationId': LocationID.REJECTED_DOCK.value
+            'DestinationLocationId': LocationID.REJECTED_DOCK.value,
+            'DestinationZoneId': ZoneID.QUARANTINE.value
             }
           stock_moves_inserted.append(new_declined_stock_move_orm)
+          stock_moves_asset_ids.append(current_line_declined_asset_ids)
         
+      bulk_writer = BulkWriter(self.db)
       if assets_update_payload:
-        self.db.bulk_update_mappings(AssetORM, assets_update_payload)
-      if stock_moves_inserted:
-        stock_move_results = self.db.execute(
-          insert(StockMoveORM).returning(
-              StockMoveORM.Id, 
-              StockMoveORM.PurchaseOrderItemId
-          ), 
-          stock_moves_inserted
-      ).mappings().all()
+        bulk_writer.update_many(AssetORM, assets_update_payload)
+        AssetStatusCounterService(self.db).record_transitions(
+          purchase_order_id=result['PurchaseOrderId'],
+          transitions=asset_transitions
+        )
+      # Insert the stock moves and their balance deltas in the same transaction
+      stock_move_results = StockBalanceService(self.db).record_stock_moves(stock_moves_inserted)
         
-      # update the StockMove_Asset relationship table
+      # update the StockMove_Asset relationship table: each move links the assets it moved
+      # (accepted or declined), the results come back in the order of stock_moves_inserted
       stock_moves_assets_rel_inserted: list[dict] = []
-      for stock_move_db in stock_move_results:
+      for stock_move_db, asset_ids_list in zip(stock_move_results, stock_moves_asset_ids):
         stock_move_id = stock_move_db.get('Id')
         po_line_id = stock_move_db.get('PurchaseOrderItemId')
         # Handle unexpected error when stock_move doesn't link to any po item id
         if not po_line_id:
           raise ValueError(f"Stock move id {stock_move_id} does not link to any po line id")
-        asset_ids_list = assets_lookup_from_po_line_id.get(po_line_id)
-        if not asset_ids_list:
-          # This catches the "it should never happen" scenario
-          # Prevents creating a Stock Move without associated Assets
-          raise ValueError(f"Data Mismatch: StockMove {stock_move_id} (PO: {po_line_id}) has no matching assets in the update payload.")
         # Loop over each asset to build the inserted list with 
         for asset_id in asset_ids_list:
           stock_moves_assets_rel_inserted.append({
             "AssetId": asset_id,
             "StockMoveId": stock_move_id
           })
-      self.db.execute(insert(AssetStockMoveORM), stock_moves_assets_rel_inserted)
+      bulk_writer.insert_many(AssetStockMoveORM, stock_moves_assets_rel_inserted)
       self.db.commit()
+      read_after_write_guard.mark_write()
       return {
       "message" : f"Successfully create good receipt from SM id {sm.sm_id}"
     }
@@ -1,7 +1,7 @@
 
 from fastapi import HTTPException, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import select, text, func, case, label, insert, bindparam
+from sqlalchemy import select, func, case, label, insert
 from app.database.purchase_order_model import PurchaseOrder as PurchaseOrderORM, PurchaseOrderItem as PurchaseOrderItemORM
 from app.database.shipment_manifest_model import ShipmentManifest as ShipmentManifestORM, ShipmentManifestLine as ShipmentManifestLineORM
 from app.database.asset_model import Asset as AssetORM
@@ -17,6 +17,10 @@ from collections import defaultdict
 from app.utils.dependencies import get_db, get_current_user
 import traceback
 from app.services.enum import LocationID, ZoneID, AssetStatus
+from app.services.inventory.stock_balance import StockBalanceService
+from app.services.inventory.asset_status_counter import AssetStatusCounterService
+from app.database.connection import read_after_write_guard
+from app.database.bulk_writer import BulkWriter
 
 logger = setup_logger()
   
@@ -97,42 +101,10 @@ class SupplierService():
     
     logger.info(f"Have checked the wrong purchase order item id: PASSED")
     # Get the statistic of each purchase order line to check if remaining quantity < input quantity
-    sql_query = text("""
-    SELECT 
-        poi.POItemId as PurchaseOrderItemId,
-        ISNULL(SUM(CASE WHEN sm.DestinationLocationId = 1 THEN sm.Quantity 
-                 WHEN sm.SourceLocationId = 1 THEN -sm.Quantity ELSE 0 END), 0) AS available_quantity,
-        ISNULL(SUM(CASE WHEN sm.DestinationLocationId = 3 THEN sm.Quantity 
-                 WHEN sm.SourceLocationId = 3 THEN -sm.Quantity ELSE 0 END), 0) AS in_transit_quantity,
-        ISNULL(SUM(CASE WHEN sm.DestinationLocationId = 4 THEN sm.Quantity 
-                 WHEN sm.SourceLocationId = 4 THEN -sm.Quantity ELSE 0 END), 0) AS awaiting_qc_quantity,
-        ISNULL(SUM(CASE WHEN sm.DestinationLocationId = 7 THEN sm.Quantity 
-                 WHEN sm.SourceLocationId = 7 THEN -sm.Quantity ELSE 0 END), 0) AS rejected_quantity,
-        poi.Quantity - ISNULL(SUM(CASE 
-            WHEN sm.DestinationLocationId IN (1, 3, 4, 7) THEN sm.Quantity
-            WHEN sm.SourceLocationId IN (1, 3, 4, 7) THEN -sm.Quantity 
-            ELSE 0 END), 0) AS remaining_quantity,
-        poi.Quantity AS ordered_quantity
-    FROM PurchaseOrderItem poi
-    LEFT JOIN StockMove sm ON poi.POItemId = sm.PurchaseOrderItemId
-    WHERE poi.POItemId IN :item_ids
-      AND poi.PurchaseOrderId = :po_id
-    GROUP BY poi.POItemId, poi.Quantity
-""").bindparams(bindparam("item_ids", expanding= True))
-
-# 2. Pass the parameters as a dictionary
-# Ensure item_ids is a LIST or TUPLE. SQLAlchemy handles the expansion.
-    params = {
-        "item_ids": tuple(input_po_item_ids), 
-        "po_id": sm_data.purchase_order_id
-    }
-
-    po_items_stats = self.db.execute(sql_query, params).mappings().all()
-    
-    po_item_stats_lookup_map = {
-      po_item_stat["PurchaseOrderItemId"]: po_item_stat
-      for po_item_stat in po_items_stats 
-    }
+    po_item_stats_lookup_map = StockBalanceService(self.db).get_po_item_balances(
+      po_id=sm_data.purchase_order_id,
+      po_item_ids=input_po_item_ids
+    )
     
     # Check if remaining quantity < input quantity
     error_message = []
@@ -141,7 +113,7 @@ class SupplierService():
       if not po_item_stats:
         logger.info(f"Purchase order line id {sm_line.purchase_order_item_id} doesn't have history stock moving")
         continue
-      remaining_quantity = po_item_stats['remaining_quantity']
+      remaining_quantity = po_item_stats['unshipped_quantity']
       logger.info(f"Start compare two quantity fr line {sm_line.purchase_order_item_id} with remaining {remaining_quantity} vs ship quantity {sm_line.quantity}")
 
       if sm_line.quantity > remaining_quantity:
@@ -209,10 +181,8 @@ class SupplierService():
           'SourceLocationId': LocationID.VENDOR.value,
           'DestinationLocationId': LocationID.IN_TRANSIT.value
         })
-      results = self.db.execute(insert(StockMoveORM).returning(
-        StockMoveORM.PurchaseOrderItemId,
-        StockMoveORM.Id
-        ), stock_moves_data).mappings().all()
+      # Insert the stock moves and their balance deltas in the same transaction
+      results = StockBalanceService(self.db).record_stock_moves(stock_moves_data)
       self.db.flush()
       stock_move_lookup_map = {
         stock_move['PurchaseOrderItemId']: stock_move['Id']
@@ -225,6 +195,7 @@ class SupplierService():
       # For asset specified
       assets_to_be_created: list[dict] = []
       for sm_line in sm_data.lines:
+        po_item_orm = po_item_lookup_map.get(sm_line.purchase_order_item_id)
         if sm_line.shipment_mode == "asset_specified":
           for asset_item in sm_line.asset_items:
             new_asset_dict = {
@@ -248,12 +219,17 @@ class SupplierService():
             } for i in range(sm_line.quantity)]
           assets_to_be_created.extend(new_asset_list)
 
-      asset_results = self.db.execute(insert(AssetORM).returning(
-      AssetORM.AssetId,
-      AssetORM.PurchaseOrderLineId
-      ), 
-      assets_to_be_created).mappings().all()
-      self.db.flush()
+      bulk_writer = BulkWriter(self.db)
+      asset_results = bulk_writer.insert_returning(
+        AssetORM,
+        assets_to_be_created,
+        returning=(AssetORM.AssetId, AssetORM.PurchaseOrderLineId)
+      )
+      # Count the new In Transit assets of this purchase order
+      AssetStatusCounterService(self.db).record_transitions(
+        purchase_order_id=po_db.PurchaseOrderId,
+        transitions=[(asset['ProductId'], None, asset['AssetStatus']) for asset in assets_to_be_created]
+      )
       asset_lookup_map: dict[int, list[int]] = defaultdict(list)
 
       for row in asset_results:
@@ -277,8 +253,7 @@ class SupplierService():
 
       # Bulk insert into the junction table
       if asset_stock_move_links:
-        self.db.execute(insert(AssetStockMoveORM), asset_stock_move_links)
-        self.db.flush()
+        bulk_writer.insert_many(AssetStockMoveORM, asset_stock_move_links)
       logger.info(f'Have created so many stock moves relation: ')
       response_data = ShipmentManifestRead(
       # Primary Key and Metadata
@@ -296,6 +271,7 @@ class SupplierService():
       status=new_shipment_manifest_orm.Status
     )
       self.db.commit()
+      read_after_write_guard.mark_write()
       return response_data
         
     except Exception as e:
@@ -0,0 +1,278 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
+from dataclasses import dataclass, field
+from typing import IO, Iterator, Optional, Any
+import codecs
+import csv
+import json
+import time
+from app.database.product_model import Product as ProductORM
+from app.database.bulk_writer import BulkWriter
+from app.database.connection import read_after_write_guard
+from app.schemas.product import ProductCreate
+from app.services.product_search import ProductSearchDocument
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# ProductCreate field -> Product attribute, same mapping as the create_product handler
+PRODUCT_IMPORT_COLUMNS = {
+  "model_number_sku": "ModelNumber_SKU",
+  "product_name": "ProductName",
+  "category": "Category",
+  "product_series": "ProductSeries",
+  "manufacturer": "Manufacturer",
+  "measurement": "Measurement",
+  "selling_price": "SellingPrice",
+  "internal_price": "InternalPrice",
+  "product_image_id": "ProductImageId",
+  "product_image_url": "ProductImageUrl",
+  "product_image_thumbnail_url": "ProductImageThumbnailUrl",
+  "product_image_medium_url": "ProductImageMediumUrl",
+  "package_weight_kg": "PackageWeight_KG",
+  "dimensions_h_cm": "Dimensions_H_CM",
+  "dimensions_w_cm": "Dimensions_W_CM",
+  "dimensions_d_cm": "Dimensions_D_CM",
+  "safety_stock": "SafetyStock",
+  "warranty_period_days": "WarrantyPeriod_Days",
+  "primary_supplier_id": "PrimarySupplierID"
+}
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+def _column_defaults(model) -> dict[str, Any]:
+  # Python side defaults (SafetyStock = 0...), a Core INSERT/UPDATE does not apply them to an explicit None.
+  # Read from the table, the mappers may not be configurable yet at import time
+  return {
+    column.key: column.default.arg
+    for column in model.__table__.columns
+    if column.default is not None and column.default.is_scalar
+  }
+
+PRODUCT_COLUMN_DEFAULTS = _column_defaults(ProductORM)
+
+def detect_import_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+  name = (filename or "").lower()
+  content_type = (content_type or "").lower()
+  if name.endswith(".csv") or content_type in ("text/csv", "application/csv"):
+    return "csv"
+  if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+    return "ndjson"
+  return None
+
+@dataclass
+class _ImportRecord:
+  line: int
+  data: Optional[dict] = None
+  error: Optional[str] = None
+
+def _read_csv(stream: IO[bytes]) -> Iterator[_ImportRecord]:
+  # The reader pulls lines from the spooled upload, the file is never loaded at once
+  reader = csv.DictReader(codecs.getreader("utf-8-sig")(stream))
+  for row in reader:
+    if None in row:
+      yield _ImportRecord(line=reader.line_num, error="more values than header columns")
+      continue
+    # CSV has no null, an empty cell is a missing value
+    yield _ImportRecord(line=reader.line_num, data={key.strip(): (value if value != "" else None) for key, value in row.items()})
+
+def _read_ndjson(stream: IO[bytes]) -> Iterator[_ImportRecord]:
+  for line_number, line in enumerate(stream, start=1):
+    if not line.strip():
+      continue
+    try:
+      data = json.loads(line)
+    except ValueError as e:
+      yield _ImportRecord(line=line_number, error=f"invalid JSON: {e}")
+      continue
+    if not isinstance(data, dict):
+      yield _ImportRecord(line=line_number, error="each line must be a JSON object")
+      continue
+    yield _ImportRecord(line=line_number, data=data)
+
+def _database_error(error: SQLAlchemyError) -> str:
+  # First line of the driver message, without the statement and its parameters
+  message = str(getattr(error, "orig", None) or error)
+  return message.splitlines()[0] if message else error.__class__.__name__
+
+@dataclass
+class ProductImportReport:
+  total_rows: int = 0
+  created: int = 0
+  updated: int = 0
+  failed: int = 0
+  errors: list[dict] = field(default_factory=list)
+  errors_truncated: bool = False
+  # Search documents of the written products, for the caller's index and broadcast
+  documents: list[ProductSearchDocument] = field(default_factory=list)
+
+class ProductImportService():
+  """
+  Imports a product catalog file (CSV with a header row, or NDJSON) in chunks.
+
+  Records are read from the upload as a stream and validated against ProductCreate,
+  chunk_size at a time. Each chunk is upserted on ModelNumber_SKU with one locked
+  SELECT of the known SKUs (see _plan), then a multi row INSERT for the new products and an executemany
+  UPDATE for the known ones (BulkWriter), and committed on its own. When the database
+  rejects a chunk it is rolled back and written again row by row, so only the faulty
+  rows are reported. An update only writes the columns present in the file (an empty
+  CSV cell or a JSON null clears the value), the other columns keep their value.
+  """
+  def __init__(self, db: Session, chunk_size: int, max_reported_errors: int):
+    self.db = db
+    self.chunk_size = chunk_size
+    self.max_reported_errors = max_reported_errors
+
+  def _report_error(self, report: ProductImportReport, line: Optional[int], sku: Optional[str], errors: list[str]):
+    report.failed += 1
+    if len(report.errors) < self.max_reported_errors:
+      report.errors.append({"line": line, "model_number_sku": sku, "errors": errors})
+    else:
+      report.errors_truncated = True
+
+  def _validate(self, record: _ImportRecord, report: ProductImportReport) -> Optional[ProductCreate]:
+    sku = record.data.get("model_number_sku") if record.data else None
+    # Reported as text, a file may hold any JSON value there (123, [..])
+    sku = str(sku) if sku is not None else None
+    if record.error is not None:
+      self._report_error(report, record.line, sku, [record.error])
+      return None
+    try:
+      return ProductCreate.model_validate(record.data)
+    except ValidationError as e:
+      messages = [f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()]
+      self._report_error(report, record.line, sku, messages)
+      return None
+
+  def _to_row(self, product: ProductCreate, for_update: bool = False) -> dict:
+    # A new product gets every column, an update only the ones the row carries
+    values = product.model_dump(include=set(PRODUCT_IMPORT_COLUMNS), exclude_unset=for_update)
+    row = {PRODUCT_IMPORT_COLUMNS[name]: value for name, value in values.items()}
+    for attribute, default in PRODUCT_COLUMN_DEFAULTS.items():
+      if attribute in row and row[attribute] is None:
+        row[attribute] = default
+    return row
+
+  def _import_chunk(self, chunk: list[tuple[int, ProductCreate]], report: ProductImportReport, sku_lines: dict[str, int]):
+    # Several rows for one SKU in the file: the first one wins, the next ones are reported
+    products: dict[str, tuple[int, ProductCreate]] = {}
+    for line, product in chunk:
+      first_line = sku_lines.setdefault(product.model_number_sku, line)
+      if first_line != line:
+        self._report_error(report, line, product.model_number_sku, [f"duplicate of line {first_line} in the file"])
+        continue
+      products[product.model_number_sku] = (line, product)
+    if not products:
+      return
+
+    inserts, updates = self._plan(products, report)
+    written: list[tuple[int, ProductCreate]] = []
+    try:
+      new_ids = self._write(inserts, updates)
+      written = [(product_id, product) for product_id, (_, product, _) in zip(new_ids, inserts)]
+      written += [(row["ProductId"], product) for _, product, row in updates]
+      report.created += len(inserts)
+      report.updated += len(updates)
+    except SQLAlchemyError as e:
+      # One bad row fails the whole statement: find it by writing the chunk again row by row.
+      # The rollback released the SKU locks, each row is looked up again in its own transaction
+      self.db.rollback()
+      logger.warning(f"Product import chunk of {len(products)} rows failed ({e.__class__.__name__}), retrying row by row")
+      for line, product, _ in inserts + updates:
+        try:
+          row_inserts, row_updates = self._plan({product.model_number_sku: (line, product)}, report)
+          new_ids = self._write(row_inserts, row_updates)
+        except SQLAlchemyError as row_error:
+          self.db.rollback()
+          self._report_error(report, line, product.model_number_sku, [f"database error: {_database_error(row_error)}"])
+          continue
+        if row_updates:
+          written.append((row_updates[0][2]["ProductId"], product))
+          report.updated += 1
+        elif row_inserts:
+          written.append((new_ids[0], product))
+          report.created += 1
+
+    if not written:
+      return
+    read_after_write_guard.mark_write()
+    report.documents.extend(
+      ProductSearchDocument(
+        product_id=product_id,
+        model_number_sku=product.model_number_sku,
+        product_name=product.product_name,
+        manufacturer=product.manufacturer,
+        product_series=product.product_series
+      )
+      for product_id, product in written
+    )
+
+  def _plan(self, products: dict[str, tuple[int, ProductCreate]], report: ProductImportReport) -> tuple[list, list]:
+    """
+    Splits the rows into inserts and updates on their known SKUs. The lookup takes
+    UPDLOCK + HOLDLOCK until the commit of _write: another import or a product create
+    of one of these SKUs, known or not yet, waits instead of inserting it twice.
+    """
+    known_ids: dict[str, list[int]] = {}
+    image_urls: dict[int, Optional[str]] = {}
+    for product_id, sku, image_url in self.db.execute(
+      select(ProductORM.ProductId, ProductORM.ModelNumber_SKU, ProductORM.ProductImageUrl)
+      .where(ProductORM.ModelNumber_SKU.in_(list(products)))
+      .with_hint(ProductORM, "WITH (UPDLOCK, HOLDLOCK)", "mssql")
+    ):
+      known_ids.setdefault(sku, []).append(product_id)
+      image_urls[product_id] = image_url
+
+    inserts: list[tuple[int, ProductCreate, dict]] = []
+    updates: list[tuple[int, ProductCreate, dict]] = []
+    for sku, (line, product) in products.items():
+      product_ids = known_ids.get(sku, [])
+      if len(product_ids) > 1:
+        self._report_error(report, line, sku, [f"SKU matches {len(product_ids)} products ({product_ids}), update them one by one"])
+      elif product_ids:
+        row = self._to_row(product, for_update=True)
+        if "ProductImageUrl" in row and row["ProductImageUrl"] != image_urls[product_ids[0]]:
+          # Variants of the previous image would no longer match (as in update_product),
+          # unset ones fall back to the url
+          row.setdefault("ProductImageThumbnailUrl", None)
+          row.setdefault("ProductImageMediumUrl", None)
+        updates.append((line, product, {"ProductId": product_ids[0], **row}))
+      else:
+        inserts.append((line, product, self._to_row(product)))
+    return inserts, updates
+
+  def _write(self, inserts: list[tuple[int, ProductCreate, dict]], updates: list[tuple[int, ProductCreate, dict]]) -> list[int]:
+    """Upsert the rows in one transaction, returns the new ProductIds in the order of inserts."""
+    bulk_writer = BulkWriter(self.db)
+    inserted = bulk_writer.insert_returning(ProductORM, [row for _, _, row in inserts], returning=(ProductORM.ProductId,))
+    bulk_writer.update_many(ProductORM, [row for _, _, row in updates])
+    self.db.commit()
+    return [result["ProductId"] for result in inserted]
+
+  def import_file(self, stream: IO[bytes], file_format: str) -> ProductImportReport:
+    started_at = time.perf_counter()
+    report = ProductImportReport()
+    records = _read_csv(stream) if file_format == "csv" else _read_ndjson(stream)
+    chunk: list[tuple[int, ProductCreate]] = []
+    sku_lines: dict[str, int] = {}
+    try:
+      for record in records:
+        report.total_rows += 1
+        product = self._validate(record, report)
+        if product is not None:
+          chunk.append((record.line, product))
+        if len(chunk) >= self.chunk_size:
+          self._import_chunk(chunk, report, sku_lines)
+          chunk = []
+    except (UnicodeDecodeError, csv.Error) as e:
+      # The rest of the file cannot be read, the chunks already written stay
+      self._report_error(report, None, None, [f"unreadable file, import stopped: {e}"])
+    if chunk:
+      self._import_chunk(chunk, report, sku_lines)
+    logger.info(
+      f"Imported products ({file_format}): {report.total_rows} rows, {report.created} created, "
+      f"{report.updated} updated, {report.failed} failed in {(time.perf_counter() - started_at) * 1000:.0f} ms"
+    )
+    return report
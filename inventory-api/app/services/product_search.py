@@ -0,0 +1,347 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from dataclasses import dataclass
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Optional
+import asyncio
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from app.database.product_model import Product as ProductORM
+from app.database.connection import engine
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Field weights in the ranking, an SKU hit is the most specific
+FIELD_WEIGHTS = {
+  "model_number_sku": 4.0,
+  "product_name": 3.0,
+  "product_series": 2.0,
+  "manufacturer": 1.0
+}
+# Multiplier per kind of match of a query term
+EXACT_TOKEN_BOOST = 3.0
+PREFIX_TOKEN_BOOST = 2.0
+SUBSTRING_BOOST = 1.0
+# Bonus when a whole field starts with the whole query
+FIELD_PREFIX_BONUS = 5.0
+MAX_FIELD_WEIGHT = max(FIELD_WEIGHTS.values())
+
+MAX_SEARCH_LIMIT = 100
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+def normalize(text: Optional[str]) -> str:
+  """Lower case without diacritics ('Điện Thoại' -> 'dien thoai')."""
+  if not text:
+    return ""
+  text = text.replace("đ", "d").replace("Đ", "D")
+  decomposed = unicodedata.normalize("NFKD", text)
+  return "".join(character for character in decomposed if not unicodedata.combining(character)).lower()
+
+def tokenize(text: str) -> list[str]:
+  return [token for token in _TOKEN_SPLIT.split(text) if token]
+
+def trigrams(text: str) -> set[str]:
+  # Trigrams of the compacted text ('ab-12' -> 'ab1', 'b12'), so an SKU typed without separators still matches
+  compact = "".join(tokenize(text))
+  return {compact[index:index + 3] for index in range(len(compact) - 2)}
+
+@dataclass(frozen=True)
+class ProductSearchDocument:
+  product_id: int
+  model_number_sku: str
+  product_name: str
+  manufacturer: Optional[str]
+  product_series: Optional[str]
+
+  @classmethod
+  def from_orm(cls, product) -> "ProductSearchDocument":
+    return cls(
+      product_id=product.ProductId,
+      model_number_sku=product.ModelNumber_SKU,
+      product_name=product.ProductName,
+      manufacturer=product.Manufacturer,
+      product_series=product.ProductSeries
+    )
+
+  def normalized_fields(self) -> dict[str, str]:
+    return {field: normalize(getattr(self, field)) for field in FIELD_WEIGHTS}
+
+@dataclass(frozen=True)
+class _IndexedField:
+  weight: float
+  value: str
+  tokens: tuple[str, ...]
+  compact: str
+
+def _index_fields(document: ProductSearchDocument) -> list[_IndexedField]:
+  indexed_fields = []
+  for field, value in document.normalized_fields().items():
+    tokens = tuple(tokenize(value))
+    indexed_fields.append(_IndexedField(weight=FIELD_WEIGHTS[field], value=value, tokens=tokens, compact="".join(tokens)))
+  return indexed_fields
+
+def _postings_add(postings: dict[str, dict[int, float]], token: str, product_id: int, weight: float) -> bool:
+  # Keeps the best field weight of the token per product, True when the token is new
+  product_weights = postings.get(token)
+  if product_weights is None:
+    postings[token] = {product_id: weight}
+    return True
+  if weight > product_weights.get(product_id, 0.0):
+    product_weights[product_id] = weight
+  return False
+
+def _postings_remove(postings: dict[str, dict[int, float]], token: str, product_id: int) -> bool:
+  # True when the token has no product left
+  product_weights = postings.get(token)
+  if product_weights is None:
+    return False
+  product_weights.pop(product_id, None)
+  if product_weights:
+    return False
+  del postings[token]
+  return True
+
+class ProductSearchIndex():
+  """
+  In-process type-ahead index over the product name, SKU, manufacturer and series.
+
+  - token postings: normalized word -> {product id: best field weight}, with a sorted
+    vocabulary for prefix lookups, so a term is scored by walking its postings
+  - leading postings: same for the first word of each field (whole field prefix bonus)
+  - trigram index: trigram -> product ids, for matches inside a word or an SKU
+
+  Loaded from the database at startup, kept up to date by the product handlers
+  of this worker and reloaded periodically to pick up the writes of other workers.
+  The changes applied while a reload reads the database are journaled and replayed
+  on the rebuilt index, the swap never undoes them.
+  """
+  def __init__(self):
+    self._lock = threading.RLock()
+    self._documents: dict[int, ProductSearchDocument] = {}
+    self._fields: dict[int, list[_IndexedField]] = {}
+    self._tokens: dict[str, dict[int, float]] = {}
+    self._leading: dict[str, dict[int, float]] = {}
+    self._vocabulary: list[str] = []
+    self._trigrams: dict[str, set[int]] = defaultdict(set)
+    self.loaded_at: Optional[float] = None
+    # upsert/remove applied during a load(), None when no load runs
+    self._journal: Optional[list[tuple[str, object]]] = None
+    self.replayed_changes = 0
+
+  def __len__(self) -> int:
+    return len(self._documents)
+
+  def _add(self, document: ProductSearchDocument, sort_vocabulary: bool = True):
+    fields = _index_fields(document)
+    product_id = document.product_id
+    self._documents[product_id] = document
+    self._fields[product_id] = fields
+    for field in fields:
+      for token in field.tokens:
+        if _postings_add(self._tokens, token, product_id, field.weight) and sort_vocabulary:
+          insort(self._vocabulary, token)
+      if field.tokens:
+        _postings_add(self._leading, field.tokens[0], product_id, field.weight)
+      for trigram in trigrams(field.value):
+        self._trigrams[trigram].add(product_id)
+
+  def _remove(self, product_id: int):
+    fields = self._fields.pop(product_id, None)
+    self._documents.pop(product_id, None)
+    if fields is None:
+      return
+    for field in fields:
+      for token in field.tokens:
+        if _postings_remove(self._tokens, token, product_id):
+          position = bisect_left(self._vocabulary, token)
+          if position < len(self._vocabulary) and self._vocabulary[position] == token:
+            del self._vocabulary[position]
+      if field.tokens:
+        _postings_remove(self._leading, field.tokens[0], product_id)
+      for trigram in trigrams(field.value):
+        product_ids = self._trigrams.get(trigram)
+        if product_ids is not None:
+          product_ids.discard(product_id)
+          if not product_ids:
+            del self._trigrams[trigram]
+
+  def upsert(self, product):
+    """Index a created or updated product (ORM object or ProductSearchDocument)."""
+    document = product if isinstance(product, ProductSearchDocument) else ProductSearchDocument.from_orm(product)
+    with self._lock:
+      self._remove(document.product_id)
+      self._add(document)
+      if self._journal is not None:
+        self._journal.append(("upsert", document))
+
+  def remove(self, product_id: int):
+    with self._lock:
+      self._remove(product_id)
+      if self._journal is not None:
+        self._journal.append(("remove", product_id))
+
+  def rebuild(self, documents: list[ProductSearchDocument]):
+    """
+    Replace the whole index (built aside, swapped under the lock). The changes journaled
+    since load() started are replayed on it: the documents may predate them.
+    """
+    fresh = ProductSearchIndex()
+    for document in documents:
+      fresh._add(document, sort_vocabulary=False)
+    fresh._vocabulary = sorted(fresh._tokens)
+    with self._lock:
+      self._documents = fresh._documents
+      self._fields = fresh._fields
+      self._tokens = fresh._tokens
+      self._leading = fresh._leading
+      self._vocabulary = fresh._vocabulary
+      self._trigrams = fresh._trigrams
+      self.loaded_at = time.time()
+      # Replaying a change the documents already hold is harmless, the order is kept
+      for action, value in self._journal or ():
+        if action == "upsert":
+          self._remove(value.product_id)
+          self._add(value)
+        else:
+          self._remove(value)
+      self.replayed_changes += len(self._journal or ())
+
+  def load(self, db: Session) -> int:
+    # Journal started before the read: what the read may miss is replayed by rebuild()
+    with self._lock:
+      self._journal = []
+    try:
+      rows = db.execute(select(
+        ProductORM.ProductId,
+        ProductORM.ModelNumber_SKU,
+        ProductORM.ProductName,
+        ProductORM.Manufacturer,
+        ProductORM.ProductSeries
+      )).all()
+      self.rebuild([
+        ProductSearchDocument(
+          product_id=row.ProductId,
+          model_number_sku=row.ModelNumber_SKU,
+          product_name=row.ProductName,
+          manufacturer=row.Manufacturer,
+          product_series=row.ProductSeries
+        )
+        for row in rows
+      ])
+    finally:
+      with self._lock:
+        self._journal = None
+    return len(rows)
+
+  def _prefix_tokens(self, prefix: str) -> list[str]:
+    position = bisect_left(self._vocabulary, prefix)
+    tokens = []
+    while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+      tokens.append(self._vocabulary[position])
+      position += 1
+    return tokens
+
+  def _term_scores(self, term: str, prefix_tokens: list[str]) -> dict[int, float]:
+    """product id -> best score of the term in the product (word, word prefix or substring)."""
+    scores: dict[int, float] = {}
+    for token in prefix_tokens:
+      boost = EXACT_TOKEN_BOOST if token == term else PREFIX_TOKEN_BOOST
+      for product_id, weight in self._tokens[token].items():
+        score = weight * boost
+        if score > scores.get(product_id, 0.0):
+          scores[product_id] = score
+    if len(term) >= 3:
+      # Products containing every trigram of the term and not matched on a word yet,
+      # checked for the real substring (a trigram hit alone can be a false positive)
+      trigram_sets = sorted((self._trigrams.get(trigram, set()) for trigram in trigrams(term)), key=len)
+      if trigram_sets and trigram_sets[0]:
+        for product_id in trigram_sets[0].intersection(*trigram_sets[1:]):
+          if product_id in scores:
+            continue
+          weights = [field.weight for field in self._fields[product_id] if term in field.compact]
+          if weights:
+            scores[product_id] = max(weights) * SUBSTRING_BOOST
+    return scores
+
+  def search(self, query: str, limit: int = 20) -> list[tuple[ProductSearchDocument, float]]:
+    """
+    Products matching every term of the query (as a word, a word prefix or a substring),
+    best score first.
+    """
+    normalized_query = normalize(query).strip()
+    terms = tokenize(normalized_query)
+    if not terms:
+      return []
+    with self._lock:
+      term_prefix_tokens = {term: self._prefix_tokens(term) for term in terms}
+      # Narrowest term first, the other ones only keep its products
+      ordered_terms = sorted(set(terms), key=lambda term: sum(len(self._tokens[token]) for token in term_prefix_tokens[term]))
+      scores: dict[int, float] = {}
+      for position, term in enumerate(ordered_terms):
+        term_scores = self._term_scores(term, term_prefix_tokens[term])
+        if position == 0:
+          scores = term_scores
+        else:
+          scores = {
+            product_id: score + term_scores[product_id]
+            for product_id, score in scores.items()
+            if product_id in term_scores
+          }
+        if not scores:
+          return []
+      # Whole field prefix bonus, looked up in the postings of the first word of each field
+      bonuses: dict[int, float] = {}
+      for token in term_prefix_tokens[terms[0]]:
+        for product_id, weight in self._leading.get(token, {}).items():
+          if product_id in scores and weight > bonuses.get(product_id, 0.0):
+            bonuses[product_id] = weight
+      for product_id, weight in bonuses.items():
+        if len(terms) > 1:
+          # Several terms: the field must really start with the whole query
+          weights = [field.weight for field in self._fields[product_id] if field.value.startswith(normalized_query)]
+          if not weights:
+            continue
+          weight = max(weights)
+        scores[product_id] += FIELD_PREFIX_BONUS * weight / MAX_FIELD_WEIGHT
+      best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+      hits = [(self._documents[product_id], score) for product_id, score in best]
+    hits.sort(key=lambda hit: (-hit[1], hit[0].product_name, hit[0].product_id))
+    return hits
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        "products": len(self._documents),
+        "tokens": len(self._tokens),
+        "trigrams": len(self._trigrams),
+        "loaded_at": self.loaded_at,
+        "replayed_changes": self.replayed_changes
+      }
+
+product_search_index = ProductSearchIndex()
+
+def load_product_search_index_job() -> int:
+  """(Re)load the search index in its own session (used at startup and by the background loop)."""
+  started_at = time.perf_counter()
+  # Primary: a replica behind the latest writes would bring back deleted or old products
+  with Session(engine) as db:
+    count = product_search_index.load(db)
+  logger.info(f"Loaded {count} products into the search index in {(time.perf_counter() - started_at) * 1000:.0f} ms")
+  return count
+
+async def run_product_search_refresh_loop(interval_minutes: int):
+  """Load the search index at startup and reload it every interval_minutes (0: load once)."""
+  while True:
+    try:
+      await asyncio.to_thread(load_product_search_index_job)
+    except Exception as e:
+      logger.error(f"Loading the product search index failed: {e}")
+    if interval_minutes <= 0:
+      return
+    await asyncio.sleep(interval_minutes * 60)
@@ -1,15 +1,185 @@
 from fastapi import WebSocket
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+import asyncio
+import json
+import time
+from app.core.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Close codes sent to evicted clients (RFC 6455 7.4.1)
+CLOSE_GOING_AWAY = 1001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+PING_MESSAGE = json.dumps({"type": "ping"})
+
+@dataclass
+class _Client:
+    websocket: WebSocket
+    queue: asyncio.Queue
+    writer: Optional[asyncio.Task] = None
+    connected_at: float = field(default_factory=time.monotonic)
+    # Last message received from the client (pong or anything else)
+    last_seen: float = field(default_factory=time.monotonic)
+    sent: int = 0
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+    """
+    Websocket fan-out. Every connection has a bounded outbound queue drained by its
+    own writer task: broadcast() only enqueues and returns, so a slow client never
+    delays the others nor the request that broadcast.
+
+    A client is evicted (and closed) when its queue overflows, when one send takes
+    longer than send_timeout_seconds, or when it sent nothing, not even the pong of
+    the pings sent every ping_interval_seconds, for idle_timeout_seconds.
+    """
+    def __init__(self, name: str, max_queue: int, send_timeout_seconds: float,
+                 ping_interval_seconds: float, idle_timeout_seconds: float):
+        self.name = name
+        self.max_queue = max_queue
+        self.send_timeout_seconds = send_timeout_seconds
+        self.ping_interval_seconds = ping_interval_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._clients: dict[WebSocket, _Client] = {}
+        self._keepalive: Optional[asyncio.Task] = None
+        self.connected = 0
+        self.broadcasts = 0
+        self.sent = 0
+        self.evicted = {"overflow": 0, "send_timeout": 0, "send_error": 0, "idle": 0}
+        self.send_total_seconds = 0.0
+        self.send_max_seconds = 0.0
+        self._recent_send_seconds: deque[float] = deque(maxlen=1000)
+
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        return list(self._clients)
+
+    def start(self):
+        if self._keepalive is None and self.ping_interval_seconds > 0:
+            self._keepalive = asyncio.create_task(self._run_keepalive())
+
+    async def stop(self):
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            await asyncio.gather(self._keepalive, return_exceptions=True)
+            self._keepalive = None
+        clients = list(self._clients.values())
+        for client in clients:
+            self._remove(client)
+        await asyncio.gather(*(self._close(client, CLOSE_GOING_AWAY) for client in clients), return_exceptions=True)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        # Started on first use when the application lifespan did not (tests)
+        self.start()
+        client = _Client(websocket=websocket, queue=asyncio.Queue(maxsize=self.max_queue))
+        client.writer = asyncio.create_task(self._write(client))
+        self._clients[websocket] = client
+        self.connected += 1
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # The client may already be gone, evicted by the manager
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._remove(client)
+
+    def touch(self, websocket: WebSocket):
+        """Records a message received from the client, it is alive."""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.last_seen = time.monotonic()
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
\ No newline at end of file
+        self.broadcasts += 1
+        for client in list(self._clients.values()):
+            self._enqueue(client, message)
+
+    def _enqueue(self, client: _Client, message: str):
+        try:
+            client.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._evict(client, "overflow", CLOSE_TRY_AGAIN_LATER)
+
+    async def _write(self, client: _Client):
+        while True:
+            message = await client.queue.get()
+            started_at = time.perf_counter()
+            try:
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout_seconds)
+            except asyncio.TimeoutError:
+                self._evict(client, "send_timeout", CLOSE_GOING_AWAY)
+                return
+            except Exception as e:
+                logger.info(f"Websocket send failed ({e.__class__.__name__}), dropping the client")
+                self._evict(client, "send_error", None)
+                return
+            elapsed = time.perf_counter() - started_at
+            client.sent += 1
+            self.sent += 1
+            self.send_total_seconds += elapsed
+            self.send_max_seconds = max(self.send_max_seconds, elapsed)
+            self._recent_send_seconds.append(elapsed)
+
+    def _remove(self, client: _Client):
+        self._clients.pop(client.websocket, None)
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def _evict(self, client: _Client, reason: str, close_code: Optional[int]):
+        if client.websocket not in self._clients:
+            return
+        self._remove(client)
+        self.evicted[reason] += 1
+        logger.warning(f"Evicted a {self.name} websocket client ({reason}, {client.queue.qsize()} messages pending)")
+        if close_code is not None:
+            asyncio.create_task(self._close(client, close_code))
+
+    async def _close(self, client: _Client, code: int):
+        # A stalled client may not take the close frame either
+        try:
+            await asyncio.wait_for(client.websocket.close(code=code), self.send_timeout_seconds)
+        except Exception:
+            pass
+
+    async def _run_keepalive(self):
+        while True:
+            await asyncio.sleep(self.ping_interval_seconds)
+            idle_before = time.monotonic() - self.idle_timeout_seconds
+            for client in list(self._clients.values()):
+                if client.last_seen < idle_before:
+                    self._evict(client, "idle", CLOSE_GOING_AWAY)
+                else:
+                    self._enqueue(client, PING_MESSAGE)
+
+    def stats(self) -> dict:
+        depths = [client.queue.qsize() for client in self._clients.values()]
+        recent = sorted(self._recent_send_seconds)
+        return {
+            "clients": len(self._clients),
+            "connected": self.connected,
+            "broadcasts": self.broadcasts,
+            "sent": self.sent,
+            "evicted": dict(self.evicted),
+            "max_queue": self.max_queue,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "avg_send_ms": round(self.send_total_seconds * 1000 / self.sent, 3) if self.sent else 0.0,
+            "p95_send_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 3) if recent else 0.0,
+            "max_send_ms": round(self.send_max_seconds * 1000, 3)
+        }
+
+CONNECTION_MANAGERS: dict[str, ConnectionManager] = {}
+
+def create_connection_manager(name: str) -> ConnectionManager:
+    manager = ConnectionManager(
+        name,
+        max_queue=settings.WS_CLIENT_QUEUE_SIZE,
+        send_timeout_seconds=settings.WS_SEND_TIMEOUT_SECONDS,
+        ping_interval_seconds=settings.WS_PING_INTERVAL_SECONDS,
+        idle_timeout_seconds=settings.WS_IDLE_TIMEOUT_SECONDS
+    )
+    CONNECTION_MANAGERS[name] = manager
+    return manager
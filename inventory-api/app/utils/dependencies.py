@@ -4,11 +4,16 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from app.database.connection import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import get_db, get_async_db, get_read_db, get_async_read_db
 from app.database.user_model import User as UserORM
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
-from typing import TypeVar, Type
+from typing import TypeVar, Type, Optional
+from dataclasses import dataclass
+from app.core.config import settings
+from app.utils.ttl_cache import TTLCache, register_cache
 import os
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = os.getenv('ALGORITHM')
@@ -28,7 +33,47 @@ def create_access_token (input_data: dict, time_delta: timedelta |None = None):
   # Generate access token
   access_token = jwt.encode(to_encoded_data, SECRET_KEY, ALGORITHM)
   return access_token
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@dataclass(frozen=True)
+class UserPrincipal:
+    """
+    Authenticated user, as returned by get_current_user.
+    Same PascalCase attributes as the User ORM model minus the password hash,
+    so it can be cached and shared between requests.
+    """
+    UserId: int
+    Username: str
+    Name: Optional[str]
+    Phone: Optional[str]
+    RoleId: int
+    CreateDate: datetime
+
+    @classmethod
+    def from_orm(cls, user: UserORM) -> "UserPrincipal":
+        return cls(
+            UserId=user.UserId,
+            Username=user.Username,
+            Name=user.Name,
+            Phone=user.Phone,
+            RoleId=user.RoleId,
+            CreateDate=user.CreateDate
+        )
+
+# Username -> UserPrincipal, per worker process. The TTL bounds how long a change
+# made through another worker (or directly in the database) can go unnoticed.
+user_principal_cache: TTLCache[UserPrincipal] = register_cache(TTLCache(
+    name="user_principal",
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+))
+
+def invalidate_cached_user(user_id: Optional[int] = None, username: Optional[str] = None):
+    """Drop a user from the principal cache, call after the user was updated or deleted."""
+    if username is not None:
+        user_principal_cache.invalidate(username)
+    if user_id is not None:
+        user_principal_cache.invalidate_where(lambda principal: principal.UserId == user_id)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> UserPrincipal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,11 +87,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
+    principal = user_principal_cache.get(username)
+    if principal is not None:
+        return principal
+
     # Get the user object from the database using the username from the token
-    user = db.query(UserORM).filter(UserORM.Username == username).one_or_none()
+    # (the session only checks out a connection on this cache miss)
+    result = await db.execute(select(UserORM).where(UserORM.Username == username))
+    user = result.scalars().one_or_none()
     if user is None:
         raise credentials_exception
-    return user
+    principal = UserPrincipal.from_orm(user)
+    user_principal_cache.set(username, principal)
+    return principal
+
+async def get_current_admin(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
+    """get_current_user restricted to the administrators (RoleId = ADMIN_ROLE_ID), 403 for the other users."""
+    if current_user.RoleId != settings.ADMIN_ROLE_ID:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Administrator role required")
+    return current_user
 
 class FormBody:
     def __init__(self, model: Type[BaseModel]):
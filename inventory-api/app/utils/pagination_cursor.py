@@ -0,0 +1,22 @@
+from typing import Any
+import base64
+import json
+
+def encode_cursor(values: dict[str, Any]) -> str:
+  """Opaque cursor (url safe base64 of the sort key values of the last row of a page)."""
+  payload = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+  return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+  """
+  Raises:
+      ValueError: the cursor was not produced by encode_cursor
+  """
+  try:
+    payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    values = json.loads(payload)
+  except (ValueError, UnicodeDecodeError) as e:
+    raise ValueError(f"Invalid cursor: {e}")
+  if not isinstance(values, dict):
+    raise ValueError("Invalid cursor")
+  return values
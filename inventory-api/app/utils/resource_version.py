@@ -0,0 +1,91 @@
+from fastapi import Request, Response, status
+from typing import Optional
+import secrets
+import threading
+import time
+
+# Browsers keep the list but revalidate it on every load (private: the lists need a token)
+LIST_CACHE_CONTROL = "private, no-cache"
+
+class ResourceVersion():
+  """
+  Version counter of a rarely changing resource list, turned into a strong ETag.
+
+  The routers writing the resource bump() it after their commit. The ETag holds
+  a random id of the process, so a restart never serves a 304 for an older list,
+  and it changes at least every max_age_seconds to pick up the writes made by
+  other workers or directly in the database (0: only bump() changes it).
+  The routes serving the list read it from the primary: a replica behind the
+  write would pair the new ETag with an old body, kept by the clients on 304s.
+  """
+  def __init__(self, name: str, max_age_seconds: float):
+    self.name = name
+    self.max_age_seconds = max_age_seconds
+    self._lock = threading.Lock()
+    self._process_id = secrets.token_hex(4)
+    self._counter = 0
+    self._bumped_at = time.monotonic()
+    self.bumps = 0
+    self.expirations = 0
+    self.not_modified = 0
+    self.full_responses = 0
+
+  def bump(self):
+    with self._lock:
+      self._counter += 1
+      self._bumped_at = time.monotonic()
+      self.bumps += 1
+
+  def etag(self) -> str:
+    with self._lock:
+      if self.max_age_seconds > 0 and time.monotonic() - self._bumped_at >= self.max_age_seconds:
+        self._counter += 1
+        self._bumped_at = time.monotonic()
+        self.expirations += 1
+      return f'"{self.name}-{self._process_id}-{self._counter}"'
+
+  def not_modified_response(self, request: Request) -> tuple[str, Optional[Response]]:
+    """
+    Current ETag, and a 304 response when the client already holds it
+    (the route then returns it before touching the database).
+    """
+    etag = self.etag()
+    if etag_matches(request.headers.get("if-none-match"), etag):
+      with self._lock:
+        self.not_modified += 1
+      return etag, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+    with self._lock:
+      self.full_responses += 1
+    return etag, None
+
+  def stats(self) -> dict:
+    with self._lock:
+      requests = self.not_modified + self.full_responses
+      return {
+        "name": self.name,
+        "version": self._counter,
+        "max_age_seconds": self.max_age_seconds,
+        "bumps": self.bumps,
+        "expirations": self.expirations,
+        "not_modified": self.not_modified,
+        "full_responses": self.full_responses,
+        "not_modified_ratio": round(self.not_modified / requests, 4) if requests else 0.0
+      }
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+  # If-None-Match uses the weak comparison: W/ prefixes are ignored
+  if not if_none_match:
+    return False
+  if if_none_match.strip() == "*":
+    return True
+  return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+def cache_headers(etag: str) -> dict[str, str]:
+  return {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+
+# resource name -> version, read by the internal metrics endpoint
+RESOURCE_VERSIONS: dict[str, ResourceVersion] = {}
+
+def register_resource_version(version: ResourceVersion) -> ResourceVersion:
+  RESOURCE_VERSIONS[version.name] = version
+  return version
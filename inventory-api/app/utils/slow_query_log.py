@@ -0,0 +1,188 @@
+"""
+Slow query log.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are kept in a bounded in-memory
+ring buffer (read by the internal metrics endpoints) and appended as JSON lines
+to a rotating log file. Each entry carries the route that issued the statement,
+its duration, the row count reported by the driver and the redacted parameters.
+
+Fed by the cursor listener of app/utils/sql_profiler.py.
+"""
+from logging.handlers import RotatingFileHandler
+from collections import deque
+from datetime import datetime, date, timezone
+from decimal import Decimal
+from typing import Optional
+import json
+import logging
+import os
+import threading
+from app.core.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Parameter sets of one executemany kept in an entry
+MAX_LOGGED_PARAMETER_SETS = 3
+STATEMENT_MAX_LENGTH = 4000
+
+def _redact_value(value):
+  # Numbers, dates and flags identify the rows without leaking personal data, strings and bytes may not
+  if value is None or isinstance(value, (bool, int, float)):
+    return value
+  if isinstance(value, Decimal):
+    return float(value)
+  if isinstance(value, (datetime, date)):
+    return value.isoformat()
+  if isinstance(value, (str, bytes, bytearray)):
+    return f"<{type(value).__name__} len={len(value)}>"
+  return f"<{type(value).__name__}>"
+
+def _redact_parameter_set(parameters):
+  if isinstance(parameters, dict):
+    return {key: _redact_value(value) for key, value in parameters.items()}
+  if isinstance(parameters, (list, tuple)):
+    return [_redact_value(value) for value in parameters]
+  return _redact_value(parameters)
+
+def redact_parameters(parameters, executemany: bool):
+  if parameters is None:
+    return None
+  if executemany:
+    return {
+      "parameter_sets": len(parameters),
+      "first": [_redact_parameter_set(parameter_set) for parameter_set in list(parameters)[:MAX_LOGGED_PARAMETER_SETS]]
+    }
+  return _redact_parameter_set(parameters)
+
+class SlowQueryLog():
+  """
+  Thread safe ring buffer of the slow statements, mirrored to a rotating JSON lines file.
+  """
+  def __init__(
+    self,
+    threshold_ms: float,
+    buffer_size: int = 500,
+    log_file: Optional[str] = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5
+  ):
+    self.threshold_ms = threshold_ms
+    self._lock = threading.Lock()
+    self._entries: deque[dict] = deque(maxlen=buffer_size)
+    self.recorded = 0
+    self._file_logger = None
+    if log_file:
+      self._file_logger = self._create_file_logger(log_file, max_bytes, backup_count)
+
+  @staticmethod
+  def _create_file_logger(log_file: str, max_bytes: int, backup_count: int) -> Optional[logging.Logger]:
+    try:
+      directory = os.path.dirname(os.path.abspath(log_file))
+      os.makedirs(directory, exist_ok=True)
+      handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    except OSError as e:
+      logger.error(f"Cannot open the slow query log file {log_file}, keeping the slow queries in memory only: {e}")
+      return None
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    file_logger = logging.getLogger("slow_query_log")
+    file_logger.setLevel(logging.INFO)
+    file_logger.propagate = False
+    if not file_logger.handlers:
+      file_logger.addHandler(handler)
+    return file_logger
+
+  @property
+  def enabled(self) -> bool:
+    return self.threshold_ms > 0
+
+  def record(
+    self,
+    statement: str,
+    parameters,
+    executemany: bool,
+    seconds: float,
+    row_count: Optional[int],
+    route: Optional[str]
+  ):
+    """Keep the statement when it ran longer than the threshold."""
+    duration_ms = seconds * 1000
+    if not self.enabled or duration_ms < self.threshold_ms:
+      return
+    entry = {
+      "timestamp": datetime.now(timezone.utc).isoformat(),
+      "route": route or "(outside a request)",
+      "duration_ms": round(duration_ms, 3),
+      # Rows affected by a DML statement, SELECT statements report -1 with most drivers
+      "row_count": row_count if row_count is not None and row_count >= 0 else None,
+      "executemany": executemany,
+      "statement": statement[:STATEMENT_MAX_LENGTH],
+      "parameters": redact_parameters(parameters, executemany)
+    }
+    with self._lock:
+      self._entries.append(entry)
+      self.recorded += 1
+    logger.warning(f"Slow query ({entry['duration_ms']:.0f} ms) in {entry['route']}: {statement[:200]}")
+    if self._file_logger:
+      self._file_logger.info(json.dumps(entry, default=str))
+
+  def recent(self, limit: int = 50) -> list[dict]:
+    """Latest slow statements, newest first."""
+    with self._lock:
+      entries = list(self._entries)
+    return entries[::-1][:limit]
+
+  def top(self, limit: int = 20, order_by: str = "total_ms") -> list[dict]:
+    """
+    Slow statements of the buffer aggregated per route and statement, sorted by
+    order_by ('total_ms', 'max_ms', 'avg_ms' or 'count').
+    """
+    # Local import, sql_profiler feeds this module
+    from app.utils.sql_profiler import statement_shape
+    with self._lock:
+      entries = list(self._entries)
+    groups: dict[tuple[str, str], dict] = {}
+    for entry in entries:
+      key = (entry["route"], statement_shape(entry["statement"]))
+      group = groups.get(key)
+      if group is None:
+        group = groups[key] = {
+          "route": key[0],
+          "statement": key[1],
+          "count": 0,
+          "total_ms": 0.0,
+          "max_ms": 0.0,
+          "last_seen": None,
+          "sample_parameters": None
+        }
+      group["count"] += 1
+      group["total_ms"] += entry["duration_ms"]
+      if entry["duration_ms"] >= group["max_ms"]:
+        group["max_ms"] = entry["duration_ms"]
+        group["sample_parameters"] = entry["parameters"]
+      group["last_seen"] = entry["timestamp"]
+    for group in groups.values():
+      group["total_ms"] = round(group["total_ms"], 3)
+      group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+    return sorted(groups.values(), key=lambda group: group[order_by], reverse=True)[:limit]
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        "threshold_ms": self.threshold_ms,
+        "buffered": len(self._entries),
+        "buffer_size": self._entries.maxlen,
+        "recorded": self.recorded
+      }
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+slow_query_log = SlowQueryLog(
+  threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+  buffer_size=settings.SLOW_QUERY_BUFFER_SIZE,
+  log_file=settings.SLOW_QUERY_LOG_FILE,
+  max_bytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+  backup_count=settings.SLOW_QUERY_LOG_BACKUP_COUNT
+)
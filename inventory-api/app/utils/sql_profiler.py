@@ -0,0 +1,235 @@
+"""
+Per-request SQL profiling.
+
+A global cursor listener records every statement executed while a profile is
+active (one per HTTP request through SQLProfilerMiddleware, or a block of code
+through profile_sql / assert_max_queries). The profile lives in a context variable,
+so it follows the request into the threadpool (sync routes) and into the
+greenlets of the async engine.
+
+A statement shape executed at least n_plus_one_threshold times in the same
+profile is reported as an N+1 suspect: the same SELECT issued once per parent
+row is the signature of a lazy load or of a query inside a loop.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextvars import ContextVar
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+import re
+import threading
+import time
+from app.utils.logger import setup_logger
+from app.utils.slow_query_log import slow_query_log
+
+logger = setup_logger()
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+# Characters of a statement kept in the logs
+STATEMENT_PREVIEW_LENGTH = 300
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists ("IN (?, ?, ?)") and multi row VALUES differ only by their number of parameters
+_PARAMETER_LIST = re.compile(r"\((?:\s*(?:\?|%s|:\w+|@P\d+)\s*,)+\s*(?:\?|%s|:\w+|@P\d+)\s*\)")
+
+def statement_shape(statement: str) -> str:
+  """Normalize a statement so the executions of the same query compare equal."""
+  return _PARAMETER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+@dataclass
+class StatementStats:
+  count: int = 0
+  total_seconds: float = 0.0
+
+@dataclass
+class SQLProfile:
+  """Statements executed during one request (or one profiled block)."""
+  label: str
+  n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD
+  # ASGI scope of the profiled request, the router adds the matched route to it
+  scope: Optional[dict] = None
+  statement_count: int = 0
+  total_seconds: float = 0.0
+  shapes: dict[str, StatementStats] = field(default_factory=dict)
+
+  def record(self, statement: str, seconds: float, executemany: bool):
+    self.statement_count += 1
+    self.total_seconds += seconds
+    # One executemany is one round trip, it is never an N+1 pattern
+    shape = statement_shape(statement) if not executemany else f"[executemany] {statement_shape(statement)}"
+    stats = self.shapes.get(shape)
+    if stats is None:
+      stats = self.shapes[shape] = StatementStats()
+    stats.count += 1
+    stats.total_seconds += seconds
+
+  def n_plus_one_suspects(self) -> list[tuple[str, StatementStats]]:
+    """Statement shapes repeated at least n_plus_one_threshold times, most repeated first."""
+    suspects = [
+      (shape, stats) for shape, stats in self.shapes.items()
+      if stats.count >= self.n_plus_one_threshold and not shape.startswith("[executemany]")
+    ]
+    return sorted(suspects, key=lambda item: item[1].count, reverse=True)
+
+  def route(self) -> str:
+    """Route template of the request (e.g. 'GET /purchase-order/{po_id}'), the label before routing."""
+    route = self.scope.get("route") if self.scope else None
+    path = getattr(route, "path", None)
+    if path is None:
+      return self.label
+    return f"{self.scope['method']} {path}"
+
+  def server_timing(self, app_seconds: Optional[float] = None) -> str:
+    """Value of the Server-Timing header (https://www.w3.org/TR/server-timing/)."""
+    metrics = [f'db;desc="{self.statement_count} SQL statements";dur={self.total_seconds * 1000:.2f}']
+    if app_seconds is not None:
+      metrics.append(f'app;dur={app_seconds * 1000:.2f}')
+    return ", ".join(metrics)
+
+  def log_summary(self, slow_request_statements: Optional[int] = None):
+    for shape, stats in self.n_plus_one_suspects():
+      logger.warning(
+        f"Possible N+1 in {self.label}: statement executed {stats.count} times "
+        f"({stats.total_seconds * 1000:.1f} ms): {shape[:STATEMENT_PREVIEW_LENGTH]}"
+      )
+    message = f"{self.label}: {self.statement_count} SQL statements in {self.total_seconds * 1000:.1f} ms"
+    if slow_request_statements is not None and self.statement_count >= slow_request_statements:
+      logger.warning(message)
+    else:
+      logger.debug(message)
+
+_current_profile: ContextVar[Optional[SQLProfile]] = ContextVar("sql_profile", default=None)
+# Profiles recording the statements of every thread (tests driving the app through TestClient,
+# which runs the application in another thread than the test)
+_process_profiles: list[SQLProfile] = []
+_process_profiles_lock = threading.Lock()
+
+def current_profile() -> Optional[SQLProfile]:
+  return _current_profile.get()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+  conn.info.setdefault("sql_profiler_started_at", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+  started_at = conn.info["sql_profiler_started_at"].pop()
+  seconds = time.perf_counter() - started_at
+  profile = _current_profile.get()
+  if profile is not None:
+    profile.record(statement, seconds, executemany)
+  if _process_profiles:
+    with _process_profiles_lock:
+      for process_profile in _process_profiles:
+        process_profile.record(statement, seconds, executemany)
+  if slow_query_log.enabled and seconds * 1000 >= slow_query_log.threshold_ms:
+    slow_query_log.record(
+      statement,
+      parameters,
+      executemany,
+      seconds=seconds,
+      row_count=getattr(cursor, "rowcount", None),
+      route=profile.route() if profile is not None else None
+    )
+
+@event.listens_for(Engine, "handle_error")
+def _discard_statement_timer(exception_context):
+  # after_cursor_execute is not called for a failed statement
+  connection = exception_context.connection
+  if connection is not None and connection.info.get("sql_profiler_started_at"):
+    connection.info["sql_profiler_started_at"].pop()
+
+@contextmanager
+def profile_sql(
+  label: str = "profiled block",
+  n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD,
+  all_threads: bool = False,
+  scope: Optional[dict] = None
+) -> Iterator[SQLProfile]:
+  """
+  Record the statements executed inside the block.
+
+      with profile_sql("import") as profile:
+        ...
+      print(profile.statement_count)
+
+  With all_threads, the statements of every thread are recorded while the block runs.
+  """
+  profile = SQLProfile(label=label, n_plus_one_threshold=n_plus_one_threshold, scope=scope)
+  if all_threads:
+    with _process_profiles_lock:
+      _process_profiles.append(profile)
+    try:
+      yield profile
+    finally:
+      with _process_profiles_lock:
+        _process_profiles.remove(profile)
+    return
+  token = _current_profile.set(profile)
+  try:
+    yield profile
+  finally:
+    _current_profile.reset(token)
+
+@contextmanager
+def assert_max_queries(
+  max_statements: Optional[int] = None,
+  n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD,
+  allow_n_plus_one: bool = False
+) -> Iterator[SQLProfile]:
+  """
+  Test helper, fail when the block runs more statements than allowed or repeats a statement shape.
+  Statements of all threads are counted, so requests sent through TestClient are included.
+
+      with assert_max_queries(max_statements=3):
+        client.get("/receiving/manifests/search", headers=headers)
+
+  Raises:
+      AssertionError: with the offending statements
+  """
+  with profile_sql("assert_max_queries", n_plus_one_threshold=n_plus_one_threshold, all_threads=True) as profile:
+    yield profile
+  problems = []
+  if max_statements is not None and profile.statement_count > max_statements:
+    problems.append(f"{profile.statement_count} SQL statements executed, at most {max_statements} expected")
+  if not allow_n_plus_one:
+    for shape, stats in profile.n_plus_one_suspects():
+      problems.append(f"N+1 suspect, executed {stats.count} times: {shape[:STATEMENT_PREVIEW_LENGTH]}")
+  if problems:
+    raise AssertionError("\n".join(problems))
+
+class SQLProfilerMiddleware():
+  """
+  ASGI middleware that profiles the SQL of each HTTP request.
+
+  Adds a Server-Timing header (statement count and database time up to the
+  response headers) and logs the N+1 suspects once the response is complete,
+  streamed bodies included.
+  """
+  def __init__(self, app, n_plus_one_threshold: int = DEFAULT_N_PLUS_ONE_THRESHOLD, slow_request_statements: Optional[int] = None):
+    self.app = app
+    self.n_plus_one_threshold = n_plus_one_threshold
+    self.slow_request_statements = slow_request_statements
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+
+    started_at = time.perf_counter()
+    label = f"{scope['method']} {scope['path']}"
+
+    async def send_with_server_timing(message):
+      if message["type"] == "http.response.start":
+        header = profile.server_timing(app_seconds=time.perf_counter() - started_at)
+        message.setdefault("headers", [])
+        message["headers"] = list(message["headers"]) + [(b"server-timing", header.encode("latin-1"))]
+      await send(message)
+
+    with profile_sql(label, n_plus_one_threshold=self.n_plus_one_threshold, scope=scope) as profile:
+      try:
+        await self.app(scope, receive, send_with_server_timing)
+      finally:
+        profile.log_summary(slow_request_statements=self.slow_request_statements)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+import threading
+import time
+
+V = TypeVar("V")
+
+class TTLCache(Generic[V]):
+  """
+  Thread safe LRU cache whose entries expire ttl_seconds after they were stored.
+
+  The least recently used entry is evicted once maxsize is reached, expired
+  entries are dropped when they are read. Counters are exposed through stats().
+  """
+  def __init__(self, name: str, maxsize: int, ttl_seconds: float):
+    self.name = name
+    self.maxsize = maxsize
+    self.ttl_seconds = ttl_seconds
+    self._lock = threading.Lock()
+    # key -> (expires at monotonic time, value)
+    self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expirations = 0
+    self.invalidations = 0
+
+  @property
+  def enabled(self) -> bool:
+    return self.maxsize > 0 and self.ttl_seconds > 0
+
+  def get(self, key: Hashable) -> Optional[V]:
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+      expires_at, value = entry
+      if expires_at <= time.monotonic():
+        del self._entries[key]
+        self.expirations += 1
+        self.misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return value
+
+  def set(self, key: Hashable, value: V):
+    if not self.enabled:
+      return
+    with self._lock:
+      self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def invalidate(self, key: Hashable):
+    with self._lock:
+      if self._entries.pop(key, None) is not None:
+        self.invalidations += 1
+
+  def invalidate_where(self, predicate: Callable[[V], bool]):
+    """Drop every entry whose value matches the predicate."""
+    with self._lock:
+      keys = [key for key, (_, value) in self._entries.items() if predicate(value)]
+      for key in keys:
+        del self._entries[key]
+      self.invalidations += len(keys)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self) -> dict:
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "name": self.name,
+        "size": len(self._entries),
+        "maxsize": self.maxsize,
+        "ttl_seconds": self.ttl_seconds,
+        "hits": self.hits,
+        "misses": self.misses,
+        "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        "evictions": self.evictions,
+        "expirations": self.expirations,
+        "invalidations": self.invalidations
+      }
+
+# cache name -> cache, read by the internal metrics endpoint
+CACHES: dict[str, TTLCache] = {}
+
+def register_cache(cache: TTLCache) -> TTLCache:
+  CACHES[cache.name] = cache
+  return cache
@@ -0,0 +1,107 @@
+"""
+Benchmark of the bulk writer against the previous write paths of the procurement services.
+
+Usage (from inventory-api/):
+    python -m benchmarks.bulk_writer_benchmark --rows 50000
+    BENCHMARK_DATABASE_URL="mssql+pyodbc:///?odbc_connect=..." python -m benchmarks.bulk_writer_benchmark
+
+The default database is a local SQLite file. Point BENCHMARK_DATABASE_URL to a scratch
+SQL Server database to measure the 2100 parameter limit and fast_executemany for real.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, insert, select, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from app.database.base import Base
+from app.database.asset_model import Asset
+from app.database.product_model import Product
+from app.database.warehouse_zone_model import Zone
+from app.database.stock_move import StockMove, AssetStockMove
+# Imported so every relationship of Asset can be configured
+from app.database.shipment_manifest_model import ShipmentManifest, ShipmentManifestLine
+from app.database.good_receipt_model import GoodsReceipt
+from app.database.user_model import User
+from app.database.supplier_model import Supplier
+from app.database.bulk_writer import BulkWriter
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+  # SQLite only auto increments INTEGER PRIMARY KEY columns
+  return "INTEGER"
+
+def _seed(db: Session) -> tuple[int, int, int]:
+  zone_id = db.execute(select(Zone.ZoneId).limit(1)).scalar()
+  if zone_id is None:
+    zone = Zone(ZoneName="Benchmark")
+    db.add(zone)
+    db.flush()
+    zone_id = zone.ZoneId
+  product_id = db.execute(select(Product.ProductId).limit(1)).scalar()
+  if product_id is None:
+    product = Product(ModelNumber_SKU="BENCH", ProductName="Benchmark", Category="bench", ProductSeries="bench",
+                      Measurement="pc", InternalPrice=1.0, SellingPrice=1.0)
+    db.add(product)
+    db.flush()
+    product_id = product.ProductId
+  stock_move = StockMove(Quantity=0, SourceLocationId=3, DestinationLocationId=4)
+  db.add(stock_move)
+  db.commit()
+  return product_id, zone_id, stock_move.Id
+
+def _asset_rows(count: int, product_id: int, zone_id: int, prefix: str) -> list[dict]:
+  return [{
+    "SerialNumber": f"{prefix}-{index}",
+    "ProductId": product_id,
+    "CurrentZoneId": zone_id,
+    "AssetStatus": "In Transit",
+    "LastMovementDate": datetime.now()
+  } for index in range(count)]
+
+def _timed(label: str, func_to_time) -> float:
+  started_at = time.perf_counter()
+  func_to_time()
+  elapsed = time.perf_counter() - started_at
+  print(f"  {label:<45} {elapsed:8.3f}s")
+  return elapsed
+
+def run(url: str, rows: int):
+  engine = create_engine(url)
+  Base.metadata.create_all(engine)
+  with Session(engine) as db:
+    product_id, zone_id, stock_move_id = _seed(db)
+
+  print(f"{rows} rows on {engine.dialect.name}")
+  for name, prefix in (("previous", "OLD"), ("bulk writer", "NEW")):
+    with Session(engine) as db:
+      asset_rows = _asset_rows(rows, product_id, zone_id, prefix)
+      created = []
+      print(name)
+      if name == "previous":
+        def insert_assets():
+          created.extend(db.execute(insert(Asset).returning(Asset.AssetId), asset_rows).mappings().all())
+        _timed("insert assets returning ids", insert_assets)
+        links = [{"AssetId": row["AssetId"], "StockMoveId": stock_move_id} for row in created]
+        _timed("insert asset/stock move links", lambda: db.execute(insert(AssetStockMove), links))
+        updates = [{"AssetId": row["AssetId"], "AssetStatus": "Awaiting QC", "GoodsReceiptId": None} for row in created]
+        _timed("update assets by primary key", lambda: db.bulk_update_mappings(Asset, updates))
+      else:
+        writer = BulkWriter(db)
+        def insert_assets():
+          created.extend(writer.insert_returning(Asset, asset_rows, returning=(Asset.AssetId, Asset.SerialNumber)))
+        _timed("insert assets returning ids", insert_assets)
+        assert [row["SerialNumber"] for row in created] == [row["SerialNumber"] for row in asset_rows], "ids out of order"
+        links = [{"AssetId": row["AssetId"], "StockMoveId": stock_move_id} for row in created]
+        _timed("insert asset/stock move links", lambda: writer.insert_many(AssetStockMove, links))
+        updates = [{"AssetId": row["AssetId"], "AssetStatus": "Awaiting QC", "GoodsReceiptId": None} for row in created]
+        _timed("update assets by primary key", lambda: writer.update_many(Asset, updates))
+      # Leave the database as it was
+      db.rollback()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--rows", type=int, default=50000, help="number of assets to write")
+  arguments = parser.parse_args()
+  run(os.environ.get("BENCHMARK_DATABASE_URL", "sqlite:///./bulk_writer_benchmark.db"), arguments.rows)
@@ -0,0 +1,86 @@
+"""
+Benchmark of the product image uploads: a storage call made inside an async handler
+(what upload_product_image did) against the background ImageUploadQueue, with the
+filesystem storage and a simulated network latency.
+
+Usage (from inventory-api/, with the .env of the API):
+    python -m benchmarks.image_upload_benchmark --uploads 20 --latency-ms 300 --workers 4
+
+A ticker task measures how late the event loop runs it (the delay every other
+request, websocket broadcast included, would see) while the uploads are handled.
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+from starlette.datastructures import Headers, UploadFile
+from app.services.image_storage import LocalImageStorage
+from app.services.image_upload_queue import ImageUploadQueue
+
+TICK_SECONDS = 0.01
+
+async def _ticker(stop: asyncio.Event, lags: list[float]):
+  while not stop.is_set():
+    scheduled_at = time.perf_counter()
+    await asyncio.sleep(TICK_SECONDS)
+    lags.append(time.perf_counter() - scheduled_at - TICK_SECONDS)
+
+def _upload_file(size: int) -> UploadFile:
+  return UploadFile(io.BytesIO(os.urandom(size)), filename="bench.png", headers=Headers({"content-type": "image/png"}))
+
+async def _inline(storage: LocalImageStorage, uploads: int, size: int) -> tuple[float, float]:
+  # The storage call runs on the event loop, like cloudinary.uploader.upload in the handler
+  async def handler():
+    upload_file = _upload_file(size)
+    with tempfile.NamedTemporaryFile(delete=False) as target:
+      target.write(upload_file.file.read())
+    storage.upload(target.name, upload_file.content_type)
+    os.remove(target.name)
+  started_at = time.perf_counter()
+  await asyncio.gather(*(handler() for _ in range(uploads)))
+  elapsed = time.perf_counter() - started_at
+  return elapsed, elapsed
+
+async def _queued(queue: ImageUploadQueue, uploads: int, size: int) -> tuple[float, float]:
+  done = asyncio.Event()
+  finished = []
+  async def on_finished(job):
+    finished.append(job)
+    if len(finished) == uploads:
+      done.set()
+  queue.add_listener(on_finished)
+  started_at = time.perf_counter()
+  await asyncio.gather(*(queue.submit(_upload_file(size)) for _ in range(uploads)))
+  accepted = time.perf_counter() - started_at
+  await done.wait()
+  return accepted, time.perf_counter() - started_at
+
+async def _measure(label: str, run) -> None:
+  stop = asyncio.Event()
+  lags: list[float] = []
+  ticker = asyncio.create_task(_ticker(stop, lags))
+  accepted, completed = await run
+  stop.set()
+  await ticker
+  print(f"  {label:<16} all answered {accepted * 1000:8.1f} ms  all stored {completed * 1000:8.1f} ms  "
+        f"max loop lag {max(lags, default=0) * 1000:8.1f} ms")
+
+async def main(uploads: int, size: int, latency_seconds: float, workers: int):
+  with tempfile.TemporaryDirectory() as root_dir:
+    storage = LocalImageStorage(root_dir, "http://127.0.0.1:8000/media", latency_seconds=latency_seconds)
+    print(f"{uploads} uploads of {size // 1024} KiB, {latency_seconds * 1000:.0f} ms storage latency, {workers} workers")
+    await _measure("inline", _inline(storage, uploads, size))
+    queue = ImageUploadQueue(storage, max_workers=workers, max_queue=uploads, job_ttl_seconds=60, retry_after_seconds=1)
+    await _measure("queued", _queued(queue, uploads, size))
+    await queue.stop()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--uploads", type=int, default=20, help="concurrent uploads")
+  parser.add_argument("--size-kb", type=int, default=512, help="image size")
+  parser.add_argument("--latency-ms", type=float, default=300, help="simulated storage round trip")
+  parser.add_argument("--workers", type=int, default=4, help="upload workers")
+  arguments = parser.parse_args()
+  asyncio.run(main(arguments.uploads, arguments.size_kb * 1024, arguments.latency_ms / 1000, arguments.workers))
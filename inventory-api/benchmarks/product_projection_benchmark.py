@@ -0,0 +1,113 @@
+"""
+Benchmark of the product list reads: ORM entities (Product.PurchaseOrderItems is eagerly
+joined, with the PurchaseOrder, Supplier and User joins it brings) against the column
+projection of app/database/query_builders.py, on a catalog with a deep PO history.
+
+Usage (from inventory-api/):
+    python -m benchmarks.product_projection_benchmark --products 1000 --orders 500 --lines-per-order 20
+    BENCHMARK_DATABASE_URL="mssql+pyodbc:///?odbc_connect=..." python -m benchmarks.product_projection_benchmark
+
+For each read path it prints the rows sent by the database, the products returned,
+the JSON size and the time to fetch and serialize them as ProductPublic.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select, text, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from app.database.base import Base
+from app.database.product_model import Product
+from app.database.purchase_order_model import PurchaseOrder, PurchaseOrderItem
+from app.database.supplier_model import Supplier
+from app.database.user_model import User
+# Imported so every relationship of the models above can be configured
+from app.database.asset_model import Asset
+from app.database.shipment_manifest_model import ShipmentManifest
+from app.database.stock_move import StockMove
+from app.database.good_receipt_model import GoodsReceipt
+from app.database.warehouse_zone_model import Zone
+from app.database.query_builders import product_public_query
+from app.schemas.product import ProductPublic
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+  # SQLite only auto increments INTEGER PRIMARY KEY columns
+  return "INTEGER"
+
+def _seed(engine, products: int, orders: int, lines_per_order: int):
+  random.seed(42)
+  with Session(engine) as db:
+    supplier = Supplier(SupplierName="Benchmark", Address="-", Phone="-", Email="-", ContactPerson="-")
+    user = User(Username="benchmark", PasswordHash="-", Name="Benchmark", RoleId=1)
+    db.add_all([supplier, user])
+    db.flush()
+    product_ids = db.execute(
+      insert(Product).returning(Product.ProductId, sort_by_parameter_order=True),
+      [{
+        "ModelNumber_SKU": f"SKU-{index}",
+        "ProductName": f"Product {index}",
+        "Category": "bench",
+        "ProductSeries": "bench",
+        "Manufacturer": "Benchmark",
+        "Measurement": "pc",
+        "SellingPrice": 2.0,
+        "InternalPrice": 1.0
+      } for index in range(products)]
+    ).scalars().all()
+    order_ids = db.execute(
+      insert(PurchaseOrder).returning(PurchaseOrder.PurchaseOrderId, sort_by_parameter_order=True),
+      [{
+        "CreateDate": datetime.now(),
+        "Status": "Completed",
+        "SupplierId": supplier.SupplierId,
+        "CreateUserId": user.UserId,
+        "ApprovedByUserId": user.UserId
+      } for _ in range(orders)]
+    ).scalars().all()
+    db.execute(insert(PurchaseOrderItem), [{
+      "Quantity": 1,
+      "UnitPrice": 1.0,
+      "ItemDescription": "benchmark line",
+      "ProductId": random.choice(product_ids),
+      "PurchaseOrderId": order_id
+    } for order_id in order_ids for _ in range(lines_per_order)])
+    db.commit()
+
+def _database_rows(engine, stmt) -> int:
+  # Rows of the SQL actually sent, eager joins included
+  with engine.connect() as connection:
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    return connection.execute(text(f"SELECT COUNT(*) FROM ({sql}) AS rows_sent")).scalar_one()
+
+def _time_read(engine, label: str, stmt, read, calls: int):
+  adapter = TypeAdapter(list[ProductPublic])
+  started_at = time.perf_counter()
+  for _ in range(calls):
+    with Session(engine) as db:
+      products = read(db.execute(stmt))
+      body = adapter.dump_json(adapter.validate_python(products, from_attributes=True))
+  elapsed = time.perf_counter() - started_at
+  print(f"  {label:<18} {_database_rows(engine, stmt):>9} rows sent {len(products):>7} products "
+        f"{len(body) / 1024:>8.0f} KiB {elapsed * 1000 / calls:>10.1f} ms/call")
+
+def run(url: str, products: int, orders: int, lines_per_order: int, calls: int):
+  engine = create_engine(url)
+  Base.metadata.create_all(engine)
+  _seed(engine, products, orders, lines_per_order)
+  print(f"{engine.dialect.name}: {products} products, {orders} purchase orders x {lines_per_order} lines, {calls} calls")
+  _time_read(engine, "ORM entities", select(Product), lambda result: result.unique().scalars().all(), calls)
+  _time_read(engine, "column projection", product_public_query(), lambda result: result.all(), calls)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--products", type=int, default=1000, help="products in the catalog")
+  parser.add_argument("--orders", type=int, default=500, help="purchase orders")
+  parser.add_argument("--lines-per-order", type=int, default=20, help="lines per purchase order")
+  parser.add_argument("--calls", type=int, default=5, help="reads per path")
+  arguments = parser.parse_args()
+  run(os.environ.get("BENCHMARK_DATABASE_URL", "sqlite:///./product_projection_benchmark.db"),
+      arguments.products, arguments.orders, arguments.lines_per_order, arguments.calls)
@@ -0,0 +1,91 @@
+"""
+Benchmark of the Core query builders (app/database/query_builders.py) on a portable engine.
+
+Usage (from inventory-api/):
+    python -m benchmarks.query_builders_benchmark --lines 200 --assets-per-line 50 --calls 2000
+    BENCHMARK_DATABASE_URL="mssql+pyodbc:///?odbc_connect=..." python -m benchmarks.query_builders_benchmark
+
+Each hot path runs with the compiled cache (the default) and without it, which is
+what a statement that has to be compiled again on every call costs.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, insert, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from app.database.base import Base
+from app.database.asset_model import Asset
+from app.database.product_model import Product
+from app.database.purchase_order_model import PurchaseOrder
+from app.database.shipment_manifest_model import ShipmentManifest, ShipmentManifestLine
+from app.database.warehouse_zone_model import Zone
+from app.database.supplier_model import Supplier
+# Imported so every relationship of the models above can be configured
+from app.database.stock_move import StockMove
+from app.database.good_receipt_model import GoodsReceipt
+from app.database.user_model import User
+from app.database.query_builders import manifest_header_query, manifest_lines_query, purchase_order_status_query
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+  # SQLite only auto increments INTEGER PRIMARY KEY columns
+  return "INTEGER"
+
+def _seed(engine, lines: int, assets_per_line: int) -> tuple[int, int]:
+  with Session(engine) as db:
+    supplier = Supplier(SupplierName="Benchmark", Address="-")
+    zone = Zone(ZoneName="Benchmark")
+    product = Product(ModelNumber_SKU="BENCH", ProductName="Benchmark", Category="bench", ProductSeries="bench",
+                      Measurement="pc", InternalPrice=1.0, SellingPrice=1.0)
+    db.add_all([supplier, zone, product])
+    db.flush()
+    manifest = ShipmentManifest(SupplierId=supplier.SupplierId, Status="posted")
+    db.add(manifest)
+    db.flush()
+    line_ids = db.execute(
+      insert(ShipmentManifestLine).returning(ShipmentManifestLine.Id, sort_by_parameter_order=True),
+      [{"ShipmentManifestId": manifest.Id, "QuantityDeclared": assets_per_line, "ReceivingStrategy": "asset_specified"} for _ in range(lines)]
+    ).scalars().all()
+    db.execute(insert(Asset), [{
+      "ProductId": product.ProductId,
+      "CurrentZoneId": zone.ZoneId,
+      "ShipmentManifestLineId": line_id,
+      "AssetStatus": "Awaiting QC" if index % 2 else "In Transit",
+      "LastMovementDate": datetime.now()
+    } for line_id in line_ids for index in range(assets_per_line)])
+    db.commit()
+    return manifest.Id, product.ProductId
+
+def _time_calls(engine, label: str, stmt, params: dict, calls: int, use_cache: bool):
+  execution_options = {} if use_cache else {"compiled_cache": None}
+  with engine.connect().execution_options(**execution_options) as connection:
+    started_at = time.perf_counter()
+    for _ in range(calls):
+      connection.execute(stmt, params).all()
+    elapsed = time.perf_counter() - started_at
+  cache_label = "cached" if use_cache else "no cache"
+  print(f"  {label:<28} {cache_label:<9} {elapsed * 1000 / calls:8.3f} ms/call")
+
+def run(url: str, lines: int, assets_per_line: int, calls: int):
+  engine = create_engine(url)
+  Base.metadata.create_all(engine)
+  manifest_id, _ = _seed(engine, lines, assets_per_line)
+  print(f"{engine.dialect.name}: manifest with {lines} lines x {assets_per_line} assets, {calls} calls")
+  for label, stmt, params in (
+    ("purchase_order_status_query", purchase_order_status_query(), {"po_id": 1}),
+    ("manifest_header_query", manifest_header_query(), {"manifest_id": manifest_id}),
+    ("manifest_lines_query", manifest_lines_query(), {"manifest_id": manifest_id}),
+  ):
+    for use_cache in (True, False):
+      _time_calls(engine, label, stmt, params, calls, use_cache)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--lines", type=int, default=200, help="shipment manifest lines")
+  parser.add_argument("--assets-per-line", type=int, default=50, help="assets per line")
+  parser.add_argument("--calls", type=int, default=2000, help="executions per query")
+  arguments = parser.parse_args()
+  run(os.environ.get("BENCHMARK_DATABASE_URL", "sqlite:///./query_builders_benchmark.db"),
+      arguments.lines, arguments.assets_per_line, arguments.calls)
@@ -0,0 +1,102 @@
+"""
+Benchmark of the refresh token rotation with bcrypt hashes against the keyed digest.
+
+Usage (from inventory-api/, with the .env of the API):
+    python -m benchmarks.refresh_token_benchmark --users 200 --refreshes 200
+    BENCHMARK_DATABASE_URL="mssql+pyodbc:///?odbc_connect=..." python -m benchmarks.refresh_token_benchmark
+
+Each refresh does what POST /auth/refresh-token does with the database: find the
+stored token, check its hash, delete it and store the hash of a new token.
+The bcrypt path is the previous implementation (lookup by Jti, pwd_context.verify
+and pwd_context.hash), the digest path goes through RefreshTokenService.
+"""
+import argparse
+import os
+import time
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+from jose import jwt
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.database.base import Base
+from app.database.user_model import User, RefreshToken
+# Imported so every relationship of User can be configured
+from app.database.good_receipt_model import GoodsReceipt
+from app.database.purchase_order_model import PurchaseOrder
+from app.database.shipment_manifest_model import ShipmentManifest
+from app.database.supplier_model import Supplier
+from app.database.asset_model import Asset
+from app.database.product_model import Product
+from app.database.warehouse_zone_model import Zone
+from app.database.stock_move import StockMove
+from app.services.auth.refresh_token import RefreshTokenService, create_refresh_token, SECRET_KEY, ALGORITHM
+
+# The previous implementation hashed inline in the request worker
+legacy_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def _seed_users(db: Session, users: int) -> list[int]:
+  user_ids = []
+  for index in range(users):
+    user = User(Username=f"benchmark-{time.time_ns()}-{index}", PasswordHash="-", RoleId=1)
+    db.add(user)
+    db.flush()
+    user_ids.append(user.UserId)
+  db.commit()
+  return user_ids
+
+def _refresh_bcrypt(db: Session, token: str) -> str:
+  payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+  record = db.execute(
+    select(RefreshToken).where(RefreshToken.Jti == payload["Jti"], RefreshToken.UserId == payload["UserId"])
+  ).scalars().one()
+  assert legacy_pwd_context.verify(token, record.TokenHash)
+  db.delete(record)
+  new_token, jti, expires_at = create_refresh_token(user_id=record.UserId)
+  db.add(RefreshToken(Jti=jti, TokenHash=legacy_pwd_context.hash(new_token), UserId=record.UserId, ExpiresAt=expires_at))
+  db.commit()
+  return new_token
+
+def _refresh_digest(db: Session, token: str) -> str:
+  payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+  service = RefreshTokenService(db)
+  record = service.find(token, user_id=payload["UserId"], jti=payload["Jti"])
+  assert record is not None
+  new_token = service.rotate(record)
+  db.commit()
+  return new_token
+
+def _run(engine, label: str, user_ids: list[int], refreshes: int, issue, refresh):
+  with Session(engine) as db:
+    tokens = [issue(db, user_id) for user_id in user_ids]
+    db.commit()
+    started_at = time.perf_counter()
+    for index in range(refreshes):
+      slot = index % len(tokens)
+      tokens[slot] = refresh(db, tokens[slot])
+    elapsed = time.perf_counter() - started_at
+  print(f"  {label:<8} {refreshes} refreshes in {elapsed:7.3f}s  {refreshes / elapsed:9.1f} refreshes/s  {elapsed * 1000 / refreshes:8.3f} ms/refresh")
+
+def _issue_bcrypt(db: Session, user_id: int) -> str:
+  token, jti, expires_at = create_refresh_token(user_id=user_id)
+  db.add(RefreshToken(Jti=jti, TokenHash=legacy_pwd_context.hash(token), UserId=user_id, ExpiresAt=expires_at))
+  return token
+
+def _issue_digest(db: Session, user_id: int) -> str:
+  return RefreshTokenService(db).issue(user_id)
+
+def run(url: str, users: int, refreshes: int):
+  engine = create_engine(url)
+  Base.metadata.create_all(engine, tables=[User.__table__, RefreshToken.__table__])
+  with Session(engine) as db:
+    user_ids = _seed_users(db, users)
+  print(f"{engine.dialect.name}: {users} users, {refreshes} refreshes per scheme")
+  _run(engine, "bcrypt", user_ids, refreshes, _issue_bcrypt, _refresh_bcrypt)
+  _run(engine, "digest", user_ids, refreshes, _issue_digest, _refresh_digest)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--users", type=int, default=50, help="users holding a refresh token")
+  parser.add_argument("--refreshes", type=int, default=100, help="refreshes per scheme")
+  arguments = parser.parse_args()
+  run(os.environ.get("BENCHMARK_DATABASE_URL", "sqlite:///./refresh_token_benchmark.db"), arguments.users, arguments.refreshes)
@@ -13,10 +13,52 @@ from app.routers.warehouse_zone import warehouse_zones
 from app.routers.purchase_order import purchase_order
 from app.routers.supplier import supplier
 from app.routers.good_receipt import good_receipt
+from app.routers.inventory import inventory
+from app.routers.internal import metrics
 from fastapi.middleware.cors	import CORSMiddleware
 import os
 from app.utils.logger import setup_logger
-app = FastAPI()
+from app.utils.sql_profiler import SQLProfilerMiddleware
+from app.database.connection import ReadAfterWriteMiddleware, LAST_WRITE_HEADER
+from app.services.inventory.stock_snapshot import run_checkpoint_loop
+from app.services.password_hasher import password_hasher
+from app.services.auth.refresh_token import run_refresh_token_purge_loop
+from app.services.product_search import run_product_search_refresh_loop
+from app.services.image_upload_queue import image_upload_queue
+from app.services.socket_manager import CONNECTION_MANAGERS
+from app.services.broadcast_backplane import broadcast_backplane
+from fastapi.staticfiles import StaticFiles
+from urllib.parse import urlparse
+from contextlib import asynccontextmanager
+import asyncio
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background jobs live as long as the application
+    background_tasks = []
+    if settings.STOCK_CHECKPOINT_INTERVAL_MINUTES > 0:
+        background_tasks.append(asyncio.create_task(run_checkpoint_loop(settings.STOCK_CHECKPOINT_INTERVAL_MINUTES)))
+    background_tasks.append(asyncio.create_task(run_product_search_refresh_loop(settings.PRODUCT_SEARCH_REFRESH_MINUTES)))
+    if settings.REFRESH_TOKEN_PURGE_INTERVAL_MINUTES > 0:
+        background_tasks.append(asyncio.create_task(run_refresh_token_purge_loop(
+            settings.REFRESH_TOKEN_PURGE_INTERVAL_MINUTES,
+            settings.REFRESH_TOKEN_PURGE_BATCH_SIZE
+        )))
+    image_upload_queue.start()
+    await broadcast_backplane.start()
+    for connection_manager in CONNECTION_MANAGERS.values():
+        connection_manager.start()
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await image_upload_queue.stop()
+    for connection_manager in CONNECTION_MANAGERS.values():
+        await connection_manager.stop()
+    await broadcast_backplane.stop()
+    password_hasher.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 logger = setup_logger()
 
@@ -39,8 +81,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", LAST_WRITE_HEADER],
 )
 
+# Read-your-writes across workers: the client sends back the time of its last write
+if settings.DATABASE_READ_MAX_STALENESS_SECONDS > 0:
+    app.add_middleware(ReadAfterWriteMiddleware)
+
+if settings.SQL_PROFILER_ENABLED:
+    app.add_middleware(
+        SQLProfilerMiddleware,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+        slow_request_statements=settings.SQL_PROFILER_SLOW_REQUEST_STATEMENTS,
+    )
+
 # Routers for fetch all user API
 
 app.include_router(auth.router)
@@ -50,6 +104,14 @@ app.include_router(warehouse_zones.router)
 app.include_router(purchase_order.router)
 app.include_router(supplier.router)
 app.include_router(good_receipt.router)
+app.include_router(inventory.router)
+app.include_router(metrics.router)
+
+# Local image storage: the API serves the uploaded files itself
+if settings.IMAGE_STORAGE_BACKEND == "local":
+    app.mount(urlparse(settings.IMAGE_STORAGE_LOCAL_BASE_URL).path,
+              StaticFiles(directory=settings.IMAGE_STORAGE_LOCAL_DIR),
+              name="media")
 
 # users = get_all_users()
 # print(users)
@@ -0,0 +1,112 @@
+import importlib
+import io
+import json
+import os
+import pkgutil
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+# The settings are read at import time. Importing the service loads app.database.connection,
+# which needs the drivers of environment.yml (pyodbc with libodbc, aioodbc); the engines it
+# creates are never connected, the import tests below use their own SQLite database
+for name in ("DATABASE_NAME", "DATABASE_HOSTNAME", "DATABASE_USERNAME", "DATABASE_PASSWORD",
+             "CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET"):
+  os.environ.setdefault(name, "test")
+os.environ.setdefault("DATABASE_PORT", "1433")
+os.environ.setdefault("SLOW_QUERY_LOG_FILE", "")
+
+import app.database
+from app.database.base import Base
+from app.database.product_model import Product as ProductORM
+from app.schemas.product import ProductImportRowError
+from app.services.product_import import ProductImportReport, ProductImportService, _read_ndjson
+
+# Every mapped class, the relationships resolve their targets by name
+for module in pkgutil.iter_modules(app.database.__path__):
+  if module.name.endswith("_model") or module.name == "stock_move":
+    importlib.import_module(f"app.database.{module.name}")
+
+def _validate_line(line: bytes) -> ProductImportReport:
+  service = ProductImportService(None, chunk_size=10, max_reported_errors=10)
+  report = ProductImportReport()
+  for record in _read_ndjson(io.BytesIO(line)):
+    service._validate(record, report)
+  return report
+
+def test_non_string_sku_is_reported_as_text():
+  report = _validate_line(b'{"model_number_sku": 123, "product_name": "Drill"}\n')
+  assert report.failed == 1
+  assert report.errors[0]["model_number_sku"] == "123"
+  # The error entry must fit the response schema (a raw int failed it: 500)
+  ProductImportRowError.model_validate(report.errors[0])
+
+def test_missing_sku_is_reported_as_none():
+  report = _validate_line(b'{"product_name": "Drill"}\n')
+  assert report.failed == 1
+  assert report.errors[0]["model_number_sku"] is None
+
+PRODUCT = {
+  "model_number_sku": "SKU-1", "product_name": "Drill", "category": "tools", "product_series": "D",
+  "measurement": "pc", "selling_price": 12, "internal_price": 10, "package_weight_kg": None, "dimensions_h_cm": None,
+  "dimensions_w_cm": None, "dimensions_d_cm": None, "primary_supplier_id": None
+}
+
+@pytest.fixture
+def db():
+  engine = create_engine("sqlite://")
+  Base.metadata.create_all(engine)
+  with Session(engine) as session:
+    yield session
+  engine.dispose()
+
+def _import(db: Session, *rows: dict) -> ProductImportReport:
+  stream = io.BytesIO("".join(json.dumps(row) + "\n" for row in rows).encode())
+  return ProductImportService(db, chunk_size=100, max_reported_errors=10).import_file(stream, "ndjson")
+
+def _product(db: Session, sku: str) -> ProductORM:
+  db.expire_all()
+  return db.execute(select(ProductORM).where(ProductORM.ModelNumber_SKU == sku)).unique().scalar_one()
+
+def test_chunk_inserts_new_skus_and_updates_known_ones(db):
+  _import(db, {**PRODUCT, "manufacturer": "Acme", "warranty_period_days": 365})
+  report = _import(db, {**PRODUCT, "product_name": "Drill v2"}, {**PRODUCT, "model_number_sku": "SKU-2"})
+  assert (report.created, report.updated, report.failed) == (1, 1, 0)
+  updated = _product(db, "SKU-1")
+  assert updated.ProductName == "Drill v2"
+  # Columns the row leaves out keep their value
+  assert (updated.Manufacturer, updated.WarrantyPeriod_Days) == ("Acme", 365)
+  assert sorted(document.model_number_sku for document in report.documents) == ["SKU-1", "SKU-2"]
+
+def test_chunk_reports_duplicate_skus_of_the_file(db):
+  report = _import(db, PRODUCT, {**PRODUCT, "product_name": "Other"})
+  assert (report.created, report.failed) == (1, 1)
+  assert report.errors[0]["errors"] == ["duplicate of line 1 in the file"]
+  assert _product(db, "SKU-1").ProductName == "Drill"
+
+def test_chunk_rejects_a_sku_matching_several_products(db):
+  db.add_all([ProductORM(**{"ModelNumber_SKU": "SKU-1", "ProductName": name, "Category": "tools", "ProductSeries": "D",
+                            "Measurement": "pc", "SellingPrice": 12, "InternalPrice": 10}) for name in ("A", "B")])
+  db.commit()
+  report = _import(db, PRODUCT)
+  assert (report.created, report.updated, report.failed) == (0, 0, 1)
+  assert report.errors[0]["errors"][0].startswith("SKU matches 2 products")
+
+def test_chunk_rejected_by_the_database_is_written_row_by_row(db):
+  # ProductSeries is NOT NULL in the table, the whole chunk statement fails
+  report = _import(db, PRODUCT, {**PRODUCT, "model_number_sku": "SKU-2", "product_series": None})
+  assert (report.created, report.failed) == (1, 1)
+  assert report.errors[0]["model_number_sku"] == "SKU-2"
+  assert report.errors[0]["errors"][0].startswith("database error:")
+  assert _product(db, "SKU-1").ProductName == "Drill"
+
+def test_update_changing_the_image_url_clears_the_old_variants(db):
+  image = {"product_image_url": "http://img/1.jpg", "product_image_thumbnail_url": "http://img/1_thumbnail.jpg",
+           "product_image_medium_url": "http://img/1_medium.jpg"}
+  _import(db, {**PRODUCT, **image})
+  # Same url: the variants stay
+  _import(db, {**PRODUCT, "product_image_url": "http://img/1.jpg"})
+  assert _product(db, "SKU-1").ProductImageThumbnailUrl == "http://img/1_thumbnail.jpg"
+  _import(db, {**PRODUCT, "product_image_url": "http://img/2.jpg"})
+  product = _product(db, "SKU-1")
+  assert (product.ProductImageUrl, product.ProductImageThumbnailUrl, product.ProductImageMediumUrl) == ("http://img/2.jpg", None, None)
@@ -99,7 +99,7 @@ const ProductActionDialog = ({ open, onClose, tag}) => {
       setCurrentInternalPrice(product?.internal_price);
       setProductImage({
         file:null,
-        url: product?.product_image_url,
+        url: product?.product_image_medium_url || product?.product_image_url,
         id: product?.product_image_id
       })
       setMessage(null)
@@ -166,7 +166,9 @@ const ProductActionDialog = ({ open, onClose, tag}) => {
       SellingPrice: parseFloat(currentSellingPrice),
       InternalPrice: parseFloat(currentInternalPrice),
       ProductImageId: imageData?.public_id,
-      ProductImageUrl: imageData?.image_url
+      ProductImageUrl: imageData?.image_url,
+      ProductImageThumbnailUrl: imageData?.thumbnail_url,
+      ProductImageMediumUrl: imageData?.medium_url
 
     };
     try {
@@ -201,7 +203,9 @@ const ProductActionDialog = ({ open, onClose, tag}) => {
           SellingPrice: parseFloat(currentSellingPrice),
           InternalPrice: parseFloat(currentInternalPrice),
           ProductImageId: imageData?.public_id,
-          ProductImageUrl: imageData?.image_url
+          ProductImageUrl: imageData?.image_url,
+          ProductImageThumbnailUrl: imageData?.thumbnail_url,
+          ProductImageMediumUrl: imageData?.medium_url
         } 
       }
       catch (error) {
@@ -1,5 +1,6 @@
 import { useMutation } from "@tanstack/react-query"
 import api from "../../services/api"
+import { waitForImageUpload } from "../../services/imageUploadService"
 
 
 const useProductImageModify =() =>{
@@ -14,8 +15,10 @@ const useProductImageModify =() =>{
           headers: {"Content-Type": "multipart/form-data"}
         }
       )
+      // 202 with an upload job, the product is updated once the image is stored
+      const job = await waitForImageUpload(response.data)
       console.log("Have updated new image")
-      return response.data
+      return job
     }
   })
   return {mutateAsync, isLoading, error}
@@ -1,6 +1,7 @@
 // src/hooks/Product/useProductImageUpload.js
 import { useMutation } from "@tanstack/react-query";
 import api from "../../services/api";
+import { waitForImageUpload } from "../../services/imageUploadService";
 
 const useProductImageUpload = () => {
   const { mutateAsync, isLoading, error } = useMutation({
@@ -15,7 +16,8 @@ const useProductImageUpload = () => {
         } }
       );
 
-      return response.data; // Assuming the response contains imageId and imageUrl
+      // 202 with an upload job, resolved once the image is stored (image_url and public_id)
+      return waitForImageUpload(response.data);
     },
   });
 
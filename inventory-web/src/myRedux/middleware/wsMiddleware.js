@@ -45,6 +45,11 @@ const wsMiddleware = () => {
 
     socket.onmessage = (event) => {
       const message = JSON.parse(event.data);
+      // The server drops clients that stay silent, answer its keepalive pings
+      if (message.type === 'ping') {
+        socket.send(JSON.stringify({ type: 'pong' }));
+        return;
+      }
       console.log(`Receive message: ${message}`);
       store.dispatch(wsMessageReceive(message));
       };
@@ -23,6 +23,11 @@ api.interceptors.request.use(
       // Add the authorization header to every request
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Time of our last write, the API then reads from the primary until the replicas caught up
+    const lastWriteAt = localStorage.getItem('lastWriteAt');
+    if (lastWriteAt) {
+      config.headers['X-Last-Write-At'] = lastWriteAt;
+    }
     return config;
   },
   (error) => {
@@ -34,6 +39,10 @@ api.interceptors.request.use(
 // This allows you to handle errors globally
 api.interceptors.response.use(
   (response) => {
+    const lastWriteAt = response.headers['x-last-write-at'];
+    if (lastWriteAt) {
+      localStorage.setItem('lastWriteAt', lastWriteAt);
+    }
     return response
   },
   async (error) => {
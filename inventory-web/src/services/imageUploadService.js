@@ -0,0 +1,28 @@
+import api from './api';
+
+const POLL_INTERVAL_MS = 500;
+const POLL_TIMEOUT_MS = 60000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Image uploads are queued by the API (202 + job), this polls the job status_url
+ * until the upload finished and returns the job ({ image_url, public_id, ... }).
+ * Throws when the upload failed or did not finish in time.
+ */
+export const waitForImageUpload = async (job) => {
+    const deadline = Date.now() + POLL_TIMEOUT_MS;
+    let current = job;
+    while (current.status === 'queued' || current.status === 'running') {
+        if (Date.now() > deadline) {
+            throw new Error('Image upload is taking too long, please retry');
+        }
+        await sleep(POLL_INTERVAL_MS);
+        const response = await api.get(current.status_url);
+        current = response.data;
+    }
+    if (current.status === 'failed') {
+        throw new Error(current.error || 'Image upload failed');
+    }
+    return current;
+};
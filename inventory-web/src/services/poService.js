@@ -179,7 +179,7 @@ export const searchProducts = async (query) => {
             name: p.product_name,        // Map product_name -> name
             unit_price: p.internal_price || p.selling_price, // Fallback logic
             sku: p.model_number_sku,     // Map model_number_sku -> sku
-            image_url: p.product_image_url
+            image_url: p.product_image_thumbnail_url || p.product_image_url // 24px avatars
         }));
 
     } catch (error) {